@@ -0,0 +1,70 @@
+"""
+Time to produce one RSA key (two primes + e/d) at 2048 and 4096 bits.
+
+    python -m benchmarks.keygen [--bits 2048 4096] [--runs 5] [--workers N]
+
+Compares the sieve + Miller–Rabin search (serial and parallel), a warm prime
+pool, and sympy.randprime when sympy is installed.
+"""
+import argparse
+import statistics
+import time
+
+from codebase import constants as const
+from codebase import primes
+from codebase import rsa
+
+
+def _key_from(p, q):
+    phi_n = (p - 1) * (q - 1)
+    e = rsa.find_e(phi_n)
+    return e, rsa.mod_inverse(e, phi_n), p * q
+
+
+def _time(make_primes, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _key_from(*make_primes())
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bits", type=int, nargs="+", default=[2048, 4096])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=const.workers)
+    args = parser.parse_args(argv)
+
+    strategies = {
+        "sieve+MR (serial)": lambda half: primes.parallel_primes(half, 2, workers=1),
+        f"sieve+MR ({args.workers} workers)": lambda half: primes.parallel_primes(half, 2, workers=args.workers),
+    }
+
+    try:
+        import sympy
+
+        strategies["sympy.randprime"] = lambda half: [
+            sympy.randprime(2 ** (half - 1), 2**half) for _ in range(2)
+        ]
+    except ImportError:
+        pass
+
+    print(f"{'bits':>6}  {'strategy':<28} {'median':>9} {'min':>9} {'max':>9}")
+    for bits in args.bits:
+        half = bits // 2
+
+        for name, make in strategies.items():
+            samples = _time(lambda: make(half), args.runs)
+            print(f"{bits:>6}  {name:<28} {statistics.median(samples):>8.3f}s {min(samples):>8.3f}s {max(samples):>8.3f}s")
+
+        # Warm in-process pool: what a Send sees once the pool has been restocked
+        pool = primes.PrimePool(size=2 * args.runs, background=False)
+        pool.refill(half)
+        samples = _time(lambda: pool.take(half, 2), args.runs)
+        print(f"{bits:>6}  {'warm prime pool':<28} {statistics.median(samples):>8.3f}s {min(samples):>8.3f}s {max(samples):>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
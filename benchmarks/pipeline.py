@@ -0,0 +1,233 @@
+"""
+Stage-by-stage timings of Send and Receive on synthetic images, as JSON.
+
+    python -m benchmarks.pipeline [--sizes 256 1024] [--modes RGB L RGBA] [--count 8] [--runs 3]
+                                  [--out bench.json] [--baseline old.json] [--tolerance 0.15]
+
+Times key generation, the master-code key masks (PBKDF2), the CRT unwrap of the AES key,
+image decode, AES (raw and image payloads), .bin writes, zip / unzip, PNG save and the
+QR round trip, each on its own (median of ``--runs``).
+With ``--baseline`` every stage is compared to a stored result file and the exit
+status is 1 when any stage got slower than ``--tolerance`` allows.
+"""
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from codebase import constants as const
+from codebase import img_processing
+from codebase import primes
+from codebase import rsa
+from codebase import utility as util
+
+
+def _timed(fn, runs, size=None):
+    samples = []
+    for _ in range(runs):
+        # The jobs log through rich; keep that out of the numbers and the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+
+    result = {"median_s": statistics.median(samples), "min_s": min(samples), "runs": runs}
+    if size:
+        result["bytes"] = size
+        result["mb_per_s"] = size / result["median_s"] / 1e6
+    return result
+
+
+def synthetic_image(size, mode, seed):
+    """Gradient plus noise: compresses like a photo, not like pure noise."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    ramp = np.add.outer(np.arange(size), np.arange(size)) * (255 / (2 * size))
+    base = np.clip(ramp[:, :, None] + rng.normal(0, 12, (size, size, 3)), 0, 255).astype(np.uint8)
+    return Image.fromarray(base).convert(mode)
+
+
+# ─── Stages ───────────────────────────────────────────────────
+def bench_keys(args):
+    # Cold keygen: no prime pool on disk, and no refill between runs
+    primes._default_pool = primes.PrimePool(size=1, path=None, background=False)
+
+    results = {f"keygen_{args.bits}": _timed(lambda: rsa.generate_keys(bits=args.bits), args.runs)}
+    AES_key, [e, d, n] = rsa.generate_keys(bits=args.bits)
+    key = rsa.crt_private_key(d, const.RSA_p, const.RSA_q)
+
+    # What save_keys / load_keys derive for a CRT ("pkgv5.1") QR: one pad per field
+    passphrase = util.fetch_passphrase(util.generate_master_code())
+    fields = dict(zip(util.CRT_FIELDS, (key.p, key.q, key.dP, key.dQ, key.qInv)))
+    sizes = {field: (value.bit_length() + 7) // 8 for field, value in fields.items()}
+    results["field_masks"] = _timed(lambda: util.derive_field_masks(passphrase, sizes), args.runs)
+
+    # Receive unwrapping the archive's AES key (rsa_decrypt_key, CRT)
+    wrapped = util.wrap_aes_key(AES_key, e, n)
+    results["aes_key_unwrap_crt"] = _timed(lambda: util.unwrap_aes_key(wrapped, key), args.runs)
+
+    try:
+        import pyzbar.pyzbar  # noqa: F401  (needs the native zbar library)
+    except ImportError:
+        print("⚠️  pyzbar / zbar not available: skipping the QR round trip", file=sys.stderr)
+        return results
+
+    # A key payload the size save_keys writes (CRT fields of a 2048-bit key)
+    encoded = base64.b64encode(os.urandom(1750)).decode()
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, qr_path = Path(tmp) / "keys.json", Path(tmp) / "qr.png"
+        json_path.write_text(json.dumps(encoded))
+
+        def round_trip():
+            util.json_to_qr(json_path, qr_path)
+            util.qr_to_json(qr_path)
+
+        results["qr_round_trip"] = _timed(round_trip, args.runs)
+    return results
+
+
+def bench_images(size, mode, args):
+    from PIL import Image
+
+    key = os.urandom(16)
+    const.AES_key = key
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        src, bins, unzipped, out = tmp / "src", tmp / "bin", tmp / "unzipped", tmp / "out"
+        for folder in (src, bins, unzipped, out):
+            folder.mkdir()
+
+        paths = []
+        for i in range(args.count):
+            paths.append(src / f"{i}.png")
+            synthetic_image(size, mode, i).save(paths[-1])
+
+        images = [Image.open(path) for path in paths]
+        for img in images:
+            img.load()
+        raws = [img.tobytes() for img in images]
+        pixel_bytes = sum(len(raw) for raw in raws)
+
+        def encrypt_images():
+            blobs = []
+            for img in images:
+                buffer = io.BytesIO()
+                img_processing.write_encrypted_pil(img, buffer, key, "none", 0)
+                blobs.append(buffer.getvalue())
+            return blobs
+
+        blobs = encrypt_images()
+        ciphertexts = [rsa.aes_encrypt(raw, key) for raw in raws]
+        payloads = [img_processing.decrypt_payload(blob, key) for blob in blobs]
+
+        def write_bins():
+            for i, blob in enumerate(blobs):
+                with open(bins / f"{i}.png.bin", "wb") as f:
+                    f.write(blob)
+
+        def save_pngs():
+            for i, (meta, value) in enumerate(payloads):
+                img_processing.save_payload(meta, value, None, str(out / f"{i}.png"))
+
+        write_bins()
+        zip_path = tmp / "archive.zip"
+        util.save_as_zip(bins, zip_path)
+
+        return {
+            "decode": _timed(lambda: [Image.open(path).load() for path in paths], args.runs, pixel_bytes),
+            "aes_encrypt": _timed(lambda: [rsa.aes_encrypt(raw, key) for raw in raws], args.runs, pixel_bytes),
+            "aes_decrypt": _timed(lambda: [rsa.aes_decrypt(ct, key) for ct in ciphertexts], args.runs, pixel_bytes),
+            "encrypt_image": _timed(encrypt_images, args.runs, pixel_bytes),
+            "decrypt_image": _timed(lambda: [img_processing.decrypt_payload(blob, key) for blob in blobs], args.runs, pixel_bytes),
+            "write_bin": _timed(write_bins, args.runs, pixel_bytes),
+            "save_as_zip": _timed(lambda: util.save_as_zip(bins, zip_path), args.runs, pixel_bytes),
+            "extract_zip": _timed(lambda: util.extract_zip(zip_path, unzipped), args.runs, pixel_bytes),
+            "png_save": _timed(save_pngs, args.runs, pixel_bytes),
+        }
+
+
+# ─── Baseline ─────────────────────────────────────────────────
+def compare(current, baseline, tolerance):
+    """Print every stage against the baseline; returns the ``(case, stage)`` pairs that regressed."""
+    regressions = []
+    print(f"\n{'case':<16} {'stage':<16} {'now':>10} {'baseline':>10} {'change':>8}")
+
+    for case, stages in current["results"].items():
+        for stage, result in stages.items():
+            old = baseline.get("results", {}).get(case, {}).get(stage)
+            if old is None:
+                continue
+
+            change = result["median_s"] / old["median_s"] - 1
+            flag = "  ❌" if change > tolerance else ""
+            if flag:
+                regressions.append((case, stage))
+            print(f"{case:<16} {stage:<16} {result['median_s']:>9.4f}s {old['median_s']:>9.4f}s {change:>+7.1%}{flag}")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024], help="Edge length of the square test images")
+    parser.add_argument("--modes", nargs="+", default=["RGB", "L", "RGBA"])
+    parser.add_argument("--count", type=int, default=8, help="Images per size / mode")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--bits", type=int, default=2048, help="RSA key size for the keygen stage")
+    parser.add_argument("--out", type=Path, help="Write the results here (JSON)")
+    parser.add_argument("--baseline", type=Path, help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown per stage before it counts as a regression")
+    args = parser.parse_args(argv)
+
+    import numpy
+    import PIL
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": numpy.__version__,
+            "pillow": PIL.__version__,
+            "args": {name: value for name, value in vars(args).items() if name not in ("out", "baseline")},
+        },
+        "results": {"keys": bench_keys(args)},
+    }
+
+    for size in args.sizes:
+        for mode in args.modes:
+            report["results"][f"{mode}_{size}"] = bench_images(size, mode, args)
+
+    print(f"{'case':<16} {'stage':<16} {'median':>10} {'MB/s':>9}")
+    for case, stages in report["results"].items():
+        for stage, result in stages.items():
+            rate = f"{result['mb_per_s']:>9.1f}" if "mb_per_s" in result else f"{'':>9}"
+            print(f"{case:<16} {stage:<16} {result['median_s']:>9.4f}s {rate}")
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
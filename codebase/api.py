@@ -0,0 +1,147 @@
+"""
+In-memory encrypt / decrypt for callers that already hold images.
+
+The key, codec, tiling, frames and cipher mode are arguments: the CLI's
+session key and settings (``const.AES_key``, ``const.AES_mode``, ...) never
+change what these functions produce, and nothing touches the disk, so they
+are safe to call concurrently from request handlers, each with its own key.
+Only tuning settings are shared with the CLI (``const.AES_chunk_size``,
+``const.AES_threads``, ``const.AES_segment_size``): they change speed, not output.
+
+    from codebase import api
+
+    key = api.ImageKey.generate()
+    blob = api.encrypt(pil_image_or_array_or_png_bytes, key)
+    pixels = api.decrypt(blob, key)          # numpy array, (h, w, c)
+
+    slide = api.encrypt(huge_array, key, tile=512)
+    patch = api.decrypt_region(slide, key, x, y, 256, 256)   # only the tiles it overlaps
+
+    scan = api.encrypt(multi_page_tiff_bytes, key, frames=True)
+    page = api.decrypt_frame(scan, key, 41)                    # a PIL image
+"""
+import io
+
+from codebase import img_processing
+
+
+class ImageKey:
+    """An AES key for the library API (16, 24 or 32 bytes)."""
+
+    __slots__ = ("secret",)
+
+    def __init__(self, secret: bytes):
+        secret = bytes(secret)
+        if len(secret) not in (16, 24, 32):
+            raise ValueError("❌ AES key must be 16, 24 or 32 bytes long.")
+        self.secret = secret
+
+    @classmethod
+    def generate(cls, size: int = 16) -> "ImageKey":
+        from Crypto.Random import get_random_bytes
+
+        return cls(get_random_bytes(size))
+
+    def __repr__(self):
+        return f"ImageKey(<{len(self.secret) * 8}-bit>)"
+
+
+def _secret(key) -> bytes:
+    return key.secret if isinstance(key, ImageKey) else ImageKey(key).secret
+
+
+def _write(image, fp, secret, codec, tile=0, frames=False, mode="cbc"):
+    from PIL import Image
+
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        # An encoded image file (PNG, JPEG, ...) held in memory
+        image = Image.open(io.BytesIO(image))
+
+    if isinstance(image, Image.Image):
+        img_processing.write_encrypted_pil(image, fp, secret, codec, tile, frames, mode)
+    else:
+        img_processing.write_encrypted_array(image, fp, secret, codec, tile, mode)
+
+
+def encrypt(image, key, codec="none", tile=0, frames=False, mode="cbc") -> bytes:
+    """
+    Encrypt one image and return the ciphertext (same format as a ``.bin`` file).
+    ``image`` may be a PIL image, a ``uint8`` numpy array ``(h, w[, c])`` (a memmap
+    works too), or the bytes of an encoded image file. ``key`` is an ``ImageKey`` or
+    raw key bytes; ``codec`` compresses the pixels first (see ``codebase.blob``);
+    ``tile`` > 0 stores square tiles that ``decrypt_region`` can read one by one;
+    ``frames`` keeps every frame of a multi-frame image (read back with ``open_frames``);
+    ``mode`` is the cipher, "cbc" or "ctr" (seekable, split over threads; tiles are always CTR).
+    """
+    buffer = io.BytesIO()
+    _write(image, buffer, _secret(key), codec, tile, frames, mode)
+    return buffer.getvalue()
+
+
+def encrypt_to(image, fp, key, codec="none", tile=0, frames=False, mode="cbc"):
+    """Like ``encrypt``, but streams the ciphertext into the writable binary ``fp``."""
+    _write(image, fp, _secret(key), codec, tile, frames, mode)
+
+
+def decrypt(blob, key):
+    """
+    Decrypt a ciphertext buffer into an array of shape ``(h, w, c)``: ``uint8`` for 8-bit
+    images, ``uint16`` / ``int32`` / ``float32`` for images sent in those modes.
+    """
+    return img_processing.decrypt_mapped_array(blob, _secret(key))
+
+
+def decrypt_from(fp, key):
+    """Decrypt from a readable binary stream into an array of shape ``(h, w, c)`` (see ``decrypt``)."""
+    return img_processing.decrypt_array(fp, _secret(key))
+
+
+def decrypt_image(blob, key):
+    """Decrypt a ciphertext buffer into a PIL image, in the mode it was sent in."""
+    meta, pixels = img_processing.decrypt_payload(blob, _secret(key))
+    if meta["kind"] == "file":
+        raise ValueError(f"❌ Blob holds a passthrough '{meta.get('ext')}' file, not pixels")
+    if meta["kind"] == "frames":
+        raise ValueError(f"❌ Blob holds {meta['frames']} frames: use decrypt_frame or open_frames")
+    return img_processing.array_to_pil(pixels, meta)
+
+
+def open_tiled(blob, key):
+    """``TiledImage`` over a tiled ciphertext buffer (bytes or mmap): ``.shape``, ``.tile(row, col)``, ``.region(x, y, w, h)``."""
+    from codebase import tiled
+
+    return tiled.TiledImage(blob, _secret(key))
+
+
+def decrypt_region(blob, key, x, y, w, h):
+    """Decrypt only the ``w`` x ``h`` rectangle at ``(x, y)`` of a tiled ciphertext, as an ``(h, w, c)`` array."""
+    return open_tiled(blob, key).region(x, y, w, h)
+
+
+def open_frames(blob, key):
+    """``FrameSequence`` over a multi-frame ciphertext buffer: ``len()``, iterate ``(meta, pixels)``, ``.frame(i)``."""
+    from codebase import frames
+
+    return frames.FrameSequence(blob, _secret(key))
+
+
+def decrypt_frame(blob, key, index):
+    """Decrypt only frame ``index`` of a multi-frame ciphertext, as a PIL image in the mode it was sent in."""
+    meta, pixels = open_frames(blob, key).frame(index)
+    return img_processing.array_to_pil(pixels, meta)
+
+
+def encrypt_many(images, key, codec="none", mode="cbc"):
+    """Lazily encrypt an iterable of images, yielding one ciphertext per image."""
+    secret = _secret(key)
+    for image in images:
+        buffer = io.BytesIO()
+        _write(image, buffer, secret, codec, mode=mode)
+        yield buffer.getvalue()
+
+
+def decrypt_many(blobs, key):
+    """Lazily decrypt an iterable of ciphertext buffers, yielding one array per blob."""
+    secret = _secret(key)
+    for blob in blobs:
+        yield img_processing.decrypt_mapped_array(blob, secret)
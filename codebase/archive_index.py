@@ -0,0 +1,254 @@
+"""
+Archive index: list an archive and decrypt single images out of it without touching the rest.
+
+Send adds one more entry, ``<timestamp>.index``, AES-CTR encrypted under the session key:
+
+    records   one JSON object per image, sorted by name:
+              {"name", "entry", "offset" (local header), "length", "kind", "shape", "mode", "frames"}
+    table     >QI offset, length of every record
+    footer    >Q offset of the table
+
+and points the zip comment at the index and at the wrapped AES key (plus the RSA key's
+fingerprint, see ``key_session``). Receive finds both from the end-of-archive record,
+then bisects the sorted records with small CTR range reads, so neither the central
+directory nor the whole index is read: the work grows with what was selected, not
+with the size of the archive.
+"""
+import fnmatch
+import io
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from codebase import rsa
+from codebase import utility as util
+from codebase import constants as const
+
+index_entry_name = f"{const.timestamp_literal}.index"
+key_entry_name = f"{const.timestamp_literal}.txt"
+
+_COMMENT_PREFIX = b"imgindex:"
+_END_RECORD = b"PK\x05\x06"
+_ENTRY = struct.Struct(">QI")
+_FOOTER = struct.Struct(">Q")
+
+
+# ─── Send Side ────────────────────────────────────────────────
+class ArchiveIndex:
+    """Collects what was written per entry; ``write`` stores it once the archive is complete."""
+
+    def __init__(self, root=None):
+        # Staged sends hand in .bin paths under ``root``; entry names are relative to it
+        self.root = root
+        self.records = {}
+
+    def add(self, dest, info):
+        entry = Path(dest).relative_to(self.root).as_posix() if self.root else str(dest)
+        self.records[entry] = dict(info or {})
+
+    def reuse(self, zip_path, aes_key, entries):
+        """Carry the records of ``entries`` over from the index of ``zip_path`` (incremental Send)."""
+        if not entries:
+            return
+
+        try:
+            previous = {record["entry"]: record for record in IndexedArchive(zip_path, aes_key=aes_key)}
+        except (OSError, ValueError):
+            previous = {}
+
+        for entry in entries:
+            record = previous.get(entry, {})
+            self.records[entry] = {k: v for k, v in record.items() if k not in ("name", "entry", "offset", "length")}
+
+    def write(self, archive, aes_key, key_id=None):
+        """
+        Store the index in ``archive`` (open for writing or appending) and point its zip comment
+        at it. ``key_id`` names the RSA key the AES key is wrapped with.
+        """
+        records = []
+        for entry, info in self.records.items():
+            try:
+                zinfo = archive.getinfo(entry)
+            except KeyError:
+                continue
+            name = entry[: -len(".bin")] if entry.endswith(".bin") else entry
+            records.append({"name": name, "entry": entry, "offset": zinfo.header_offset, "length": zinfo.compress_size, **info})
+        records.sort(key=lambda record: record["name"])
+
+        buffer = io.BytesIO()
+        table = []
+        with rsa.AESCTRWriter(buffer, aes_key) as writer:
+            for record in records:
+                data = json.dumps(record, separators=(",", ":")).encode("utf-8")
+                table.append(_ENTRY.pack(writer.tell(), len(data)))
+                writer.write(data)
+
+            table_offset = writer.tell()
+            writer.write(b"".join(table))
+            writer.write(_FOOTER.pack(table_offset))
+
+        util.write_zip_entry(archive, index_entry_name, buffer.getvalue())
+
+        located = {}
+        for field, name in (("index", index_entry_name), ("key", key_entry_name)):
+            zinfo = archive.getinfo(name)
+            located[field] = [zinfo.header_offset, zinfo.compress_size]
+        if key_id is not None:
+            located["rsa"] = key_id
+        archive.comment = _COMMENT_PREFIX + json.dumps(located, separators=(",", ":")).encode("utf-8")
+
+
+# ─── Receive Side ─────────────────────────────────────────────
+def read_comment(raw):
+    """The index location stored in the zip comment, or ``None`` for archives without an index."""
+    tail_start = max(0, len(raw) - 22 - 0xFFFF)
+    tail = bytes(raw[tail_start:])
+
+    pos = tail.rfind(_END_RECORD)
+    if pos < 0:
+        raise ValueError("❌ Not a zip archive (no end of central directory record).")
+
+    (comment_len,) = struct.unpack("<H", tail[pos + 20 : pos + 22])
+    comment = tail[pos + 22 : pos + 22 + comment_len]
+    if not comment.startswith(_COMMENT_PREFIX):
+        return None
+    return json.loads(comment[len(_COMMENT_PREFIX) :])
+
+
+def archive_key_id(zip_path):
+    """Fingerprint of the RSA key ``zip_path`` was sent under, or ``None`` when it doesn't say."""
+    with open(zip_path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 22 - 0xFFFF))
+        location = read_comment(f.read())
+    return location.get("rsa") if location else None
+
+
+def _literal_prefix(pattern):
+    # Everything before the first glob character: names matching the pattern all start with it
+    for i, char in enumerate(pattern):
+        if char in "*?[":
+            return pattern[:i]
+    return pattern
+
+
+def _glob_match(name, pattern):
+    """
+    ``fnmatch`` one path segment at a time: ``*``, ``?`` and ``[...]`` stay inside a folder
+    (``'*.png'`` only matches top-level images), while a ``**`` segment spans any number of folders.
+    """
+    return _match_parts(name.split("/"), pattern.split("/"))
+
+
+def _match_parts(parts, pattern):
+    if not pattern:
+        return not parts
+    if pattern[0] == "**":
+        return any(_match_parts(parts[i:], pattern[1:]) for i in range(len(parts) + 1))
+    return bool(parts) and fnmatch.fnmatchcase(parts[0], pattern[0]) and _match_parts(parts[1:], pattern[1:])
+
+
+class IndexedArchive:
+    """
+    Read side of the index of ``zip_path``. ``keys`` is the receiver's RSA private key (it
+    unwraps the archive's AES key), or pass the ``aes_key`` itself. Iterating yields every
+    record in name order; ``find`` only decrypts the records a pattern can match.
+    """
+
+    def __init__(self, zip_path, keys=None, aes_key=None):
+        with open(zip_path, "rb") as f:
+            self._raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        location = read_comment(self._raw)
+        if location is None:
+            raise ValueError(f"❌ '{Path(zip_path).name}' has no index (sent by an older version): receive it whole.")
+
+        if aes_key is None:
+            wrapped = bytes(util.located_entry(self._raw, *location["key"], key_entry_name)).decode("utf-8")
+            aes_key = util.unwrap_aes_key(wrapped, keys)
+        self.aes_key = aes_key
+
+        self._view = util.located_entry(self._raw, *location["index"], index_entry_name)
+        if not rsa.is_ctr(self._view):
+            raise ValueError("❌ Archive index is not AES-CTR encrypted.")
+
+        plain_len = len(self._view) - rsa.BLOCK_SIZE
+        (self._table_offset,) = _FOOTER.unpack(self._read(plain_len - _FOOTER.size, _FOOTER.size))
+        self.count = (plain_len - _FOOTER.size - self._table_offset) // _ENTRY.size
+
+    def _read(self, offset, length):
+        return rsa.ctr_decrypt_range(self._view, self.aes_key, offset, length)
+
+    def record(self, i):
+        offset, length = _ENTRY.unpack(self._read(self._table_offset + i * _ENTRY.size, _ENTRY.size))
+        return json.loads(bytes(self._read(offset, length)))
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Everything is wanted: decrypt the records in one range instead of one by one
+        if not self.count:
+            return
+        table = list(_ENTRY.iter_unpack(self._read(self._table_offset, self.count * _ENTRY.size)))
+        first = table[0][0]
+        records = self._read(first, self._table_offset - first)
+        for offset, length in table:
+            yield json.loads(bytes(records[offset - first : offset - first + length]))
+
+    def _bisect(self, name):
+        """First position whose record name is >= ``name``."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.record(mid)["name"] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, pattern):
+        """Records whose name matches ``pattern`` (an exact name or a glob), in name order."""
+        prefix = _literal_prefix(pattern)
+        for i in range(self._bisect(prefix), self.count):
+            record = self.record(i)
+            if not record["name"].startswith(prefix) or (prefix == pattern and record["name"] != pattern):
+                break
+            if _glob_match(record["name"], pattern):
+                yield record
+
+    def select(self, patterns):
+        """Records matching any of ``patterns``, each once; patterns that match nothing are reported."""
+        seen = {}
+        for pattern in patterns:
+            matched = 0
+            for record in self.find(pattern):
+                matched += 1
+                seen.setdefault(record["entry"], record)
+            if not matched:
+                print(f"⚠️  Nothing in the archive matches '{pattern}'")
+        return list(seen.values())
+
+
+def _size(length):
+    for unit in ("B", "KB", "MB"):
+        if length < 1024:
+            return f"{length:.0f} {unit}" if unit == "B" else f"{length:.1f} {unit}"
+        length /= 1024
+    return f"{length:.1f} GB"
+
+
+def print_listing(records):
+    count = total = 0
+    for record in records:
+        shape = record.get("shape")
+        dims = f"{shape[1]}x{shape[0]}" if shape else "-"
+        kind = record.get("mode") or record.get("ext") or record.get("kind", "-")
+        frames = f"  {record['frames']} frames" if "frames" in record else ""
+        print(f"{record['name']:<48} {dims:>11}  {kind:<6} {_size(record['length']):>10}{frames}")
+        count += 1
+        total += record["length"]
+
+    util.log(f"\n🗂️  [bold cyan]{count}[/bold cyan] images, [bold cyan]{_size(total)}[/bold cyan] encrypted\n")
@@ -0,0 +1,177 @@
+import signal
+from concurrent.futures import FIRST_COMPLETED, wait
+from functools import partial
+from itertools import islice
+
+from codebase import img_processing
+from codebase import utility as util
+from codebase import constants as const
+
+
+# ─── Worker Side ──────────────────────────────────────────────
+def _init_worker(AES_key, settings):
+    # Runs once per worker process, so the key is shipped once instead of per image
+    const.AES_key = AES_key
+    for name, value in settings.items():
+        setattr(const, name, value)
+
+
+def _init_warm_worker(settings):
+    # Ctrl-C is for the parent, which finishes its archive before stopping the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker(None, settings)
+
+    # Imported up front, so the first image doesn't pay for it
+    import numpy  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+
+def _run_task(task, src_path, dest_path):
+    try:
+        return src_path, dest_path, task(src_path, dest_path), None
+    except Exception as err:
+        return src_path, dest_path, None, err
+
+
+def _run_keyed(AES_key, task, src_path, dest_path):
+    # Warm pools outlive one archive's key: it comes with each task instead
+    const.AES_key = AES_key
+    return _run_task(task, src_path, dest_path)
+
+
+def _worker_settings(workers):
+    settings = {name: getattr(const, name) for name in const.worker_settings}
+    # The cores are already shared out between processes; split the CTR threads the same way
+    settings["AES_threads"] = max(1, const.AES_threads // workers)
+    return settings
+
+
+def _bounded(pool, run, jobs, backlog):
+    # Keep a bounded number of images in flight so huge folders never queue up all at once
+    jobs = iter(jobs)
+    pending = {pool.submit(run, *job) for job in islice(jobs, backlog)}
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+        for job in islice(jobs, len(done)):
+            pending.add(pool.submit(run, *job))
+
+
+# ─── Batch Engine ─────────────────────────────────────────────
+class WorkerPool:
+    """
+    Worker processes started (and their imports done) once, then reused by every
+    ``run_batch`` handed this pool, whatever AES key each batch is under. For
+    long-running jobs (``jobs.watch``); settings are those of ``const`` at start.
+    """
+
+    def __init__(self, workers=None):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = workers or const.workers
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_warm_worker,
+            initargs=(_worker_settings(self.workers),),
+        )
+        # Workers are started on demand: ask for all of them now rather than on the first image
+        wait([self._pool.submit(int) for _ in range(self.workers)])
+
+    def run(self, task, jobs, AES_key):
+        yield from _bounded(self._pool, partial(_run_keyed, AES_key, task), jobs, self.workers * const.worker_backlog)
+
+    def close(self):
+        self._pool.shutdown()
+
+
+def run_batch(task, jobs, AES_key, workers=None, pool=None):
+    """
+    Run ``task(src, dest)`` for every ``(src, dest)`` pair in ``jobs``, on ``pool`` (a
+    ``WorkerPool``) when given. Yields ``(src, dest, result, error)`` tuples in completion order.
+    """
+    if pool is not None:
+        yield from pool.run(task, jobs, AES_key)
+        return
+
+    workers = workers or const.workers
+
+    if workers <= 1:
+        const.AES_key = AES_key
+        for src_path, dest_path in jobs:
+            yield _run_task(task, src_path, dest_path)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(AES_key, _worker_settings(workers)),
+    ) as pool:
+        yield from _bounded(pool, partial(_run_task, task), jobs, workers * const.worker_backlog)
+
+
+def _located(source):
+    return source if isinstance(source, tuple) else (source,)
+
+
+def encrypt_all(jobs, workers=None, archive=None, index=None, journal=None, pool=None):
+    """
+    Encrypt ``(img_path, dest)`` jobs to ``.bin`` files, or to entries of ``archive`` when given.
+    Every image written is added to ``index`` (an ``archive_index.ArchiveIndex``) and to
+    ``journal`` (a ``checkpoint.SendJournal``) when given. ``pool`` is a ``WorkerPool`` to run on.
+    """
+    workers = pool.workers if pool is not None else workers or const.workers
+    pooled_archive = archive is not None and (workers > 1 or pool is not None)
+
+    if pooled_archive:
+        # Workers can't share the open zip: they hand back ciphertext (through a temp file
+        # past const.spool_threshold, so big images are never held whole) and the parent stores it
+        task = img_processing.encrypt_image_to_spool
+    elif archive is not None:
+        task = partial(img_processing.encrypt_image_to_zip, archive)
+    else:
+        task = img_processing.encrypt_image
+
+    for src_path, dest_path, result, err in run_batch(task, jobs, const.AES_key, workers, pool):
+        if err is not None:
+            img_processing.report_error(err, src_path)
+            continue
+
+        if pooled_archive:
+            sample, info, spooled = result
+            util.write_zip_spooled(archive, dest_path, spooled)
+        else:
+            sample, info = result
+
+        if index is not None:
+            index.add(dest_path, info)
+        if journal is not None:
+            journal.done(src_path, dest_path, info)
+        img_processing.log_encrypted(src_path, sample)
+
+
+def decrypt_all(jobs, workers=None, zip_path=None, journal=None):
+    """
+    Decrypt ``(bin, img_path)`` jobs from ``.bin`` files, or from entries of ``zip_path`` when given
+    (an entry is its name, or ``(name, offset, length)`` when located through the archive index).
+    Images saved are added to ``journal`` (a ``checkpoint.ReceiveJournal``) when given.
+    """
+    if zip_path is not None:
+        task = img_processing.decrypt_zip_entry
+        jobs = (((zip_path, *_located(source)), img_path) for source, img_path in jobs)
+    else:
+        task = img_processing.decrypt_image
+
+    for src_path, dest_path, result, err in run_batch(
+        task, jobs, const.AES_key, workers
+    ):
+        if err is None:
+            sample, written_path = result
+            if journal is not None:
+                journal.done(dest_path, written_path)
+            img_processing.log_decrypted(written_path, sample)
+        else:
+            img_processing.report_error(err, src_path)
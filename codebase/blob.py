@@ -0,0 +1,236 @@
+"""
+Plaintext layout of an encrypted image (what goes through the AES stream).
+
+Version 1 (legacy, still read):
+    >III h, w, c   then raw uint8 pixels
+
+Version 2:
+    MAGIC (8 bytes) | >I header length | JSON header | body
+
+The JSON header describes the body, e.g.
+    {"kind": "pixels", "shape": [h, w, c], "dtype": "uint8", "codec": "zlib:6"}
+With a codec other than "none" the body is a series of frames, each one
+chunk compressed on its own:  >I length | compressed bytes ... and a
+zero length to finish. Chunks are independent, so compression works with
+the streaming writer and reader and never needs the whole payload.
+"""
+import io
+import json
+import struct
+
+from codebase import constants as const
+
+MAGIC = b"\x89IMGv2\r\n"
+_LENGTH = struct.Struct(">I")
+LEGACY_HEADER_SIZE = 12
+
+
+# ─── Codecs ───────────────────────────────────────────────────
+def _zlib(level):
+    import zlib
+
+    level = 6 if level is None else level
+    return (lambda data: zlib.compress(data, level)), zlib.decompress
+
+
+def _lzma(level):
+    import lzma
+
+    preset = 6 if level is None else level
+    return (lambda data: lzma.compress(data, preset=preset)), lzma.decompress
+
+
+def _lz4(level):
+    try:
+        import lz4.frame
+    except ImportError:
+        raise ValueError("❌ Codec 'lz4' needs the optional 'lz4' package (pip install lz4)")
+
+    level = 0 if level is None else level
+    return (lambda data: lz4.frame.compress(data, compression_level=level)), lz4.frame.decompress
+
+
+def _zstd(level):
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("❌ Codec 'zstd' needs the optional 'zstandard' package (pip install zstandard)")
+
+    level = 3 if level is None else level
+    return zstandard.ZstdCompressor(level=level).compress, zstandard.ZstdDecompressor().decompress
+
+
+CODECS = {"zlib": _zlib, "lzma": _lzma, "lz4": _lz4, "zstd": _zstd}
+
+
+def parse_codec(spec):
+    """``"zlib:9"`` -> ``("zlib", 9)``; ``"none"`` / ``None`` -> ``("none", None)``."""
+    name, _, level = (spec or "none").partition(":")
+    name = name.strip().lower()
+
+    if name != "none" and name not in CODECS:
+        raise ValueError(f"❌ Unknown codec '{spec}'. Choose from: none, {', '.join(CODECS)}")
+    return name, int(level) if level else None
+
+
+def get_codec(spec):
+    """``(compress, decompress)`` callables for a codec spec."""
+    name, level = parse_codec(spec)
+    if name == "none":
+        return None
+    return CODECS[name](level)
+
+
+# ─── Header ───────────────────────────────────────────────────
+def write_header(fp, meta):
+    header = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    fp.write(MAGIC)
+    fp.write(_LENGTH.pack(len(header)))
+    fp.write(header)
+
+
+def read_header(fp):
+    """Read either header version from the decrypted stream; returns the metadata dict."""
+    start = fp.read(LEGACY_HEADER_SIZE)
+
+    if len(start) < LEGACY_HEADER_SIZE:
+        raise ValueError("❌ Decrypted blob too short to contain image header.")
+
+    if start[: len(MAGIC)] != MAGIC:
+        h, w, c = struct.unpack(">III", start)
+        return {"version": 1, "kind": "pixels", "shape": [h, w, c], "dtype": "uint8", "codec": "none"}
+
+    (header_len,) = _LENGTH.unpack(start[len(MAGIC) :])
+    header = fp.read(header_len)
+    if len(header) != header_len:
+        raise ValueError("❌ Decrypted blob too short to contain image header.")
+
+    meta = json.loads(header.decode("utf-8"))
+    meta["version"] = 2
+    return meta
+
+
+def is_v2(first_plain_bytes) -> bool:
+    return first_plain_bytes[: len(MAGIC)] == MAGIC
+
+
+# ─── Streams ──────────────────────────────────────────────────
+class BufferReader(io.RawIOBase):
+    """Minimal read-only stream over a buffer (bytes, mmap, memoryview) without copying it."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        chunk = self._view[self._pos : self._pos + len(b)]
+        memoryview(b).cast("B")[: len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+
+# ─── Compressed Body ──────────────────────────────────────────
+class CompressWriter(io.RawIOBase):
+    """Writable stream that compresses fixed-size chunks into length-prefixed frames."""
+
+    def __init__(self, fp, codec, chunk_size=None):
+        self._fp = fp
+        self._compress, _ = get_codec(codec)
+        self._chunk_size = chunk_size or const.AES_chunk_size
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def _flush_frame(self, data):
+        frame = self._compress(bytes(data))
+        self._fp.write(_LENGTH.pack(len(frame)))
+        self._fp.write(frame)
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        written = len(view)
+
+        if self._buffer:
+            take = min(self._chunk_size - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) < self._chunk_size:
+                return written
+            self._flush_frame(self._buffer)
+            self._buffer.clear()
+
+        while len(view) >= self._chunk_size:
+            self._flush_frame(view[: self._chunk_size])
+            view = view[self._chunk_size :]
+
+        self._buffer += view
+        return written
+
+    def close(self):
+        if not self.closed:
+            if self._buffer:
+                self._flush_frame(self._buffer)
+                self._buffer.clear()
+            self._fp.write(_LENGTH.pack(0))
+        super().close()
+
+
+class DecompressReader(io.RawIOBase):
+    """Readable stream over frames written by ``CompressWriter``."""
+
+    def __init__(self, fp, codec):
+        self._fp = fp
+        _, self._decompress = get_codec(codec)
+        self._buf = memoryview(b"")
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        while not self._buf and not self._eof:
+            prefix = self._fp.read(_LENGTH.size)
+            if len(prefix) != _LENGTH.size:
+                raise ValueError("❌ Compressed payload is truncated.")
+
+            (frame_len,) = _LENGTH.unpack(prefix)
+            if frame_len == 0:
+                self._eof = True
+                return
+
+            frame = self._fp.read(frame_len)
+            if len(frame) != frame_len:
+                raise ValueError("❌ Compressed payload is truncated.")
+            self._buf = memoryview(self._decompress(frame))
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        filled = 0
+
+        while filled < len(view):
+            self._fill()
+            if not self._buf:
+                break
+            count = min(len(self._buf), len(view) - filled)
+            view[filled : filled + count] = self._buf[:count]
+            self._buf = self._buf[count:]
+            filled += count
+
+        return filled
+
+
+def body_writer(fp, codec):
+    """Stream for the body: ``fp`` itself for "none", else a compressing wrapper."""
+    if parse_codec(codec)[0] == "none":
+        return fp
+    return CompressWriter(fp, codec)
+
+
+def body_reader(fp, meta):
+    if parse_codec(meta.get("codec"))[0] == "none":
+        return fp
+    return DecompressReader(fp, meta["codec"])
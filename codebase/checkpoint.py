@@ -0,0 +1,228 @@
+"""
+Checkpoints for resumable Send / Receive (``--resume``).
+
+Each job keeps a journal in ``cache/``: a header line saying what the run was started
+with, then one JSON line per finished image, appended only once its output is complete.
+Outputs (``.bin`` files, decrypted images) are written under a temporary name and
+renamed into place (``util.atomic_path``), so a crash never leaves a half-written file
+under a real name; a direct Send writes into the archive itself, which ``util.reopen_zip``
+cuts back to its last journaled entry. ``--resume`` checks every journaled image (source
+unchanged, output still there with the size it had) and only redoes the rest.
+The Send journal keeps the AES key wrapped under the run's RSA public key, like the archive
+does, so resuming it asks for that run's master code.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from codebase import utility as util
+from codebase import constants as const
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+send_journal_path = BASE_DIR / const.send_journal_path
+receive_journal_path = BASE_DIR / const.receive_journal_path
+
+
+class Journal:
+    """
+    Finished images of one run, by key. Lines are flushed as they are added and fsynced at
+    most every ``const.journal_sync_interval`` seconds; a torn last line is dropped on load.
+    """
+
+    def __init__(self, path, header, records=None):
+        self.path = Path(path)
+        self.header = header
+        self.records = records or {}
+        self._file = None
+        self._synced = 0.0
+
+    @classmethod
+    def load(cls, path, **expected):
+        """The journal at ``path`` when its header matches ``expected``, else ``None`` (nothing to resume)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                records = {}
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    records[record["key"]] = record
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if any(header.get(name) != value for name, value in expected.items()):
+            util.log("[yellow]⚠️  Settings changed since the interrupted run: starting over[/yellow]")
+            return None
+        return cls(path, header, records)
+
+    def start(self):
+        """Rewrite the journal with what is known to be done (dropping a torn tail), then append from there."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.header) + "\n")
+            for record in self.records.values():
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def add(self, key, **fields):
+        record = {"key": key, **fields}
+        self.records[key] = record
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+        now = time.monotonic()
+        if now - self._synced >= const.journal_sync_interval:
+            os.fsync(self._file.fileno())
+            self._synced = now
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """The job finished: nothing left to resume."""
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+
+
+def forget(path):
+    """Drop an old journal: a run without ``--resume`` starts from scratch."""
+    if Path(path).exists():
+        Path(path).unlink()
+
+
+def _source_unchanged(path, record):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stat.st_size == record["size"] and stat.st_mtime_ns == record["mtime_ns"]
+
+
+def _written(path):
+    path = Path(path)
+    return any(path.parent.glob(path.name)) if "*" in path.name else path.exists()
+
+
+# ─── Send ─────────────────────────────────────────────────────
+class SendJournal(Journal):
+    """
+    Keyed by the image's path relative to the input folder. Records hold the source's size and
+    mtime, the entry written and where it ended up: ``offset`` / ``crc`` / ``length`` inside the
+    archive, or the ``.bin`` file's ``length`` when staged.
+    """
+
+    def __init__(self, path=send_journal_path, header=None, records=None):
+        super().__init__(path, header, records)
+        self.archive = None   # set while encrypting straight into an archive
+        self.bin_dir = None   # ... or to the folder staged .bin files go to
+
+    @classmethod
+    def load(cls, path=send_journal_path, **expected):
+        return super().load(path, job="send", **expected)
+
+    @property
+    def public_key(self):
+        return self.header["e"], self.header["n"]
+
+    def aes_key(self, keys) -> bytes:
+        """The interrupted run's AES key, unwrapped with its private key ``keys``."""
+        return util.unwrap_aes_key(self.header["aes_key"], keys)
+
+    def validate(self, src_dir, bin_dir=None):
+        """Keep the records whose source is unchanged and, when staged, whose ``.bin`` is intact."""
+        valid = {}
+        for key, record in self.records.items():
+            if not _source_unchanged(Path(src_dir) / key, record):
+                continue
+            if bin_dir is not None:
+                bin_path = Path(bin_dir) / record["entry"]
+                if not bin_path.exists() or bin_path.stat().st_size != record["length"]:
+                    continue
+            valid[key] = record
+
+        if bin_dir is not None:
+            # Anything staged but not journaled (changed sources, images never finished) is redone
+            # or must not end up in the archive at all
+            entries = {record["entry"] for record in valid.values()}
+            for path in list(Path(bin_dir).rglob("*")):
+                if path.is_file() and path.relative_to(bin_dir).as_posix() not in entries:
+                    path.unlink()
+
+        self.records = valid
+
+    def reopen_archive(self, zip_path):
+        """The interrupted archive, open for appending, holding only the journaled entries still intact."""
+        if not Path(zip_path).exists():
+            self.records = {}
+            return util.open_zip(zip_path, "w")
+
+        located = {record["entry"]: (record["offset"], record["crc"], record["length"]) for record in self.records.values()}
+        archive, kept = util.reopen_zip(zip_path, located)
+        self.records = {key: record for key, record in self.records.items() if record["entry"] in kept}
+        return archive
+
+    def pending(self, images, index, dest_for):
+        """
+        Yield the ``(img_path, relative_path)`` of ``images`` not done yet; those already
+        done go straight into ``index`` (``dest_for(entry)`` is where each one was written).
+        """
+        for img_path, relative_path in images:
+            record = self.records.get(relative_path)
+            if record is None:
+                yield img_path, relative_path
+            else:
+                index.add(dest_for(record["entry"]), record["info"])
+
+    def done(self, src_path, dest, info):
+        stat = os.stat(src_path)
+        record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "info": info}
+
+        if self.archive is not None:
+            entry = str(dest)
+            zinfo = self.archive.getinfo(entry)
+            # The entry reaches the file before the journal says it's there
+            self.archive.fp.flush()
+            record.update(offset=zinfo.header_offset, crc=zinfo.CRC, length=zinfo.compress_size)
+        else:
+            entry = Path(dest).relative_to(self.bin_dir).as_posix()
+            record["length"] = os.path.getsize(dest)
+
+        # Entries are named after the image's relative path (``util.bin_name_for``)
+        self.add(entry[: -len(".bin")], entry=entry, **record)
+
+
+# ─── Receive ──────────────────────────────────────────────────
+class ReceiveJournal(Journal):
+    """Keyed by the output path a job was planned with; records hold the path actually written."""
+
+    def __init__(self, path=receive_journal_path, header=None, records=None):
+        super().__init__(path, header, records)
+
+    @classmethod
+    def load(cls, path=receive_journal_path, **expected):
+        return super().load(path, job="receive", **expected)
+
+    def validate(self):
+        """Keep the records whose output is still there (a pattern for ``.npy`` frame series)."""
+        self.records = {key: record for key, record in self.records.items() if _written(record["path"])}
+
+    def pending(self, jobs):
+        """The ``(source, img_path)`` jobs whose image isn't saved yet."""
+        for source, img_path in jobs:
+            if str(img_path) not in self.records:
+                yield source, img_path
+
+    def done(self, img_path, written):
+        self.add(str(img_path), path=str(written))
@@ -1,3 +1,4 @@
+import os
 
 emojis = ['🔐','🔓', '🗑️', '🚪']
 labels = ['Send','Receive',' Clean-up','Exit']
@@ -10,8 +11,90 @@ clean_up_send = ["keys", "output/bin", "output/receive", "output/send"]
 clean_up_receive = ["keys", "output/bin"]
 clean_up_post = ["output/bin"]
 
+# Input discovery: file types picked up from '/data' (nested folders included)
+image_extensions = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp", ".npy"}
+
+# Batch engine: worker processes and how many images each may have queued ahead
+workers = os.cpu_count() or 1
+worker_backlog = 4
+spool_threshold = 1024 * 1024   # ciphertext a worker hands back in memory; bigger images go through a temp file
+spool_dir = None                # where those temp files go (None: the system temp folder)
+
+# Pipeline engine: items allowed to wait between two stages (backpressure)
+pipeline_depth = 4
+pipeline_bytes = 256 * 1024 * 1024  # ... and how much image / ciphertext data they may hold (one bigger item still passes)
+
+# Payload compression before encryption ("none", "zlib[:level]", "lzma[:preset]", "lz4", "zstd")
+payload_codec = "none"
+
+# Passthrough: encrypt the original file bytes (no decode / re-encode, EXIF & co. kept)
+passthrough = False
+
+# Multi-frame inputs (animated GIF / PNG / WebP, multi-page TIFF): every frame, or only the first
+multi_frame = True
+frame_index = None              # Receive: save just this frame of multi-frame entries (None: all)
+
+# Receive output: format name -> file suffix (None keeps each image's original format)
+output_formats = {"png": ".png", "bmp": ".bmp", "tiff": ".tif", "npy": ".npy", "original": None}
+output_format = "png"
+png_compress_level = 6          # 0 (fastest, biggest) .. 9 (slowest, smallest)
+encode_threads = 2              # image-saving threads in the receive pipeline
+
+# Instrumentation: aggregate progress bar instead of one line per image, redrawn at most this often
+progress = False
+progress_interval = 0.25        # seconds
+metrics_prefix = "image_encryption"  # Prometheus metric names
+
+# Incremental Send: manifest of the last archive (no key: reusing its blobs asks for its master code)
+send_manifest_path = "cache/send_manifest.json"
+previous_archive_path = "cache/previous_archive.zip"
+payload_settings = ["payload_codec", "passthrough", "AES_mode", "tile_size", "multi_frame"]  # blobs are reused only if these match
+
+# Resumable jobs (--resume): journal of finished images per job, written only with --resume
+# (the Send one keeps the AES key RSA-wrapped, like the archive: resuming asks for the master code)
+send_journal_path = "cache/send_journal.jsonl"
+receive_journal_path = "cache/receive_journal.jsonl"
+journal_sync_interval = 1.0     # seconds between fsyncs of the journal
+clean_up_resume = ["keys", "output/receive"]
+
+# Key sessions: public key + QR of the running session (nothing secret: the master code is never stored)
+send_session_path = "cache/send_session.json"
+session_qr_path = "cache/session_qr.png"
+
+# Watch mode (jobs.watch): archives of images encrypted as they arrive, rotated by size or age
+watch_dir = "output/send/watch"
+watch_state_path = "cache/watch_state.json"   # images already in a finished archive
+watch_interval = 0.5            # seconds between looks at the input folder
+watch_settle = 2.0              # seconds a file's size / mtime must hold still before it's read
+watch_rotate_mb = 512
+watch_rotate_minutes = 60
+
+# Settings copied into every worker process (spawned workers don't inherit changes)
+worker_settings = ["spool_threshold", "spool_dir", "payload_codec", "passthrough", "output_format", "png_compress_level", "AES_mode", "AES_threads", "tile_size", "multi_frame", "frame_index"]
+
+# Streaming AES: bytes handed to the cipher per call (multiple of 16)
+AES_chunk_size = 4 * 1024 * 1024
+
+# Cipher for new payloads: "cbc" (serial) or "ctr" (one image split over threads)
+AES_mode = "cbc"
+AES_segment_size = 1024 * 1024  # bytes per CTR segment / thread task (multiple of 16)
+AES_threads = os.cpu_count() or 1
+
+# Tiled payloads: edge of the square tiles (0 = whole image in one piece); always AES-CTR
+tile_size = 0
+
+# RSA key generation
+RSA_public_exponent = 65537
+prime_sieve_limit = 8192        # trial-divide candidates by every prime below this
+prime_mr_rounds = None          # Miller–Rabin rounds per candidate (None: by size)
+prime_pool_size = 4             # primes kept ready per bit size
+prime_pool_on_disk = False      # persist the pool so the next Send doesn't wait on keygen
+prime_pool_path = "cache/primes.json"   # secret key material when on: the next keys are made of these primes
+
 RSA_e = 0
 RSA_d = 0
 RSA_n = 0
+RSA_p = 0
+RSA_q = 0
 
 master_code = ""
@@ -0,0 +1,79 @@
+"""
+Compact index of the master-code dictionary (``data/map.json``).
+
+``data/map.bin`` holds one fixed-width ASCII record per code, at position
+``code - 1000``, behind a small header. It is memory-mapped once per process,
+so a lookup is a slice instead of a JSON parse.
+
+Regenerate it after editing ``map.json``:
+
+    python -m codebase.dictionary
+"""
+import json
+import mmap
+import struct
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+json_path = BASE_DIR / "codebase/data/map.json"
+index_path = BASE_DIR / "codebase/data/map.bin"
+
+FIRST_CODE = 1000
+_MAGIC = b"MAPIDX1\0"
+_HEADER = struct.Struct(">8sHH")  # magic, record width, record count
+
+_index = None
+
+
+def build_index(src_path=json_path, dest_path=index_path):
+    """Compile ``map.json`` into fixed-width records keyed by ``code - FIRST_CODE``."""
+    with open(src_path, "r", encoding="utf-8") as f:
+        lookup = json.load(f)
+
+    codes = sorted(int(code) for code in lookup)
+    if codes != list(range(FIRST_CODE, FIRST_CODE + len(codes))):
+        raise ValueError(f"❌ Dictionary codes must run contiguously from {FIRST_CODE}")
+
+    words = [lookup[str(code)].encode("ascii") for code in codes]
+    width = max(len(word) for word in words)
+
+    with open(dest_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, width, len(words)))
+        for word in words:
+            f.write(word.ljust(width, b"\0"))
+
+    return dest_path
+
+
+def _load():
+    global _index
+
+    if not index_path.exists():
+        build_index()
+
+    with open(index_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, width, count = _HEADER.unpack_from(mapped)
+    if magic != _MAGIC or len(mapped) != _HEADER.size + width * count:
+        raise ValueError(f"❌ Corrupt dictionary index: {index_path}")
+
+    _index = (mapped, width, count)
+    return _index
+
+
+def lookup(code: str) -> str:
+    """Word for a 4-digit code chunk; ``KeyError`` if the dictionary has none."""
+    mapped, width, count = _index or _load()
+
+    slot = int(code) - FIRST_CODE
+    if not 0 <= slot < count:
+        raise KeyError(code)
+
+    start = _HEADER.size + slot * width
+    return mapped[start : start + width].rstrip(b"\0").decode("ascii")
+
+
+if __name__ == "__main__":
+    print(f"Index written to {build_index()}")
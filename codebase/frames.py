@@ -0,0 +1,196 @@
+"""
+Multi-frame payloads: animated GIF / PNG / WebP and multi-page TIFF in one blob.
+
+    v2 header   {"kind": "frames", "frames": n, "format": "TIFF", "loop": ..., "codec": ...}
+    per frame   >I length | frame header JSON {"shape", "mode", "dtype", palette..., "duration", "size"}
+                then "size" bytes of pixels (length-prefixed compressed chunks when a codec is set)
+    end         >I 0
+
+Frames are pulled from the source and written one at a time, and read back the
+same way, so memory holds one frame however many pages a scan has. Every frame
+header carries the size of its body: ``FrameSequence.frame`` hops from header to
+header and, with AES-CTR, decrypts nothing but those headers and the frame asked
+for (CBC payloads are decrypted up to it).
+"""
+import io
+import json
+import struct
+
+from codebase import rsa
+from codebase import blob
+from codebase import constants as const
+
+_LENGTH = struct.Struct(">I")
+
+# Sources whose frames are independent pages (kept in their own size and mode)
+# rather than the frames of one animation
+PAGE_FORMATS = {"TIFF", "MPO"}
+
+
+def is_pages(meta) -> bool:
+    return meta.get("format") in PAGE_FORMATS
+
+
+def _frame_bytes(meta):
+    import numpy as np
+
+    h, w, c = meta["shape"]
+    return h * w * c * np.dtype(meta.get("dtype", "uint8")).itemsize
+
+
+# ─── Send Side ────────────────────────────────────────────────
+def write_frames(fp, key, header, frames, codec, mode=None):
+    """
+    Encrypt a multi-frame payload into ``fp``. ``frames`` yields ``(meta, chunks)`` per frame:
+    its header fields and its raw pixel bytes in pieces, all read before the next frame is pulled.
+    ``mode`` is the cipher ("cbc" or "ctr", default ``const.AES_mode``).
+    """
+    header = {"kind": "frames", **header, "codec": codec}
+    compressed = blob.parse_codec(codec)[0] != "none"
+
+    with rsa.encrypt_stream(fp, key, mode) as writer:
+        blob.write_header(writer, header)
+
+        for meta, chunks in frames:
+            if compressed:
+                # Compressed size is only known afterwards: build the (one) frame body in memory
+                buffer = io.BytesIO()
+                with blob.CompressWriter(buffer, codec) as body:
+                    for chunk in chunks:
+                        body.write(chunk)
+                chunks, size = [buffer.getbuffer()], buffer.tell()
+            else:
+                size = _frame_bytes(meta)
+
+            data = json.dumps({**meta, "size": size}, separators=(",", ":")).encode("utf-8")
+            writer.write(_LENGTH.pack(len(data)))
+            writer.write(data)
+            for chunk in chunks:
+                writer.write(chunk)
+
+        writer.write(_LENGTH.pack(0))
+
+
+# ─── Receive Side ─────────────────────────────────────────────
+def _read_exact(reader, size):
+    data = reader.read(size)
+    if len(data) != size:
+        raise ValueError("❌ Multi-frame payload is truncated.")
+    return data
+
+
+def _next_header(reader):
+    """Header of the next frame, or ``None`` at the end of the payload."""
+    (length,) = _LENGTH.unpack(_read_exact(reader, _LENGTH.size))
+    if length == 0:
+        return None
+    return json.loads(_read_exact(reader, length))
+
+
+def _read_pixels(reader, frame, codec):
+    import numpy as np
+
+    pixels = np.empty(frame["shape"], dtype=np.dtype(frame.get("dtype", "uint8")))
+    body = blob.body_reader(reader, {"codec": codec})
+
+    if body is reader:
+        actual_size = reader.readinto(pixels)
+    else:
+        actual_size = body.readinto(pixels) + len(body.read())
+
+    if actual_size != pixels.nbytes:
+        raise ValueError(f"❌ Mismatch in frame size: expected {pixels.nbytes}, got {actual_size}")
+    return pixels
+
+
+def _skip(reader, size):
+    if isinstance(reader, _RangeReader):
+        reader.pos += size
+        return
+    while size:
+        size -= len(_read_exact(reader, min(size, const.AES_chunk_size)))
+
+
+def read_stream(reader, meta):
+    """Yield ``(frame meta, pixels)`` per frame from a decrypting stream positioned after the header."""
+    while True:
+        frame = _next_header(reader)
+        if frame is None:
+            return
+        yield frame, _read_pixels(reader, frame, meta.get("codec"))
+
+
+def read_frame(reader, meta, index):
+    """
+    ``(meta, pixels)`` of frame ``index``, the meta shaped like that of a single image.
+    The bodies of the frames before it are skipped, not decoded.
+    """
+    if not 0 <= index < meta["frames"]:
+        raise ValueError(f"❌ Frame {index} is out of range ({meta['frames']} frames)")
+
+    for i in range(index + 1):
+        frame = _next_header(reader)
+        if frame is None:
+            raise ValueError("❌ Multi-frame payload is truncated.")
+        if i < index:
+            _skip(reader, frame["size"])
+
+    return {"kind": "pixels", **frame}, _read_pixels(reader, frame, meta.get("codec"))
+
+
+class _RangeReader:
+    # Sequential reads over a CTR payload in a buffer; skipping ahead costs nothing
+    def __init__(self, view, key):
+        self._view = view
+        self._key = key
+        self.pos = 0
+
+    def read(self, size):
+        data = rsa.ctr_decrypt_range(self._view, self._key, self.pos, size)
+        self.pos += len(data)
+        return bytes(data)
+
+    def readinto(self, b):
+        view = memoryview(b).cast("B")
+        view[:] = self.read(len(view))
+        return len(view)
+
+
+class FrameSequence:
+    """
+    Frames of a multi-frame payload held in a buffer (bytes, mmap, a STORED zip entry).
+    Iterating decrypts one frame at a time; ``frame(i)`` decrypts a single one.
+    """
+
+    def __init__(self, ciphertext, key: bytes):
+        self._view = memoryview(ciphertext).cast("B")
+        self._key = key
+
+        with self._stream() as reader:
+            self.meta = blob.read_header(reader)
+        if self.meta["kind"] != "frames":
+            raise ValueError(f"❌ Not a multi-frame payload (kind '{self.meta['kind']}').")
+        self.count = self.meta["frames"]
+
+    def _stream(self):
+        return rsa.decrypt_stream(blob.BufferReader(self._view), self._key)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        with self._stream() as reader:
+            blob.read_header(reader)
+            yield from read_stream(reader, self.meta)
+
+    def frame(self, index: int):
+        """``(meta, pixels)`` of frame ``index`` (see ``read_frame``)."""
+        if rsa.is_ctr(self._view):
+            # Counter mode: hop from frame header to frame header, decrypting nothing in between
+            reader = _RangeReader(self._view, self._key)
+            blob.read_header(reader)
+            return read_frame(reader, self.meta, index)
+
+        with self._stream() as reader:
+            blob.read_header(reader)
+            return read_frame(reader, self.meta, index)
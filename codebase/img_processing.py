@@ -1,91 +1,677 @@
-from PIL import Image
-import numpy as np
 import struct
+import io
+import itertools
+import mmap
+import shutil
 from pathlib import Path
-import time
 
 from codebase import rsa
+from codebase import blob
+from codebase import tiled
+from codebase import frames
+from codebase import metrics
 from codebase import utility as util
 from codebase import constants as const
 
+# PIL and numpy are imported where used, so the jobs reach their menus / first image sooner
+
 
 # Get the path to the current script (img_processing.py)
 BASE_DIR = Path(__file__).resolve().parent.parent  # go to IMG ENCRYPTION root
 
 
 
-def img_to_bin(src_path, dest_path):
-    try:
-        enc_start_time = time.time()
-        # Load the image
-        img = Image.open(src_path).convert("RGB")
-        img_arr = np.asarray(img)  # shape: (height, width, 3)
-        img.close()
+# PIL mode -> (dtype, channels, mode the pixels are stored in) for images kept as they are.
+# Anything else is converted to RGB / RGBA first.
+_NATIVE_MODES = {
+    "1": ("uint8", 1, "L"),  # bilevel, stored as 0 / 255 bytes
+    "L": ("uint8", 1, "L"),
+    "LA": ("uint8", 2, "LA"),
+    "P": ("uint8", 1, "P"),  # palette indices, the palette itself goes in the header
+    "RGB": ("uint8", 3, "RGB"),
+    "RGBA": ("uint8", 4, "RGBA"),
+    "CMYK": ("uint8", 4, "CMYK"),
+    "I;16": ("<u2", 1, "I;16"),
+    "I;16B": (">u2", 1, "I;16B"),
+    "I": ("=i4", 1, "I"),  # host byte order, as PIL keeps them
+    "F": ("=f4", 1, "F"),
+}
 
-        h, w, c = img_arr.shape
-        flat = img_arr.flatten()  # shape: (h * w * c,)
+# Modes each output format holds losslessly; other images are saved as TIFF instead
+_FORMAT_MODES = {
+    ".png": {"1", "L", "LA", "P", "RGB", "RGBA", "I;16", "I;16B"},
+    ".bmp": {"1", "L", "P", "RGB"},
+    ".jpg": set(),   # JPEG re-encoding is lossy whatever the mode (--passthrough keeps the original bytes)
+    ".jpeg": set(),
+    ".gif": {"L", "P"},
+}
 
-        header = struct.pack(">III", h, w, c)
-        payload = flat.tobytes()
-        binary_blob = header + payload  # 12-byte header + raw image data
 
-        encrypted_blob = rsa.aes_encrypt(binary_blob, const.AES_key)
+def _transparency_to_json(value):
+    # tRNS data is an index, a colour tuple, or raw per-index alpha bytes
+    if isinstance(value, bytes):
+        return value.hex()
+    return list(value) if isinstance(value, tuple) else value
 
-        with open(dest_path, "wb") as f:
-            f.write(encrypted_blob)
 
-        enc_end_time = time.time()
-        encryption_time = enc_end_time - enc_start_time
+def _transparency_from_json(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value)
+    return tuple(value) if isinstance(value, list) else value
 
-        util.log(
-            f"🔒 Encrypted Image in [bold cyan]{util.format_time(encryption_time)}[/bold cyan] ⏱   ---  📂 : [grey50]{src_path}[/grey50]\n"
-        )
 
-    except FileNotFoundError:
-        print(f"❌ Error: File not found at path: '{src_path}'")
-    except IOError as err:
-        print(f"❌ Error: Cannot open image. Reason: {err}")
+def _native_layout(img):
+    """``(img, meta)``: ``img`` in the mode its pixels are stored in, plus the header fields describing it."""
+    import numpy as np
 
+    mode = img.mode
+    if mode not in _NATIVE_MODES:
+        mode = "RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB"
+        img = img.convert(mode)
 
-def bin_to_img(src_path, dest_path):
-    try:
+    dtype, channels, stored = _NATIVE_MODES[mode]
+    meta = {"mode": mode, "dtype": np.dtype(dtype).str}
+
+    if mode == "P":
+        meta["palette_mode"] = img.palette.mode
+        meta["palette"] = bytes(img.getpalette(img.palette.mode)).hex()
+    if "transparency" in img.info:
+        meta["transparency"] = _transparency_to_json(img.info["transparency"])
+
+    if stored != mode:
+        img = img.convert(stored)
+    return img, meta
+
+
+def _row_strips(img, chunk_size, row_bytes=None):
+    """Yield the raw bytes of ``img`` a few rows at a time (about ``chunk_size`` each)."""
+    w, h = img.size
+    row_bytes = row_bytes or w * len(img.getbands())
+    rows = max(1, chunk_size // max(row_bytes, 1))
+
+    for top in range(0, h, rows):
+        yield img.crop((0, top, w, min(top + rows, h))).tobytes()
+
+
+def _begin_pixels(writer, shape, codec, meta=None):
+    """
+    Write the payload header into ``writer`` and return the stream the pixels go to.
+    ``meta`` carries the mode / dtype / palette fields of ``_native_layout``.
+    """
+    plain_rgb = meta is None or meta == {"mode": "RGB", "dtype": "|u1"}
+
+    if plain_rgb and blob.parse_codec(codec)[0] == "none":
+        # Uncompressed 8-bit: the plain 12-byte header every version can read
+        writer.write(struct.pack(">III", *shape))
+        return writer
+
+    header = {"kind": "pixels", "shape": list(shape), "dtype": "uint8"}
+    header.update(meta or {})
+    header["codec"] = codec
+
+    blob.write_header(writer, header)
+    return blob.body_writer(writer, codec)
+
+
+def write_encrypted_pil(img, fp, key=None, codec=None, tile=None, all_frames=None, mode=None):
+    """
+    Encrypt a PIL image into the writable binary stream ``fp``, in its own pixel mode
+    (grayscale, palette, alpha and 16-bit images are not widened to RGB).
+    ``key`` defaults to the session key, ``codec`` to ``const.payload_codec``,
+    ``tile`` (edge length of square tiles, 0 for none) to ``const.tile_size`` and the
+    cipher ``mode`` ("cbc" or "ctr"; tiles are always CTR) to ``const.AES_mode``.
+    Multi-frame images keep all their frames when ``all_frames`` (default ``const.multi_frame``)
+    is set; tiles only apply to single images.
+    Returns what the archive index records about it: kind, shape and mode.
+    """
+    import numpy as np
+
+    all_frames = const.multi_frame if all_frames is None else all_frames
+    if all_frames and getattr(img, "n_frames", 1) > 1:
+        return write_encrypted_frames(img, fp, key, codec, mode)
+
+    img, meta = _native_layout(img)
+
+    w, h = img.size
+    c = _NATIVE_MODES[meta["mode"]][1]
+    row_bytes = w * c * np.dtype(meta["dtype"]).itemsize
+
+    tile = const.tile_size if tile is None else tile
+    info = {"kind": "tiles" if tile else "pixels", "shape": [h, w, c], "mode": meta["mode"]}
+    if tile:
+        read_box = lambda y0, y1, x0, x1: img.crop((x0, y0, x1, y1)).tobytes()
+        tiled.write_tiles(fp, key or const.AES_key, (h, w, c), read_box, meta, (tile, tile), codec or const.payload_codec)
+        return info
+
+    # Header + raw image data, streamed through the cipher a strip at a time
+    with rsa.encrypt_stream(fp, key or const.AES_key, mode) as writer:
+        body = _begin_pixels(writer, (h, w, c), codec or const.payload_codec, meta)
+        for strip in _row_strips(img, const.AES_chunk_size, row_bytes):
+            body.write(strip)
+        if body is not writer:
+            body.close()
+    return info
+
+
+def _frame_records(img, info):
+    """``(meta, strips)`` per frame of ``img``, decoded one at a time; the first frame's layout goes into ``info``."""
+    from PIL import ImageSequence
+    import numpy as np
+
+    # Animation frames share the first frame's mode (PIL hands out a GIF's frames as P, then
+    # RGB / RGBA: those are all stored as RGBA); the pages of a document keep their own
+    shared = None
+    for frame in ImageSequence.Iterator(img):
+        duration = frame.info.get("duration")
+
+        if img.format not in frames.PAGE_FORMATS:
+            shared = shared or ("RGBA" if img.format == "GIF" else frame.mode)
+            if frame.mode != shared:
+                frame = frame.convert(shared)
+
+        frame, meta = _native_layout(frame)
+        w, h = frame.size
+        c = _NATIVE_MODES[meta["mode"]][1]
+        meta["shape"] = [h, w, c]
+        if duration is not None:
+            meta["duration"] = duration
+
+        if "shape" not in info:
+            info.update(shape=meta["shape"], mode=meta["mode"])
+        yield meta, _row_strips(frame, const.AES_chunk_size, w * c * np.dtype(meta["dtype"]).itemsize)
+
+
+def write_encrypted_frames(img, fp, key=None, codec=None, mode=None):
+    """
+    Encrypt every frame of a multi-frame PIL image (animated GIF / PNG / WebP, multi-page TIFF)
+    into ``fp`` as one payload, decoding and encrypting one frame at a time (see ``codebase.frames``).
+    """
+    header = {"frames": img.n_frames, "format": img.format}
+    if "loop" in img.info:
+        header["loop"] = img.info["loop"]
+
+    info = {"kind": "frames", "frames": img.n_frames}
+    frames.write_frames(fp, key or const.AES_key, header, _frame_records(img, info), codec or const.payload_codec, mode)
+    return info
+
+
+def write_encrypted_array(image_array, fp, key=None, codec=None, tile=None, mode=None):
+    """
+    Encrypt a ``uint8`` array of shape ``(h, w)`` or ``(h, w, c)`` into ``fp``.
+    A numpy memmap is read tile by tile (or streamed through) and never loaded whole.
+    """
+    import numpy as np
 
-        dec_start_time = time.time()
+    if image_array.dtype != np.uint8 or image_array.ndim not in (2, 3):
+        raise ValueError(f"❌ Expected a uint8 (h, w[, c]) array, got {image_array.dtype} {image_array.shape}")
 
-        with open(src_path, "rb") as f:
-            encrypted_blob = f.read()
+    h, w = image_array.shape[:2]
+    c = image_array.shape[2] if image_array.ndim == 3 else 1
 
-        decrypted_blob = rsa.aes_decrypt(encrypted_blob, const.AES_key)
+    tile = const.tile_size if tile is None else tile
+    info = {"kind": "tiles" if tile else "pixels", "shape": [h, w, c]}
+    if tile:
+        read_box = lambda y0, y1, x0, x1: np.ascontiguousarray(image_array[y0:y1, x0:x1]).tobytes()
+        tiled.write_tiles(fp, key or const.AES_key, (h, w, c), read_box, {}, (tile, tile), codec or const.payload_codec)
+        return info
 
-        if len(decrypted_blob) < 12:
-            raise ValueError("❌ Decrypted blob too short to contain image header.")
+    image_array = np.ascontiguousarray(image_array)
 
-        h, w, c = struct.unpack(">III", decrypted_blob[:12])
+    with rsa.encrypt_stream(fp, key or const.AES_key, mode) as writer:
+        body = _begin_pixels(writer, (h, w, c), codec or const.payload_codec)
+        body.write(image_array)
+        if body is not writer:
+            body.close()
+    return info
 
-        flat_data = np.frombuffer(decrypted_blob[12:], dtype=np.uint8)
 
-        expected_size = h * w * c
-        actual_size = flat_data.size
+def write_encrypted_image(src_path, fp, key=None, codec=None, tile=None):
+    """
+    Encrypt the image at ``src_path`` (or any file-like PIL can open) into ``fp``.
+    PIL decodes it whole, tiled or not: only ``.npy`` inputs are read a tile at a time.
+    """
+    from PIL import Image
 
-        if actual_size != expected_size:
-            raise ValueError(
-                f"❌ Mismatch in data size: expected {expected_size}, got {actual_size}"
-            )
+    with metrics.timer("load"):
+        img = Image.open(src_path)
+        img.load()
+    with metrics.timer("encrypt"):
+        # Further frames of a multi-frame image are decoded in here, as they are encrypted
+        info = write_encrypted_pil(img, fp, key, codec, tile)
+    img.close()
+    return info
 
-        image_array = flat_data.reshape((h, w, c))
-        img = Image.fromarray(image_array)
-        img.save(dest_path)
 
-        dec_end_time = time.time()
-        decryption_time = dec_end_time - dec_start_time
+def write_encrypted_file(src, fp, key=None, codec=None, ext=None):
+    """
+    Passthrough: encrypt the file ``src`` (a path or readable binary stream) byte for byte,
+    without decoding it. Receive restores the exact original file, extension included.
+    """
+    if isinstance(src, (str, Path)):
+        ext = Path(src).suffix if ext is None else ext
+        with open(src, "rb") as f:
+            return write_encrypted_file(f, fp, key, codec, ext)
 
-        util.log(
-            f"\n🔓 Decrypted Image in [bold cyan]{util.format_time(decryption_time)}[/bold cyan] ⏱   ---  📂 : [yellow]{dest_path}[/yellow]\n"
+    size = src.seek(0, io.SEEK_END)
+    src.seek(0)
+    codec = codec or const.payload_codec
+
+    with rsa.encrypt_stream(fp, key or const.AES_key) as writer:
+        blob.write_header(writer, {"kind": "file", "ext": ext or "", "size": size, "codec": codec})
+        body = blob.body_writer(writer, codec)
+        shutil.copyfileobj(src, body, const.AES_chunk_size)
+        if body is not writer:
+            body.close()
+    return {"kind": "file", "ext": ext or "", "size": size}
+
+
+def load_array(src_path):
+    """Memory-map a ``.npy`` input, so big arrays are read piece by piece."""
+    import numpy as np
+
+    return np.load(src_path, mmap_mode="r")
+
+
+def write_encrypted_source(src_path, fp):
+    """Encrypt ``src_path`` the way this run asks for: decoded pixels, or the file as-is (passthrough)."""
+    if const.passthrough:
+        with metrics.timer("encrypt"):
+            return write_encrypted_file(src_path, fp)
+    elif str(src_path).lower().endswith(".npy"):
+        with metrics.timer("encrypt"):
+            return write_encrypted_array(load_array(src_path), fp)
+    else:
+        return write_encrypted_image(src_path, fp)
+
+
+def _read_body(reader, meta):
+    """The decrypted body: a pixel array, or the original file bytes for passthrough entries."""
+    import numpy as np
+
+    if meta["kind"] == "tiles":
+        return tiled.read_stream(reader, meta)
+
+    body = blob.body_reader(reader, meta)
+
+    if meta["kind"] == "file":
+        data = body.read()
+        expected_size, actual_size = meta["size"], len(data)
+    else:
+        h, w, c = meta["shape"]
+
+        # Decrypt (and decompress) straight into the final pixel buffer
+        data = np.empty((h, w, c), dtype=np.dtype(meta.get("dtype", "uint8")))
+
+        expected_size = data.nbytes
+        actual_size = body.readinto(data) + len(body.read())
+
+    if actual_size != expected_size:
+        raise ValueError(
+            f"❌ Mismatch in data size: expected {expected_size}, got {actual_size}"
         )
 
-    except FileNotFoundError:
+    return data
+
+
+def decrypt_array(fp, key=None):
+    """Decrypt an encrypted image from the readable binary stream ``fp`` into an ``(h, w, c)`` array."""
+    with rsa.decrypt_stream(fp, key or const.AES_key) as reader:
+        meta = blob.read_header(reader)
+        if meta["kind"] == "file":
+            raise ValueError(f"❌ Entry holds a passthrough '{meta.get('ext')}' file, not pixels")
+        if meta["kind"] == "frames":
+            raise ValueError(f"❌ Entry holds {meta['frames']} frames, not one image (see frames.FrameSequence)")
+
+        return _read_body(reader, meta)
+
+
+def decrypt_mapped_array(ciphertext, key=None):
+    """Decrypt an encrypted image held in a buffer (bytes, mmap) into an ``(h, w, c)`` array."""
+    if blob.is_v2(rsa.aes_peek(ciphertext, key or const.AES_key)):
+        # Compressed / versioned payloads are decoded through the streaming reader
+        return decrypt_array(blob.BufferReader(ciphertext), key)
+
+    decrypted = rsa.aes_decrypt_mapped(ciphertext, key or const.AES_key, 12)
+
+    if decrypted is None:
+        # Too small to bother mapping: fall back to the streaming reader
+        return decrypt_array(io.BytesIO(ciphertext), key)
+
+    header, flat_data = decrypted
+    h, w, c = struct.unpack(">III", header)
+
+    expected_size = h * w * c
+    actual_size = flat_data.size
+
+    if actual_size != expected_size:
+        raise ValueError(
+            f"❌ Mismatch in data size: expected {expected_size}, got {actual_size}"
+        )
+
+    # A view over the decrypted buffer, not a copy
+    return flat_data.reshape((h, w, c))
+
+
+def decrypt_payload(ciphertext, key=None):
+    """
+    Decrypt any entry held in a buffer. Returns ``(meta, value)``: value is the pixel
+    array (plain or tiled), the original file bytes when ``meta["kind"] == "file"`` (passthrough),
+    or a ``frames.FrameSequence`` that decrypts frame by frame when ``meta["kind"] == "frames"``.
+    """
+    key = key or const.AES_key
+
+    if not blob.is_v2(rsa.aes_peek(ciphertext, key)):
+        return {"kind": "pixels"}, decrypt_mapped_array(ciphertext, key)
+
+    with rsa.decrypt_stream(blob.BufferReader(ciphertext), key) as reader:
+        meta = blob.read_header(reader)
+        if meta["kind"] == "frames":
+            return meta, frames.FrameSequence(ciphertext, key)
+        return meta, _read_body(reader, meta)
+
+
+def restored_path(src_name, dest_path, ext):
+    """
+    Where a passthrough file goes: its original name (the entry name minus '.bin')
+    next to ``dest_path``, or ``dest_path`` with the recorded extension.
+    """
+    original = Path(src_name).name if src_name else ""
+    original = original[: -len(".bin")] if original.endswith(".bin") else original
+
+    if original and Path(original).suffix.lower() == ext.lower():
+        return str(Path(dest_path).with_name(original))
+    return str(Path(dest_path).with_suffix(ext))
+
+
+def _npy_pixels(value, meta):
+    import numpy as np
+
+    if meta.get("mode") == "P":
+        value = np.asarray(array_to_pil(value, meta).convert(meta["palette_mode"]))
+    return value
+
+
+def save_payload(meta, value, src_name, dest_path):
+    """Write a decrypted entry out; returns the path actually written."""
+    if meta["kind"] == "file":
+        dest_path = restored_path(src_name, dest_path, meta["ext"])
+        with util.atomic_write(dest_path) as f:
+            f.write(value)
+        return dest_path
+
+    if meta["kind"] == "frames":
+        if const.frame_index is None:
+            return save_frames(meta, value, dest_path)
+        meta, value = value.frame(const.frame_index)
+
+    suffix = Path(dest_path).suffix.lower()
+
+    if suffix == ".npy":
+        # Raw arrays for consumers that never look at an image file
+        import numpy as np
+
+        with util.atomic_path(dest_path) as tmp_path:
+            np.save(tmp_path, _npy_pixels(value, meta))
+        return dest_path
+
+    img = array_to_pil(value, meta)
+    if not _FORMAT_MODES.get(suffix, {img.mode}):
+        # Lossy formats (JPEG): 'x.jpg' comes back as 'x.jpg.png', never over a real 'x.png'
+        dest_path, suffix = str(dest_path) + ".png", ".png"
+    if img.mode not in _FORMAT_MODES.get(suffix, {img.mode}):
+        # e.g. CMYK, 32-bit or float pixels don't fit in a PNG without loss
+        dest_path, suffix = str(Path(dest_path).with_suffix(".tif")), ".tif"
+
+    with util.atomic_path(dest_path) as tmp_path:
+        img.save(tmp_path, **_save_options(suffix))
+    return dest_path
+
+
+# Formats PIL writes animations in; unlike TIFF pages, they are not written frame by frame
+_ANIMATION_FORMATS = {".png": "PNG", ".gif": "GIF", ".webp": "WEBP"}
+
+
+def _frame_image(frame, pixels):
+    img = array_to_pil(pixels, frame)
+    if "duration" in frame:
+        img.info["duration"] = frame["duration"]
+    return img
+
+
+def save_frames(meta, sequence, dest_path):
+    """
+    Rebuild a multi-frame image from ``sequence`` (``(frame meta, pixels)`` pairs, e.g. a
+    ``frames.FrameSequence``); returns the path written. Pages and anything the output format can't
+    animate losslessly go to a multi-page TIFF, written one page at a time; ``.npy`` output
+    is one array file per frame (``<name>_0000.npy``, ...).
+    """
+    from PIL import TiffImagePlugin
+
+    dest = Path(dest_path)
+    suffix = dest.suffix.lower()
+    sequence = iter(sequence)
+
+    if suffix == ".npy":
+        import numpy as np
+
+        for i, (frame, pixels) in enumerate(sequence):
+            with util.atomic_path(dest.with_name(f"{dest.stem}_{i:04d}.npy")) as tmp_path:
+                np.save(tmp_path, _npy_pixels(pixels, frame))
+        return str(dest.with_name(f"{dest.stem}_*.npy"))
+
+    images = (_frame_image(frame, pixels) for frame, pixels in sequence)
+    first = next(images, None)
+    if first is None:
+        raise ValueError("❌ Multi-frame payload holds no frames.")
+
+    animated = suffix in _ANIMATION_FORMATS and not frames.is_pages(meta)
+    if animated and (meta.get("format") == _ANIMATION_FORMATS[suffix] or first.mode in _FORMAT_MODES.get(suffix, {first.mode})):
+        options = _save_options(suffix)
+        if "loop" in meta:
+            options["loop"] = meta["loop"]
+        # PIL's animation writers go over the frames more than once and keep them all anyway
+        with util.atomic_path(dest) as tmp_path:
+            first.save(tmp_path, save_all=True, append_images=list(images), **options)
+        return str(dest)
+
+    if suffix not in (".tif", ".tiff"):
+        dest = dest.with_suffix(".tif")
+    with util.atomic_path(dest) as tmp_path:
+        with open(tmp_path, "w+b") as f, TiffImagePlugin.AppendingTiffWriter(f) as tiff:
+            for img in itertools.chain([first], images):
+                img.save(tiff, format="TIFF")
+                tiff.newFrame()
+    return str(dest)
+
+
+def _save_options(suffix):
+    if suffix == ".png":
+        return {"compress_level": const.png_compress_level}
+    if suffix == ".webp":
+        return {"lossless": True}
+    return {}
+
+
+def array_to_pil(image_array, meta=None):
+    """PIL image for decrypted pixels; ``meta`` (the payload header) restores mode and palette."""
+    from PIL import Image
+    import numpy as np
+
+    mode = meta.get("mode") if meta else None
+
+    if mode is None:
+        # Legacy / API payloads: the mode follows from the channel count
+        if image_array.shape[2] == 1:
+            image_array = image_array[:, :, 0]
+        return Image.fromarray(image_array)
+
+    stored = _NATIVE_MODES[mode][2]
+    if mode in ("I", "F"):
+        # Written in the sender's byte order
+        image_array = image_array.astype(image_array.dtype.newbyteorder("="), copy=False)
+
+    h, w = image_array.shape[:2]
+    img = Image.frombuffer(stored, (w, h), np.ascontiguousarray(image_array), "raw", stored, 0, 1)
+
+    if mode == "1":
+        img = img.convert("1", dither=Image.Dither.NONE)
+    if mode == "P":
+        img.putpalette(bytes.fromhex(meta["palette"]), meta["palette_mode"])
+    if "transparency" in meta:
+        img.info["transparency"] = _transparency_from_json(meta["transparency"])
+    return img
+
+
+def read_encrypted_image(fp, dest_path, src_name=None):
+    """
+    Decrypt an encrypted entry from the readable binary stream ``fp`` and save it to ``dest_path``
+    (passthrough files keep their original name, see ``restored_path``). Returns the path written.
+    """
+    with metrics.timer("decrypt"), rsa.decrypt_stream(fp, const.AES_key) as reader:
+        meta = blob.read_header(reader)
+        if meta["kind"] != "frames":
+            value = _read_body(reader, meta)
+        elif const.frame_index is not None:
+            meta, value = frames.read_frame(reader, meta, const.frame_index)
+        else:
+            # Frames are saved as they are decrypted, while the stream is open (all timed as decrypt)
+            return save_frames(meta, frames.read_stream(reader, meta), dest_path)
+
+    with metrics.timer("save"):
+        return save_payload(meta, value, src_name, dest_path)
+
+
+def _map_file(path):
+    # The mapping outlives the file handle and is unmapped once the last view is dropped
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_mapped_image(ciphertext, dest_path, src_name=None):
+    """
+    Decrypt an encrypted entry held in a buffer (mmap) and save it; returns the path written.
+    Multi-frame entries are decrypted frame by frame while they are saved (timed as save).
+    """
+    with metrics.timer("decrypt"):
+        meta, value = decrypt_payload(ciphertext)
+    with metrics.timer("save"):
+        return save_payload(meta, value, src_name, dest_path)
+
+
+def encrypt_image(src_path, dest_path):
+    """Encrypt the image at ``src_path`` into ``dest_path``; returns ``(sample, info)`` (see ``write_encrypted_pil``)."""
+    with metrics.collecting() as sample:
+        with util.atomic_write(dest_path) as f:
+            info = write_encrypted_source(src_path, f)
+            metrics.add_bytes(f.tell())
+
+    return sample, info
+
+
+def encrypt_image_to_zip(archive, src_path, arcname):
+    """Encrypt the image at ``src_path`` straight into entry ``arcname`` of the open ``archive``; returns ``(sample, info)``."""
+    with metrics.collecting() as sample:
+        with util.open_zip_entry(archive, arcname, "w") as f:
+            info = write_encrypted_source(src_path, f)
+        metrics.add_bytes(archive.getinfo(str(arcname)).file_size)
+
+    return sample, info
+
+
+def encrypt_image_to_spool(src_path, arcname):
+    """
+    Encrypt the image at ``src_path`` for the parent process to store; returns ``(sample, info, spooled)``,
+    ``spooled`` being the ciphertext when small, else the temp file holding it (see ``util.Spool``).
+    """
+    with metrics.collecting() as sample:
+        with util.Spool() as spool:
+            info = write_encrypted_source(src_path, spool)
+        metrics.add_bytes(spool.size)
+
+    return sample, info, spool.result()
+
+
+def decrypt_image(src_path, dest_path):
+    """Decrypt the ``.bin`` at ``src_path`` into an image at ``dest_path``; returns ``(sample, path written)``."""
+    with metrics.collecting() as sample:
+        ciphertext = _map_file(src_path)
+        metrics.add_bytes(len(ciphertext))
+        dest_path = read_mapped_image(ciphertext, dest_path, src_path)
+
+    return sample, dest_path
+
+
+def decrypt_zip_entry(entry, dest_path):
+    """
+    Decrypt ``entry`` = ``(zip_path, arcname)`` straight out of the archive; returns ``(sample, path written)``.
+    ``(zip_path, arcname, offset, length)`` (located through the archive index) skips the central directory.
+    """
+    with metrics.collecting() as sample:
+        zip_path, arcname, *located = entry
+        mm = _map_file(zip_path)
+
+        if located:
+            metrics.add_bytes(located[1])
+            dest_path = read_mapped_image(util.located_entry(mm, *located, arcname), dest_path, arcname)
+        else:
+            archive = util.open_zip(zip_path)
+            metrics.add_bytes(archive.getinfo(str(arcname)).file_size)
+            span = util.zip_entry_span(archive, arcname, mm)
+
+            if span is None:
+                with util.open_zip_entry(archive, arcname, "r") as entry_fp:
+                    dest_path = read_encrypted_image(entry_fp, dest_path, arcname)
+            else:
+                # STORED entry: decrypt its bytes in place from the mapped archive
+                offset, size = span
+                dest_path = read_mapped_image(memoryview(mm)[offset : offset + size], dest_path, arcname)
+
+    return sample, dest_path
+
+
+def log_encrypted(src_path, sample):
+    metrics.reporter.record(src_path, sample)
+    if const.progress:
+        return
+    util.log(
+        f"🔒 Encrypted Image in [bold cyan]{util.format_time(sample.total)}[/bold cyan] ⏱   ---  📂 : [grey50]{src_path}[/grey50]\n"
+    )
+
+
+def log_decrypted(dest_path, sample):
+    metrics.reporter.record(dest_path, sample)
+    if const.progress:
+        return
+    util.log(
+        f"\n🔓 Decrypted Image in [bold cyan]{util.format_time(sample.total)}[/bold cyan] ⏱   ---  📂 : [yellow]{dest_path}[/yellow]\n"
+    )
+
+
+def report_error(err, src_path):
+    metrics.reporter.failed(src_path)
+    if isinstance(err, FileNotFoundError):
         print(f"❌ Error: File not found at path: '{src_path}'")
-    except IOError as e:
-        print(f"❌ Error: Cannot open image. Reason: {e}")
-    except ValueError as ve:
-        print(f"❌ Reshape failed: {ve}")
+    elif isinstance(err, ValueError):
+        print(f"❌ Reshape failed: {err}")
+    elif isinstance(err, IOError):
+        print(f"❌ Error: Cannot open image. Reason: {err}")
+    else:
+        raise err
+
+
+def img_to_bin(src_path, dest_path):
+    try:
+        sample, _ = encrypt_image(src_path, dest_path)
+        log_encrypted(src_path, sample)
+
+    except (FileNotFoundError, IOError) as err:
+        report_error(err, src_path)
+
+
+def bin_to_img(src_path, dest_path):
+    try:
+        sample, dest_path = decrypt_image(src_path, dest_path)
+        log_decrypted(dest_path, sample)
+
+    except (FileNotFoundError, IOError, ValueError) as err:
+        report_error(err, src_path)
@@ -0,0 +1,158 @@
+"""
+Incremental Send: remember what the last archive holds, so unchanged images reuse
+their ciphertext instead of being encrypted again.
+
+``cache/send_manifest.json`` keeps the fingerprint of the RSA key the last archive was
+sent under, the settings the blobs were written with, and per image its entry name, size,
+mtime and a BLAKE2b content hash. An image counts as unchanged when size and mtime match,
+or when only the mtime moved and the hash still matches.
+The AES key itself is never stored: it is unwrapped from the last archive with that
+archive's QR and master code, then re-wrapped under each run's fresh RSA key, so
+receivers still only need the newest master code.
+"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from codebase import utility as util
+from codebase import constants as const
+from codebase import key_session
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+manifest_path = BASE_DIR / const.send_manifest_path
+previous_archive_path = BASE_DIR / const.previous_archive_path
+
+
+def settings_fingerprint() -> dict:
+    """Settings that change the ciphertext; blobs are only reused when these match."""
+    return {name: getattr(const, name) for name in const.payload_settings}
+
+
+def file_hash(path) -> str:
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(const.AES_chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Entries of the previous incremental archive, plus the fingerprint of the key it was sent under."""
+
+    def __init__(self, key_id: str = None, settings: dict = None, entries: dict = None):
+        self.key_id = key_id
+        self.aes_key = None   # the previous blobs' AES key, once unlocked (memory only)
+        self.settings = settings or {}
+        self.entries = entries or {}
+        self.previous_names = set()
+
+    @classmethod
+    def load(cls, path=manifest_path) -> "Manifest":
+        """The saved manifest, or an empty one when there is none (or it no longer applies)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            manifest = cls(data["key_id"], data["settings"], data["entries"])
+        except (OSError, ValueError, KeyError):
+            return cls()
+
+        if manifest.settings != settings_fingerprint():
+            util.log("[yellow]⚠️  Payload settings changed since the last run: encrypting everything again[/yellow]")
+            return cls()
+        return manifest
+
+    def adopt_previous_archive(self, archive_path):
+        """Move the last archive aside (it is about to be replaced) and note which entries it really holds."""
+        if not self.entries:
+            return
+
+        previous_archive_path.parent.mkdir(parents=True, exist_ok=True)
+        if Path(archive_path).exists():
+            os.replace(archive_path, previous_archive_path)
+
+        try:
+            self.previous_names = set(util.open_zip(previous_archive_path).namelist())
+        except Exception:
+            # Missing or unreadable (e.g. an interrupted run): nothing can be reused
+            self.previous_names = set()
+
+    def unlock(self, qr_path):
+        """
+        Unwrap the previous archive's AES key with its QR at ``qr_path`` and master code (asked
+        for here). When that fails nothing is reused and every image is encrypted again.
+        """
+        if not self.previous_names:
+            return
+
+        util.log("\n♻️  Unlocking the last archive to reuse its unchanged images")
+        try:
+            keys = key_session.Keyring().unlock(self.key_id, qr_path)
+            self.aes_key = util.load_aes_key(keys, archive=util.open_zip(previous_archive_path))
+        except (OSError, ValueError) as err:
+            util.log(f"[yellow]⚠️  Last archive couldn't be unlocked ({err}): encrypting everything again[/yellow]")
+            self.previous_names = set()
+
+    def check(self, img_path, relative_path):
+        """``(unchanged, record)`` for one input image; ``record`` goes into the next manifest."""
+        stat = os.stat(img_path)
+        old = self.entries.get(relative_path)
+        entry = util.bin_name_for(relative_path)
+        reusable = old is not None and old["entry"] == entry and entry in self.previous_names
+
+        if reusable and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            return True, old
+
+        record = {"entry": entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": file_hash(img_path)}
+        return reusable and old["size"] == stat.st_size and old["hash"] == record["hash"], record
+
+    def split(self, images, reused: list, records: dict):
+        """
+        Yield only the new / changed images of ``images``; entry names of unchanged ones are
+        appended to ``reused`` and every image's record lands in ``records``.
+        """
+        for img_path, relative_path in images:
+            unchanged, records[relative_path] = self.check(img_path, relative_path)
+            if unchanged:
+                reused.append(records[relative_path]["entry"])
+            else:
+                yield img_path, relative_path
+
+
+def copy_entries(names, open_dest):
+    """Copy the ciphertext of ``names`` out of the previous archive; ``open_dest(name)`` gives a writable stream."""
+    if not names:
+        return
+
+    previous = util.open_zip(previous_archive_path)
+    for name in names:
+        with util.open_zip_entry(previous, name) as src, open_dest(name) as dest:
+            shutil.copyfileobj(src, dest, const.AES_chunk_size)
+
+
+def forget(path=manifest_path):
+    """Drop the manifest: a full Send replaces the archive (and AES key) it describes."""
+    if path.exists():
+        path.unlink()
+
+
+def save(key_id: str, records: dict, archive_path, path=manifest_path):
+    """Write the manifest for the archive just built (only entries that made it in) and drop the old archive."""
+    written = set(util.open_zip(archive_path).namelist())
+    util.close_zips()
+
+    data = {
+        "key_id": key_id,
+        "settings": settings_fingerprint(),
+        "entries": {rel: record for rel, record in records.items() if record["entry"] in written},
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+    if previous_archive_path.exists():
+        previous_archive_path.unlink()
@@ -0,0 +1,108 @@
+"""
+Key sessions: one RSA keypair, QR and master code for many archives.
+
+Send with ``--session`` keeps only the public half of the key (``e``, ``n``) and a copy of
+the QR in ``cache/``, so later Sends skip key generation, PBKDF2 and the QR and just wrap
+a fresh AES key per archive. Every archive carries the key's fingerprint in its zip
+comment. On the receiving side a ``Keyring`` keeps unlocked private keys in memory by
+fingerprint, so each further archive of a session costs one RSA unwrap.
+The master code is never stored; the cached public key and QR are not secret.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from codebase import utility as util
+from codebase import constants as const
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+session_path = BASE_DIR / const.send_session_path
+session_qr_path = BASE_DIR / const.session_qr_path
+
+
+def fingerprint(n: int) -> str:
+    """Short id of an RSA modulus: names the key session an archive belongs to."""
+    return hashlib.blake2b(n.to_bytes((n.bit_length() + 7) // 8, "big"), digest_size=8).hexdigest()
+
+
+# ─── Send Side ────────────────────────────────────────────────
+class SendSession:
+    """Public half of the session key plus how many archives were sent under it."""
+
+    def __init__(self, e: int, n: int, created: float = None, archives: int = 0):
+        self.e = e
+        self.n = n
+        self.created = created or time.time()
+        self.archives = archives
+        self.key_id = fingerprint(n)
+
+    @classmethod
+    def load(cls, path=session_path):
+        """The running session, or ``None`` when there is none (or its QR went missing)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            session = cls(int(data["e"]), int(data["n"]), data["created"], data["archives"])
+        except (OSError, ValueError, KeyError):
+            return None
+        return session if session_qr_path.exists() else None
+
+    @classmethod
+    def start(cls, e: int, n: int, qr_path, path=session_path):
+        """New session for the key just generated; keeps its QR for the archives to come."""
+        session_qr_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(qr_path, session_qr_path)
+
+        session = cls(e, n)
+        session.save(path)
+        return session
+
+    def save(self, path=session_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"e": str(self.e), "n": str(self.n), "created": self.created, "archives": self.archives}, f)
+        os.replace(tmp_path, path)
+
+    def restore_qr(self, qr_path):
+        """Put the session's QR next to the new archive (the output folder is cleaned every Send)."""
+        Path(qr_path).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(session_qr_path, qr_path)
+
+
+def end(path=session_path):
+    """Forget the running session: the next ``--session`` Send starts a new key."""
+    for file in (path, session_qr_path):
+        if file.exists():
+            file.unlink()
+
+
+# ─── Receive Side ─────────────────────────────────────────────
+class Keyring:
+    """Unlocked private keys by fingerprint, held in memory only, for as long as the process lives."""
+
+    def __init__(self):
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def unlock(self, key_id, qr_path):
+        """
+        Private key for archives of ``key_id``: from the keyring, or read from the QR at
+        ``qr_path`` with the master code (asked for once per session). ``key_id`` is ``None``
+        for archives from before key sessions; those always ask.
+        """
+        if key_id in self._keys:
+            return self._keys[key_id]
+
+        const.master_code = util.read_master_code()
+        key = util.load_keys(qr_path)
+        self._keys[fingerprint(key.n)] = key
+
+        if key_id is not None and fingerprint(key.n) != key_id:
+            raise ValueError(f"❌ Archive belongs to key session {key_id}, but the QR at '{qr_path}' unlocks {fingerprint(key.n)}")
+        return key
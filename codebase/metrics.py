@@ -0,0 +1,305 @@
+"""
+Per-stage timings, byte counts and throughput for Send / Receive.
+
+Each image gets a ``Sample``: monotonic seconds per stage (load, encrypt, write /
+read, decrypt, save), its ciphertext size and the total. Tasks fill it through
+``collecting`` / ``timer`` / ``add_bytes`` (in worker processes too; samples pickle
+back to the parent), and the parent hands it to ``reporter``, which keeps the
+aggregate and feeds the sinks:
+
+    JSONLinesSink     one JSON line per image, then a summary line (``--metrics run.jsonl``)
+    PrometheusSink    node_exporter textfile, written at the end (``--metrics run.prom``)
+    SummarySink       table of stages and throughput on the console (``--summary``)
+
+With ``--progress`` a throttled aggregate progress bar replaces the per-image log lines.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from codebase import utility as util
+from codebase import constants as const
+
+_local = threading.local()
+
+
+# ─── Samples ──────────────────────────────────────────────────
+class Sample:
+    """Timings of one image: seconds per stage, ciphertext bytes and the total."""
+
+    __slots__ = ("stages", "bytes", "total")
+
+    def __init__(self):
+        self.stages = {}
+        self.bytes = 0
+        self.total = 0.0
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def collecting(sample=None):
+    """Make ``sample`` (a new one by default) the one ``timer`` / ``add_bytes`` report into on this thread."""
+    sample = Sample() if sample is None else sample
+    previous = getattr(_local, "sample", None)
+    _local.sample = sample
+    start = time.perf_counter()
+    try:
+        yield sample
+    finally:
+        sample.total += time.perf_counter() - start
+        _local.sample = previous
+
+
+@contextmanager
+def timer(stage):
+    """Add the time spent in the block to ``stage`` of the current sample (no-op outside ``collecting``)."""
+    sample = getattr(_local, "sample", None)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if sample is not None:
+            sample.add(stage, time.perf_counter() - start)
+
+
+def add_bytes(count):
+    sample = getattr(_local, "sample", None)
+    if sample is not None:
+        sample.bytes += count
+
+
+# ─── Sinks ────────────────────────────────────────────────────
+class JSONLinesSink:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+        self._mode = "w"
+
+    def start(self, job):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Later jobs of the same run (e.g. several archives) append to it
+        self._file = open(self.path, self._mode, encoding="utf-8")
+        self._mode = "a"
+
+    def image(self, job, path, sample):
+        record = {"job": job, "path": str(path), "total_s": sample.total, "bytes": sample.bytes, "stages": sample.stages}
+        self._file.write(json.dumps(record) + "\n")
+
+    def error(self, job, path):
+        self._file.write(json.dumps({"job": job, "path": str(path), "error": True}) + "\n")
+
+    def finish(self, summary):
+        self._file.write(json.dumps({"summary": summary}) + "\n")
+        self._file.close()
+
+
+class PrometheusSink:
+    """Textfile for node_exporter's textfile collector, replaced atomically at the end of the job."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def start(self, job):
+        pass
+
+    def image(self, job, path, sample):
+        pass
+
+    def error(self, job, path):
+        pass
+
+    def finish(self, summary):
+        prefix, job = const.metrics_prefix, summary["job"]
+        metrics = [
+            ("images_total", "counter", "Images processed", [({}, summary["images"])]),
+            ("errors_total", "counter", "Images that failed", [({}, summary["errors"])]),
+            ("bytes_total", "counter", "Ciphertext bytes written (send) or read (receive)", [({}, summary["bytes"])]),
+            ("wall_seconds", "gauge", "Wall-clock time of the job", [({}, summary["wall_s"])]),
+            ("stage_seconds_total", "counter", "Time spent per stage, summed over workers",
+             [({"stage": stage}, seconds) for stage, seconds in summary["stages"].items()]),
+        ]
+
+        lines = []
+        for name, kind, help_text, values in metrics:
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} {kind}"]
+            for labels, value in values:
+                labels = ",".join(f'{key}="{val}"' for key, val in {"job": job, **labels}.items())
+                lines.append(f"{prefix}_{name}{{{labels}}} {value}")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class SummarySink:
+    def start(self, job):
+        pass
+
+    def image(self, job, path, sample):
+        pass
+
+    def error(self, job, path):
+        pass
+
+    def finish(self, summary):
+        from rich.table import Table
+
+        images = summary["images"] or 1
+        busy = sum(summary["stages"].values()) or 1
+
+        table = Table(title=f"📊 {summary['job'].capitalize()} stages", title_justify="left")
+        table.add_column("Stage")
+        table.add_column("Total", justify="right")
+        table.add_column("Share", justify="right")
+        table.add_column("Per image", justify="right")
+        for stage, seconds in summary["stages"].items():
+            table.add_row(stage, f"{seconds:.3f}s", f"{seconds / busy:.0%}", f"{seconds / images * 1000:.2f}ms")
+
+        util.console.print(table)
+        util.log(
+            f"🖼️  [bold cyan]{summary['images']}[/bold cyan] images ({summary['errors']} failed), "
+            f"[bold cyan]{summary['bytes'] / 1e6:.1f} MB[/bold cyan] in {summary['wall_s']:.2f}s  ---  "
+            f"[bold cyan]{summary['images_per_s']:.1f}[/bold cyan] images/s, [bold cyan]{summary['mb_per_s']:.1f}[/bold cyan] MB/s\n"
+        )
+
+
+def sink_for(path):
+    """Sink chosen by the file suffix: ``.prom`` for Prometheus, ``.jsonl`` / ``.ndjson`` for JSON lines."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".prom":
+        return PrometheusSink(path)
+    if suffix in (".jsonl", ".ndjson"):
+        return JSONLinesSink(path)
+    raise ValueError(f"❌ Unknown metrics file type '{suffix}'. Use .jsonl or .prom")
+
+
+# ─── Reporter ─────────────────────────────────────────────────
+class _ProgressBar:
+    # Aggregate bar; redraws are throttled so 100k tiny images don't turn into 100k repaints
+    def __init__(self, job):
+        from rich.progress import BarColumn, Progress, TextColumn, TimeElapsedColumn
+
+        self._progress = Progress(
+            TextColumn("{task.description}"),
+            BarColumn(),
+            TextColumn("[bold cyan]{task.completed}[/bold cyan] images"),
+            TextColumn("{task.fields[rate]}"),
+            TimeElapsedColumn(),
+            console=util.console,
+            auto_refresh=False,
+        )
+        verb = "🔒 Encrypting" if job == "send" else "🔓 Decrypting"
+        self._task = self._progress.add_task(verb, total=None, rate="")
+        self._last = 0.0
+        self._progress.start()
+
+    def update(self, reporter, force=False):
+        now = time.perf_counter()
+        if not force and now - self._last < const.progress_interval:
+            return
+        self._last = now
+
+        wall = max(now - reporter.started, 1e-9)
+        rate = f"{reporter.images / wall:.1f} images/s  {reporter.bytes / wall / 1e6:.1f} MB/s"
+        if reporter.errors:
+            rate += f"  [red]{reporter.errors} failed[/red]"
+        self._progress.update(self._task, completed=reporter.images, rate=rate, refresh=True)
+
+    def stop(self, reporter):
+        self.update(reporter, force=True)
+        self._progress.stop()
+
+
+class Reporter:
+    """Aggregate of one job's samples, fanned out to the configured sinks and the progress bar."""
+
+    def __init__(self):
+        self.sinks = []
+        self.progress = False
+        self._reset(None)
+
+    def _reset(self, job):
+        self.job = job
+        self.images = self.errors = self.bytes = 0
+        self.stages = {}
+        self.started = time.perf_counter()
+        self._bar = None
+
+    def start(self, job):
+        self._reset(job)
+        for sink in self.sinks:
+            sink.start(job)
+        if self.progress:
+            self._bar = _ProgressBar(job)
+
+    def record(self, path, sample):
+        self.images += 1
+        self.bytes += sample.bytes
+        for stage, seconds in sample.stages.items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+        for sink in self.sinks:
+            sink.image(self.job, path, sample)
+        if self._bar is not None:
+            self._bar.update(self)
+
+    def failed(self, path):
+        self.errors += 1
+        for sink in self.sinks:
+            sink.error(self.job, path)
+        if self._bar is not None:
+            self._bar.update(self)
+
+    def summary(self) -> dict:
+        wall = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "job": self.job,
+            "images": self.images,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "wall_s": wall,
+            "images_per_s": self.images / wall,
+            "mb_per_s": self.bytes / wall / 1e6,
+            "stages": dict(self.stages),
+        }
+
+    def finish(self):
+        if self._bar is not None:
+            self._bar.stop(self)
+            self._bar = None
+
+        summary = self.summary()
+        for sink in self.sinks:
+            sink.finish(summary)
+        return summary
+
+
+reporter = Reporter()
+
+
+def metrics_arg(path):
+    import argparse
+
+    try:
+        return sink_for(path)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+
+
+def add_arguments(parser):
+    parser.add_argument("--progress", action="store_true", help="One aggregate progress bar instead of a log line per image")
+    parser.add_argument("--metrics", type=metrics_arg, action="append", default=[], metavar="FILE", help="Write per-stage metrics: .jsonl (one line per image) or .prom (Prometheus textfile); repeatable")
+    parser.add_argument("--summary", action="store_true", help="Print a table of stage timings and throughput at the end")
+
+
+def configure(args):
+    const.progress = reporter.progress = args.progress
+    reporter.sinks = list(args.metrics)
+    if args.summary:
+        reporter.sinks.append(SummarySink())
@@ -0,0 +1,253 @@
+import io
+import queue
+import threading
+from pathlib import Path
+
+from codebase import img_processing
+from codebase import metrics
+from codebase import utility as util
+from codebase import constants as const
+
+
+# ─── Pipeline Engine ──────────────────────────────────────────
+_DONE = object()
+
+
+def _size_of(value) -> int:
+    """Rough bytes held by a value passed between stages: blobs, buffers, arrays and decoded images."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, io.BytesIO):
+        return value.getbuffer().nbytes
+    if isinstance(value, tuple):
+        return sum(_size_of(part) for part in value)
+    if hasattr(value, "nbytes"):
+        return value.nbytes
+    if hasattr(value, "getbands"):
+        # PIL image: the decoded pixels
+        return value.width * value.height * len(value.getbands())
+    return 0
+
+
+class _BoundedQueue(queue.Queue):
+    """
+    Queue bounded by item count and by the bytes its items hold: a put blocks while either
+    limit would be passed, except into an empty queue (a single bigger item still gets through).
+    """
+
+    def __init__(self, maxsize, max_bytes):
+        super().__init__(maxsize)
+        self.max_bytes = max_bytes
+        self._bytes = 0
+
+    def put(self, item, block=True, timeout=None):
+        size = 0 if item is _DONE else _size_of(item)
+        with self.not_full:
+            while self._qsize() and (self._qsize() >= self.maxsize or self._bytes + size > self.max_bytes):
+                self.not_full.wait()
+            self._put(item)
+            self._bytes += size
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _get(self):
+        item = super()._get()
+        if item is not _DONE:
+            self._bytes -= _size_of(item)
+        return item
+
+
+def _feed(jobs, outbox, failed):
+    # The end marker goes out even when ``jobs`` raises: the stages drain and the error
+    # is handed back through ``failed`` for ``run_pipeline`` to raise
+    try:
+        for job in jobs:
+            outbox.put((job, None, None, metrics.Sample()))
+    except Exception as exc:
+        failed.append(exc)
+    finally:
+        outbox.put(_DONE)
+
+
+def _countdown(count):
+    """``done()`` returns True for the last of ``count`` callers."""
+    lock = threading.Lock()
+    left = [count]
+
+    def done():
+        with lock:
+            left[0] -= 1
+            return left[0] == 0
+
+    return done
+
+
+def _stage(fn, inbox, outbox, finished):
+    name = fn.__name__.lstrip("_")
+    while True:
+        item = inbox.get()
+        if item is _DONE:
+            # Hand the marker on to sibling threads; the last one out tells the next stage
+            inbox.put(_DONE)
+            if finished():
+                outbox.put(_DONE)
+            return
+
+        job, value, err, sample = item
+        if err is None:
+            try:
+                with metrics.collecting(sample), metrics.timer(name):
+                    value = fn(job, value)
+            except Exception as exc:
+                value, err = None, exc
+
+        outbox.put((job, value, err, sample))
+
+
+def run_pipeline(jobs, stages, depth=None, max_bytes=None):
+    """
+    Push every job through ``stages`` (each ``fn(job, value) -> value``, or ``(fn, threads)``
+    for a stage worth running on several threads), with a bounded queue between neighbours.
+    Stage N works on job i while stage N-1 already works on job i+1; full queues block the
+    stage upstream (backpressure), so at most ``depth`` items and ``max_bytes`` of images /
+    ciphertext wait between any two stages. Yields ``(job, value, error, sample)`` (a ``metrics.Sample`` timed per stage function),
+    in order unless a stage has several threads. An error raised by ``jobs`` itself is
+    raised here once the jobs before it went through.
+    """
+    depth = depth or const.pipeline_depth
+    max_bytes = max_bytes or const.pipeline_bytes
+    queues = [_BoundedQueue(depth, max_bytes) for _ in range(len(stages) + 1)]
+
+    failed = []
+    threads = [threading.Thread(target=_feed, args=(jobs, queues[0], failed), daemon=True)]
+    for i, stage in enumerate(stages):
+        fn, count = stage if isinstance(stage, tuple) else (stage, 1)
+        finished = _countdown(count)
+        for _ in range(count):
+            threads.append(threading.Thread(target=_stage, args=(fn, queues[i], queues[i + 1], finished), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    while True:
+        item = queues[-1].get()
+        if item is _DONE:
+            break
+        yield item
+
+    for thread in threads:
+        thread.join()
+    if failed:
+        raise failed[0]
+
+
+# ─── Send Stages ──────────────────────────────────────────────
+def _load(job, _):
+    src_path, _ = job
+    if const.passthrough:
+        # Passthrough: the file's own bytes are the payload, nothing to decode
+        with open(src_path, "rb") as f:
+            return io.BytesIO(f.read())
+
+    if src_path.lower().endswith(".npy"):
+        return img_processing.load_array(src_path)
+
+    from PIL import Image
+
+    img = Image.open(src_path)
+    img.load()
+    return img
+
+
+def _encrypt(job, source):
+    buffer = io.BytesIO()
+    if const.passthrough:
+        info = img_processing.write_encrypted_file(source, buffer, ext=Path(job[0]).suffix)
+    elif job[0].lower().endswith(".npy"):
+        info = img_processing.write_encrypted_array(source, buffer)
+    else:
+        info = img_processing.write_encrypted_pil(source, buffer)
+        source.close()
+    metrics.add_bytes(buffer.tell())
+    return info, buffer.getvalue()
+
+
+def _writer(archive):
+    def _write(job, encrypted):
+        _, dest_path = job
+        info, blob = encrypted
+        if archive is not None:
+            util.write_zip_entry(archive, dest_path, blob)
+        else:
+            with util.atomic_write(dest_path) as f:
+                f.write(blob)
+        return info
+
+    return _write
+
+
+def encrypt_all(jobs, archive=None, depth=None, index=None, journal=None):
+    """
+    Encrypt ``(img_path, dest)`` jobs with read/decode, encrypt and write overlapped.
+    Every image written is added to ``index`` and ``journal`` when given.
+    """
+    stages = [_load, _encrypt, _writer(archive)]
+
+    for (src_path, dest_path), info, err, sample in run_pipeline(jobs, stages, depth):
+        if err is None:
+            if index is not None:
+                index.add(dest_path, info)
+            if journal is not None:
+                journal.done(src_path, dest_path, info)
+            img_processing.log_encrypted(src_path, sample)
+        else:
+            img_processing.report_error(err, src_path)
+
+
+# ─── Receive Stages ───────────────────────────────────────────
+def _reader(zip_path):
+    def _read(job, _):
+        src, _ = job
+        if isinstance(src, tuple):
+            # Located through the archive index: read just this entry, no central directory
+            with open(zip_path, "rb") as f:
+                data = util.read_located_entry(f, *src[1:], src[0])
+        elif zip_path is not None:
+            archive = util.open_zip(zip_path)
+            with util.open_zip_entry(archive, src) as f:
+                data = f.read()
+        else:
+            with open(src, "rb") as f:
+                data = f.read()
+        metrics.add_bytes(len(data))
+        return data
+
+    return _read
+
+
+def _decrypt(job, blob):
+    return img_processing.decrypt_payload(blob)
+
+
+def _save(job, payload):
+    src, dest_path = job
+    meta, value = payload
+    # Located entries (``--select``) come as (entry, offset, length)
+    src_name = src[0] if isinstance(src, tuple) else src
+    return img_processing.save_payload(meta, value, src_name, dest_path)
+
+
+def decrypt_all(jobs, zip_path=None, depth=None, journal=None):
+    """
+    Decrypt ``(bin, img_path)`` jobs (entries of ``zip_path`` when given) with read, decrypt and
+    save overlapped. Saving runs on ``const.encode_threads`` threads (PIL encoders release the GIL).
+    Images saved are added to ``journal`` when given.
+    """
+    stages = [_reader(zip_path), _decrypt, (_save, max(1, const.encode_threads))]
+
+    for (src_path, img_path), dest_path, err, sample in run_pipeline(jobs, stages, depth):
+        if err is None:
+            if journal is not None:
+                journal.done(img_path, dest_path)
+            img_processing.log_decrypted(dest_path, sample)
+        else:
+            img_processing.report_error(err, src_path)
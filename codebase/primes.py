@@ -0,0 +1,277 @@
+import json
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+
+from codebase import constants as const
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+pool_path = BASE_DIR / const.prime_pool_path
+
+
+# ─── Primality ────────────────────────────────────────────────
+def _small_primes(limit: int) -> list:
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, int(limit**0.5) + 1):
+        if sieve[i]:
+            sieve[i * i :: i] = bytearray(len(sieve[i * i :: i]))
+    return [i for i, is_prime in enumerate(sieve) if is_prime]
+
+
+SMALL_PRIMES = _small_primes(const.prime_sieve_limit)
+
+
+def _mr_rounds(bits: int) -> int:
+    # Rounds for a < 2**-100 error on random candidates (FIPS 186-4, table C.2)
+    if bits >= 1536:
+        return 4
+    if bits >= 1024:
+        return 5
+    if bits >= 512:
+        return 7
+    return 40
+
+
+def is_probable_prime(n: int, rounds: int = None) -> bool:
+    """Miller–Rabin with random bases."""
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES[:64]:
+        if n % p == 0:
+            return n == p
+
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+
+    for _ in range(rounds or const.prime_mr_rounds or _mr_rounds(n.bit_length())):
+        a = secrets.randbelow(n - 3) + 2
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+# ─── Prime Search ─────────────────────────────────────────────
+def search_window(bits: int, window: int = None):
+    """
+    Scan ``window`` odd candidates upward from a random ``bits``-bit start.
+    Multiples of the small primes are struck out of the window with slice
+    assignments first, so Miller–Rabin only ever runs on the survivors.
+    Returns the first probable prime (with ``p - 1`` coprime to ``e``) or ``None``.
+    """
+    window = window or 4 * bits
+    # Top two bits set, so the product of two such primes has exactly 2 * bits bits
+    start = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+
+    # Candidate k is start + 2k; it is divisible by p when k ≡ -start / 2 (mod p)
+    survivors = bytearray(b"\x01") * window
+    for p in SMALL_PRIMES[1:]:
+        first = (-(start % p) * ((p + 1) // 2)) % p
+        survivors[first::p] = bytes(len(range(first, window, p)))
+
+    k = survivors.find(1)
+    while k != -1:
+        candidate = start + 2 * k
+        if candidate.bit_length() != bits:
+            return None
+        if candidate % const.RSA_public_exponent != 1 and is_probable_prime(candidate):
+            return candidate
+        k = survivors.find(1, k + 1)
+    return None
+
+
+def random_prime(bits: int) -> int:
+    while True:
+        prime = search_window(bits)
+        if prime is not None:
+            return prime
+
+
+def parallel_primes(bits: int, count: int, workers: int = None) -> list:
+    """Find ``count`` distinct primes, searching windows on all cores at once."""
+    workers = workers or const.workers
+    if workers <= 1:
+        found = set()
+        while len(found) < count:
+            found.add(random_prime(bits))
+        return list(found)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    found = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(search_window, bits) for _ in range(workers)}
+        while len(found) < count:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result() is not None:
+                    found.add(future.result())
+                pending.add(pool.submit(search_window, bits))
+        # Windows are short, so whatever is still running finishes almost at once
+        for future in pending:
+            future.cancel()
+    return list(found)[:count]
+
+
+# ─── Prime Pool ───────────────────────────────────────────────
+class PrimePool:
+    """
+    Pre-generated primes per bit size, optionally kept on disk. Each prime is handed out
+    once and removed from the pool. An in-memory pool tops itself up on a daemon thread
+    after each ``take`` (one serial search, never a process pool next to the encryption
+    workers; ``background=False`` turns that off). An on-disk pool is restocked by
+    ``restock``: a detached, low-priority process started once the job's own work is done.
+    Note: an on-disk pool is secret key material (the next keys are made of it).
+    """
+
+    def __init__(self, size: int = None, path=None, background: bool = True):
+        self.size = size or const.prime_pool_size
+        self.path = Path(path) if path else None
+        self.background = background
+        self._lock = threading.Lock()
+        self._used = set()        # bit sizes handed out, restocked by ``restock``
+        self._refilling = set()   # bit sizes an in-memory refill thread is working on
+        self._primes = self._load()
+
+    def _load(self) -> dict:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return {int(bits): [int(p) for p in primes] for bits, primes in json.load(f).items()}
+        except (ValueError, OSError):
+            return {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({str(bits): [str(p) for p in primes] for bits, primes in self._primes.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _locked(self, timeout: float = 10.0):
+        """
+        The pool, re-read from disk and saved back, with no other process in between: a prime
+        taken by one process must never be written back by another that read it earlier.
+        """
+        with self._lock:
+            if self.path is None:
+                yield
+                return
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            lock_path = self.path.with_suffix(".lock")
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    break
+                except FileExistsError:
+                    if time.monotonic() > deadline:
+                        # Left behind by a killed process
+                        lock_path.unlink(missing_ok=True)
+                    time.sleep(0.01)
+            try:
+                self._primes = self._load()
+                yield
+                self._save()
+            finally:
+                lock_path.unlink(missing_ok=True)
+
+    def available(self, bits: int) -> int:
+        with self._locked():
+            return len(self._primes.get(bits, []))
+
+    def take(self, bits: int, count: int = 1) -> list:
+        """Pop ``count`` primes, generating any the pool can't supply right now."""
+        with self._locked():
+            stock = self._primes.setdefault(bits, [])
+            taken = [stock.pop() for _ in range(min(count, len(stock)))]
+            self._used.add(bits)
+
+        if len(taken) < count:
+            taken += parallel_primes(bits, count - len(taken))
+        if self.path is None and self.background:
+            self._refill_in_background(bits)
+        return taken
+
+    def _refill_in_background(self, bits: int):
+        with self._lock:
+            if bits in self._refilling:
+                return
+            self._refilling.add(bits)
+
+        def run():
+            try:
+                while self.available(bits) < self.size:
+                    prime = random_prime(bits)
+                    with self._locked():
+                        self._primes.setdefault(bits, []).append(prime)
+            finally:
+                with self._lock:
+                    self._refilling.discard(bits)
+
+        threading.Thread(target=run, name=f"prime-refill-{bits}", daemon=True).start()
+
+    def refill(self, bits: int):
+        """Top the pool for ``bits`` back up to ``size`` (blocking)."""
+        while self.available(bits) < self.size:
+            missing = self.size - self.available(bits)
+            fresh = parallel_primes(bits, missing)
+            with self._locked():
+                self._primes.setdefault(bits, []).extend(fresh)
+
+    def restock(self):
+        """
+        Refill the on-disk pool for every size taken from it, in a detached process at idle
+        priority, so the next run finds it stocked and this one can exit right away. An
+        in-memory pool refills itself (see ``take``): nothing to do.
+        """
+        if self.path is None:
+            return
+        for bits in self._used:
+            if self.available(bits) >= self.size:
+                continue
+            options = {"start_new_session": True} if os.name == "posix" else {
+                "creationflags": subprocess.IDLE_PRIORITY_CLASS | subprocess.DETACHED_PROCESS,
+            }
+            subprocess.Popen(
+                [sys.executable, "-m", "codebase.primes", str(bits), str(self.path), str(self.size)],
+                cwd=BASE_DIR, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                **options,
+            )
+        self._used.clear()
+
+
+_default_pool = None
+
+
+def default_pool() -> PrimePool:
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = PrimePool(path=pool_path if const.prime_pool_on_disk else None)
+    return _default_pool
+
+
+# Detached restock (``PrimePool.restock``): python -m codebase.primes <bits> <pool path> <size>
+if __name__ == "__main__":
+    if hasattr(os, "nice"):
+        os.nice(19)
+    PrimePool(size=int(sys.argv[3]), path=sys.argv[2]).refill(int(sys.argv[1]))
@@ -1,10 +1,11 @@
-import sympy
-from typing import Tuple
+import io
+import math
+from typing import NamedTuple, Tuple
 from pathlib import Path
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad, unpad
 
+# numpy and pycryptodome are imported where used, so importing this module stays cheap
+
+from codebase import primes
 from codebase import utility as util
 from codebase import constants as const
 
@@ -19,42 +20,82 @@ img_dest_path = BASE_DIR / "output" / "img" / "rg_chess.png"
 
 # ─── Math Helpers ─────────────────────────────────────────────
 def gcd(a: int, b: int) -> int:
-    while b:
-        a, b = b, a % b
-    return a
+    return math.gcd(a, b)
 
 
 def find_e(phi_n: int) -> int:
-    e = 65537
+    e = const.RSA_public_exponent
     while gcd(e, phi_n) != 1:
         e += 2
     return e
 
 
 def mod_inverse(a: int, m: int) -> int:
-    m0, x0, y0 = m, 0, 1
-    while a > 1:
-        q = a // m
-        m, a = a % m, m
-        x0, y0 = y0 - q * x0, x0
-    return y0 + m0 if y0 < 0 else y0
+    try:
+        return pow(a, -1, m)
+    except ValueError:
+        raise ZeroDivisionError(f"{a} has no inverse modulo {m}")
 
 
 def generate_large_prime(bits) -> int:
-    return sympy.randprime(2 ** (bits - 1), 2**bits)
+    return primes.random_prime(bits)
+
+
+# ─── Private Keys ─────────────────────────────────────────────
+class PrivateKey(NamedTuple):
+    """RSA private key; the CRT fields are ``None`` for keys that only carry ``d`` and ``n``."""
+    d: int
+    n: int
+    p: int = None
+    q: int = None
+    dP: int = None
+    dQ: int = None
+    qInv: int = None
+
+    @property
+    def has_crt(self) -> bool:
+        return self.p is not None
+
+
+def crt_private_key(d: int, p: int, q: int) -> PrivateKey:
+    return PrivateKey(
+        d=d, n=p * q, p=p, q=q,
+        dP=d % (p - 1), dQ=d % (q - 1), qInv=mod_inverse(q, p),
+    )
+
+
+def private_key_from_crt(p: int, q: int, dP: int, dQ: int, qInv: int) -> PrivateKey:
+    """Rebuild the full key from the CRT components alone (``d`` is recovered mod lcm(p-1, q-1))."""
+    # d ≡ dP (mod p-1) and d ≡ dQ (mod q-1); the moduli share a factor g
+    g = gcd(p - 1, q - 1)
+    if (dQ - dP) % g:
+        raise ValueError("❌ Inconsistent CRT key components.")
+    m = (q - 1) // g
+    t = ((dQ - dP) // g) * mod_inverse(((p - 1) // g) % m, m) % m if m > 1 else 0
+    d = dP + (p - 1) * t
+    return PrivateKey(d=d, n=p * q, p=p, q=q, dP=dP, dQ=dQ, qInv=qInv)
 
 
 # ─── Key Generation ───────────────────────────────────────────
+def generate_aes_key() -> bytes:
+    """Fresh session AES key (AES-128), also set as ``const.AES_key``."""
+    from Crypto.Random import get_random_bytes
+
+    const.AES_key = get_random_bytes(16)
+    return const.AES_key
+
+
 def generate_keys(bits: int = 4096) -> Tuple[int, int, int]:
     util.rich_divider()
     print("\n🔐 Generating RSA keys …\n")
 
-    AES_key = get_random_bytes(16)  # AES-128
-    const.AES_key = AES_key
+    AES_key = generate_aes_key()
+
+    # Primes come from the pre-generated pool when it has stock, else a parallel search
+    pool = primes.default_pool()
 
     while True:
-        p = generate_large_prime(bits // 2)
-        q = generate_large_prime(bits // 2)
+        p, q = pool.take(bits // 2, 2)
         if p == q:
             continue
         n = p * q
@@ -69,6 +110,8 @@ def generate_keys(bits: int = 4096) -> Tuple[int, int, int]:
     const.RSA_e = e
     const.RSA_d = d
     const.RSA_n = n
+    const.RSA_p = p
+    const.RSA_q = q
 
     return AES_key, [e, d, n]
 
@@ -153,12 +196,35 @@ def rsa_decrypt(ciphertext: bytes, d: int, n: int) -> str:
     return plain_bytes.decode("utf-8")
 
 
+def rsa_decrypt_key(ciphertext: bytes, key: PrivateKey) -> str:
+    """
+    Like ``rsa_decrypt``, but takes a ``PrivateKey`` and uses the Chinese Remainder
+    Theorem when the key carries p and q: two half-size exponentiations instead of one
+    full-size one, roughly 3–4x cheaper.
+    """
+    if not key.has_crt:
+        return rsa_decrypt(ciphertext, key.d, key.n)
+
+    c = int.from_bytes(ciphertext, "big")
+    m1 = pow(c % key.p, key.dP, key.p)
+    m2 = pow(c % key.q, key.dQ, key.q)
+    h = (key.qInv * (m1 - m2)) % key.p
+    m = m2 + h * key.q
+
+    plain_bytes = m.to_bytes((m.bit_length() + 7) // 8, "big")
+    return plain_bytes.decode("utf-8")
+
+
 # AES encryption
 
 _LENGTH_TRAILER = 4
-BLOCK_SIZE = AES.block_size  # 16 bytes
+BLOCK_SIZE = 16  # AES.block_size
 
 def aes_encrypt(blob: bytes, key: bytes) -> bytes:
+    from Crypto.Cipher import AES
+    from Crypto.Random import get_random_bytes
+    from Crypto.Util.Padding import pad
+
     iv = get_random_bytes(BLOCK_SIZE)
 
     # Append original length to blob (like your RSA logic)
@@ -172,6 +238,9 @@ def aes_encrypt(blob: bytes, key: bytes) -> bytes:
     return iv + encrypted
 
 def aes_decrypt(ciphertext: bytes, key: bytes) -> bytes:
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import unpad
+
     iv = ciphertext[:BLOCK_SIZE]
     encrypted = ciphertext[BLOCK_SIZE:]
 
@@ -182,3 +251,390 @@ def aes_decrypt(ciphertext: bytes, key: bytes) -> bytes:
     # Extract original length
     orig_len = int.from_bytes(blob[-_LENGTH_TRAILER:], "big")
     return blob[:orig_len]
+
+
+# Streaming AES
+# Same on-disk layout as aes_encrypt / aes_decrypt (IV + CBC(blob + length trailer)),
+# but the blob is fed through in fixed-size chunks instead of being held whole.
+
+class AESEncryptWriter(io.RawIOBase):
+    """Writable stream that AES-encrypts everything written to it into ``fp``."""
+
+    def __init__(self, fp, key: bytes, chunk_size: int = None):
+        from Crypto.Cipher import AES
+        from Crypto.Random import get_random_bytes
+
+        self._fp = fp
+        self._chunk_size = chunk_size or const.AES_chunk_size
+        self._carry = bytearray()  # bytes not yet filling a whole block
+        self._size = 0
+
+        iv = get_random_bytes(BLOCK_SIZE)
+        self._cipher = AES.new(key, AES.MODE_CBC, iv)
+        fp.write(iv)
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        written = len(view)
+        self._size += written
+
+        # Top up a partial block left over from the previous write first
+        if self._carry:
+            take = min(BLOCK_SIZE - len(self._carry), len(view))
+            self._carry += view[:take]
+            view = view[take:]
+            if len(self._carry) < BLOCK_SIZE:
+                return written
+            self._fp.write(self._cipher.encrypt(bytes(self._carry)))
+            self._carry.clear()
+
+        aligned = len(view) - len(view) % BLOCK_SIZE
+        for start in range(0, aligned, self._chunk_size):
+            end = min(start + self._chunk_size, aligned)
+            self._fp.write(self._cipher.encrypt(view[start:end]))
+
+        self._carry += view[aligned:]
+        return written
+
+    def close(self):
+        if not self.closed:
+            from Crypto.Util.Padding import pad
+
+            # Final block(s): leftover bytes + original length trailer + padding
+            tail = bytes(self._carry) + self._size.to_bytes(_LENGTH_TRAILER, "big")
+            self._fp.write(self._cipher.encrypt(pad(tail, BLOCK_SIZE)))
+            self._carry.clear()
+        super().close()
+
+
+class AESDecryptReader(io.RawIOBase):
+    """Readable stream that decrypts an ``aes_encrypt`` blob from ``fp`` chunk by chunk."""
+
+    def __init__(self, fp, key: bytes, chunk_size: int = None, iv: bytes = None):
+        from Crypto.Cipher import AES
+
+        self._fp = fp
+        self._chunk_size = chunk_size or const.AES_chunk_size
+
+        iv = iv if iv is not None else fp.read(BLOCK_SIZE)
+        if len(iv) != BLOCK_SIZE:
+            raise ValueError("❌ Encrypted blob too short to contain an IV.")
+        self._cipher = AES.new(key, AES.MODE_CBC, iv)
+
+        self._pending = b""  # ciphertext not yet making up a whole block
+        self._held = b""     # last two plaintext blocks: may hold trailer + padding
+        self._buf = memoryview(b"")
+        self._size = 0
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        while not self._buf and not self._eof:
+            chunk = self._fp.read(self._chunk_size)
+
+            if chunk:
+                chunk = self._pending + chunk
+                aligned = len(chunk) - len(chunk) % BLOCK_SIZE
+                self._pending = chunk[aligned:]
+
+                plain = self._held + self._cipher.decrypt(chunk[:aligned])
+                cut = len(plain) - 2 * BLOCK_SIZE
+                if cut <= 0:
+                    self._held = plain
+                    continue
+                self._held = plain[cut:]
+                self._buf = memoryview(plain)[:cut]
+            else:
+                self._eof = True
+                if self._pending:
+                    raise ValueError("❌ Ciphertext is not a whole number of AES blocks.")
+
+                from Crypto.Util.Padding import unpad
+
+                blob = unpad(self._held, BLOCK_SIZE)
+                orig_len = int.from_bytes(blob[-_LENGTH_TRAILER:], "big")
+                self._buf = memoryview(blob)[:-_LENGTH_TRAILER]
+
+                if self._size + len(self._buf) != orig_len:
+                    raise ValueError(
+                        f"❌ Mismatch in blob size: expected {orig_len}, got {self._size + len(self._buf)}"
+                    )
+
+            self._size += len(self._buf)
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        filled = 0
+
+        while filled < len(view):
+            self._fill()
+            if not self._buf:
+                break
+            count = min(len(self._buf), len(view) - filled)
+            view[filled : filled + count] = self._buf[:count]
+            self._buf = self._buf[count:]
+            filled += count
+
+        return filled
+
+
+# Counter-mode AES (seekable, parallel)
+# CTR_MAGIC | 8-byte nonce | CTR(blob). Every 16-byte block is encrypted on its own
+# (counter = block index), so one payload is split into segments that run on several
+# threads, and any byte range can be decrypted without touching what comes before it.
+# CBC blobs start with a random IV instead of the magic and are still read as before.
+
+CTR_MAGIC = b"\x89AESCTR\n"
+_NONCE_SIZE = 8
+
+_ctr_pool = None
+
+
+def _ctr_executor():
+    global _ctr_pool
+    import os
+
+    # Re-created after a fork: a pool inherited from the parent has no threads behind it
+    if _ctr_pool is None or _ctr_pool[0] != os.getpid():
+        from concurrent.futures import ThreadPoolExecutor
+
+        _ctr_pool = (os.getpid(), ThreadPoolExecutor(max_workers=const.AES_threads))
+    return _ctr_pool[1]
+
+
+def ctr_apply(key: bytes, nonce: bytes, offset: int, src, dest):
+    """
+    CTR-encrypt (or decrypt, the same thing) ``src`` into the writable buffer ``dest``.
+    ``offset`` is the position of ``src[0]`` in the stream and must be block aligned.
+    Segments of ``const.AES_segment_size`` run on ``const.AES_threads`` threads
+    (the cipher releases the GIL).
+    """
+    from Crypto.Cipher import AES
+
+    src = memoryview(src).cast("B")
+    dest = memoryview(dest).cast("B")
+    segment = const.AES_segment_size
+
+    def run(start):
+        end = min(start + segment, len(src))
+        cipher = AES.new(key, AES.MODE_CTR, nonce=nonce, initial_value=(offset + start) // BLOCK_SIZE)
+        cipher.encrypt(src[start:end], output=dest[start:end])
+
+    starts = range(0, len(src), segment)
+    if const.AES_threads <= 1 or len(starts) <= 1:
+        for start in starts:
+            run(start)
+    else:
+        list(_ctr_executor().map(run, starts))
+
+
+class AESCTRWriter(io.RawIOBase):
+    """Writable stream like ``AESEncryptWriter``, in counter mode with segments on threads."""
+
+    def __init__(self, fp, key: bytes, chunk_size: int = None):
+        from Crypto.Random import get_random_bytes
+
+        self._fp = fp
+        self._key = key
+        # Enough per flush to give every thread a segment
+        self._chunk_size = max(chunk_size or const.AES_chunk_size, const.AES_segment_size * const.AES_threads)
+        self._buffer = bytearray()
+        self._offset = 0
+
+        self._nonce = get_random_bytes(_NONCE_SIZE)
+        fp.write(CTR_MAGIC + self._nonce)
+
+    def writable(self):
+        return True
+
+    def tell(self) -> int:
+        """Plaintext bytes written so far."""
+        return self._offset + len(self._buffer)
+
+    def _flush_chunk(self, data):
+        out = bytearray(len(data))
+        ctr_apply(self._key, self._nonce, self._offset, data, out)
+        self._fp.write(out)
+        self._offset += len(data)
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        written = len(view)
+
+        if self._buffer:
+            take = min(self._chunk_size - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) < self._chunk_size:
+                return written
+            self._flush_chunk(self._buffer)
+            self._buffer.clear()
+
+        while len(view) >= self._chunk_size:
+            self._flush_chunk(view[: self._chunk_size])
+            view = view[self._chunk_size :]
+
+        self._buffer += view
+        return written
+
+    def close(self):
+        if not self.closed and self._buffer:
+            self._flush_chunk(self._buffer)
+            self._buffer.clear()
+        super().close()
+
+
+class AESCTRReader(io.RawIOBase):
+    """Readable stream over an ``AESCTRWriter`` blob; ``fp`` is positioned after magic + nonce."""
+
+    def __init__(self, fp, key: bytes, nonce: bytes, chunk_size: int = None):
+        self._fp = fp
+        self._key = key
+        self._nonce = nonce
+        self._chunk_size = max(chunk_size or const.AES_chunk_size, const.AES_segment_size * const.AES_threads)
+        self._buf = memoryview(b"")
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        if self._buf:
+            return
+
+        # Whole chunks only, so every chunk after the first starts block aligned
+        chunk = bytearray()
+        while len(chunk) < self._chunk_size:
+            part = self._fp.read(self._chunk_size - len(chunk))
+            if not part:
+                break
+            chunk += part
+
+        ctr_apply(self._key, self._nonce, self._offset, chunk, chunk)
+        self._offset += len(chunk)
+        self._buf = memoryview(chunk)
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        filled = 0
+
+        while filled < len(view):
+            self._fill()
+            if not self._buf:
+                break
+            count = min(len(self._buf), len(view) - filled)
+            view[filled : filled + count] = self._buf[:count]
+            self._buf = self._buf[count:]
+            filled += count
+
+        return filled
+
+
+def ctr_decrypt_range(ciphertext, key: bytes, offset: int, length: int):
+    """Decrypt ``length`` plaintext bytes from ``offset`` of a CTR blob held in a buffer, touching nothing else."""
+    view = memoryview(ciphertext).cast("B")
+    nonce = bytes(view[len(CTR_MAGIC) : BLOCK_SIZE])
+
+    start = offset - offset % BLOCK_SIZE  # counters are per block
+    src = view[BLOCK_SIZE + start : BLOCK_SIZE + offset + length]
+    if offset < 0 or len(src) != offset + length - start:
+        raise ValueError("❌ Encrypted blob is truncated.")
+
+    out = bytearray(len(src))
+    ctr_apply(key, nonce, start, src, out)
+    return memoryview(out)[offset - start :]
+
+
+def is_ctr(ciphertext) -> bool:
+    return bytes(memoryview(ciphertext).cast("B")[: len(CTR_MAGIC)]) == CTR_MAGIC
+
+
+def encrypt_stream(fp, key: bytes, mode: str = None):
+    """Encrypting writer for ``const.AES_mode`` ("cbc" or "ctr")."""
+    if (mode or const.AES_mode) == "ctr":
+        return AESCTRWriter(fp, key)
+    return AESEncryptWriter(fp, key)
+
+
+def decrypt_stream(fp, key: bytes):
+    """Decrypting reader for either cipher mode, told apart by the blob's first bytes."""
+    head = fp.read(BLOCK_SIZE)
+    if len(head) != BLOCK_SIZE:
+        raise ValueError("❌ Encrypted blob too short to contain an IV.")
+
+    if head[: len(CTR_MAGIC)] == CTR_MAGIC:
+        return AESCTRReader(fp, key, head[len(CTR_MAGIC) :])
+    return AESDecryptReader(fp, key, iv=head)
+
+
+def aes_peek(ciphertext, key: bytes) -> bytes:
+    """First plaintext block of an encrypted blob, either mode (empty if there is none)."""
+    from Crypto.Cipher import AES
+
+    view = memoryview(ciphertext).cast("B")
+    if len(view) < 2 * BLOCK_SIZE:
+        return b""
+
+    if is_ctr(view):
+        nonce = bytes(view[len(CTR_MAGIC) : BLOCK_SIZE])
+        cipher = AES.new(key, AES.MODE_CTR, nonce=nonce, initial_value=0)
+    else:
+        cipher = AES.new(key, AES.MODE_CBC, bytes(view[:BLOCK_SIZE]))
+    return cipher.decrypt(view[BLOCK_SIZE : 2 * BLOCK_SIZE])
+
+
+def aes_decrypt_mapped(ciphertext, key: bytes, header_len: int):
+    """
+    Decrypt a whole encrypted blob (CBC or CTR) held in a buffer (e.g. an mmap) in one pass.
+    Returns ``(header, body)``: the first ``header_len`` plaintext bytes, and the rest as a
+    ``uint8`` array the cipher wrote into directly, so the body is never copied afterwards.
+    Returns ``None`` for blobs too small to be worth it (use ``AESDecryptReader`` instead).
+    """
+    import numpy as np
+    from Crypto.Cipher import AES
+
+    view = memoryview(ciphertext).cast("B")
+    plain_len = len(view) - BLOCK_SIZE
+
+    if is_ctr(view):
+        # Counter mode: no padding or trailer, decrypt everything in parallel segments
+        if plain_len < header_len:
+            raise ValueError("❌ Decrypted blob too short to contain image header.")
+        plain = np.empty(plain_len, dtype=np.uint8)
+        ctr_apply(key, bytes(view[len(CTR_MAGIC) : BLOCK_SIZE]), 0, view[BLOCK_SIZE:], plain)
+        return plain[:header_len].tobytes(), plain[header_len:]
+
+    head_len = -(-header_len // BLOCK_SIZE) * BLOCK_SIZE  # header rounded up to whole blocks
+
+    if plain_len % BLOCK_SIZE:
+        raise ValueError("❌ Ciphertext is not a whole number of AES blocks.")
+    if plain_len < head_len + 2 * BLOCK_SIZE:
+        return None
+
+    cipher = AES.new(key, AES.MODE_CBC, bytes(view[:BLOCK_SIZE]))
+    head = cipher.decrypt(view[BLOCK_SIZE : BLOCK_SIZE + head_len])
+
+    # The body starts mid-block: seed its first bytes from the header blocks,
+    # then let the cipher decrypt the remaining blocks in place right after them
+    spill = head_len - header_len
+    body = np.empty(plain_len - header_len, dtype=np.uint8)
+    body[:spill] = np.frombuffer(head, dtype=np.uint8, offset=header_len)
+    cipher.decrypt(view[BLOCK_SIZE + head_len :], output=memoryview(body)[spill:])
+
+    pad_len = int(body[-1])
+    if not 1 <= pad_len <= BLOCK_SIZE or (body[-pad_len:] != pad_len).any():
+        raise ValueError("❌ Padding is incorrect.")
+
+    data_end = body.size - pad_len - _LENGTH_TRAILER
+    orig_len = int.from_bytes(body[data_end : data_end + _LENGTH_TRAILER].tobytes(), "big")
+    if header_len + data_end != orig_len:
+        raise ValueError(
+            f"❌ Mismatch in blob size: expected {orig_len}, got {header_len + data_end}"
+        )
+
+    return head[:header_len], body[:data_end]
@@ -0,0 +1,186 @@
+"""
+Tiled payloads: random access into very large images (slides, satellite scenes).
+
+The plaintext is always AES-CTR encrypted, so any byte range decrypts on its own:
+
+    v2 header   {"kind": "tiles", "shape": [h, w, c], "tile": [th, tw], "codec": ..., mode / dtype}
+    per tile    >I length | tile bytes (compressed on their own when a codec is set), row-major
+    index       >QI offset, length of every tile
+    footer      >Q offset of the index
+
+Tiles are pulled from the source one box at a time, so a numpy memmap (``.npy``)
+is never loaded whole, and ``TiledImage.region`` decrypts only the tiles under
+the requested rectangle. Other inputs go through PIL, which decodes the whole image
+before the first tile can be cropped (its decoders can't start mid-image for most
+formats): tiling them still gives random access on Receive, but Send holds the full
+decoded image. Convert gigapixel inputs to ``.npy`` to keep Send at one tile in memory.
+"""
+import struct
+
+from codebase import rsa
+from codebase import blob
+
+_FRAME = struct.Struct(">I")
+_ENTRY = struct.Struct(">QI")
+_FOOTER = struct.Struct(">Q")
+
+
+def tile_grid(shape, tile):
+    """``(y0, y1, x0, x1)`` of every tile, row-major."""
+    h, w = shape[:2]
+    th, tw = tile
+    for y0 in range(0, h, th):
+        for x0 in range(0, w, tw):
+            yield y0, min(y0 + th, h), x0, min(x0 + tw, w)
+
+
+def _decompressor(meta):
+    if blob.parse_codec(meta.get("codec"))[0] == "none":
+        return None
+    return blob.get_codec(meta["codec"])[1]
+
+
+def _tile_array(data, decompress, shape, dtype):
+    import numpy as np
+
+    if decompress is not None:
+        data = decompress(data)
+
+    expected_size = shape[0] * shape[1] * shape[2] * dtype.itemsize
+    if len(data) != expected_size:
+        raise ValueError(f"❌ Mismatch in tile size: expected {expected_size}, got {len(data)}")
+    return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+
+def write_tiles(fp, key, shape, read_box, meta, tile, codec):
+    """
+    Encrypt a tiled payload into ``fp``. ``read_box(y0, y1, x0, x1)`` returns the raw
+    bytes of one box of the source, so only one tile is ever held in memory.
+    """
+    compress = None
+    if blob.parse_codec(codec)[0] != "none":
+        compress = blob.get_codec(codec)[0]
+
+    header = {"kind": "tiles", "shape": list(shape), "dtype": "uint8"}
+    header.update(meta)
+    header.update({"tile": list(tile), "codec": codec})
+
+    index = []
+    with rsa.AESCTRWriter(fp, key) as writer:
+        blob.write_header(writer, header)
+
+        for box in tile_grid(shape, tile):
+            data = read_box(*box)
+            if compress is not None:
+                data = compress(data)
+
+            writer.write(_FRAME.pack(len(data)))
+            index.append(_ENTRY.pack(writer.tell(), len(data)))
+            writer.write(data)
+
+        index_offset = writer.tell()
+        writer.write(b"".join(index))
+        writer.write(_FOOTER.pack(index_offset))
+
+
+def _read_exact(reader, size):
+    data = reader.read(size)
+    if len(data) != size:
+        raise ValueError("❌ Tiled payload is truncated.")
+    return data
+
+
+def read_stream(reader, meta):
+    """Whole image from a decrypting stream positioned after the header (tiles come in order)."""
+    import numpy as np
+
+    h, w, c = meta["shape"]
+    dtype = np.dtype(meta.get("dtype", "uint8"))
+    decompress = _decompressor(meta)
+
+    image = np.empty((h, w, c), dtype=dtype)
+    for y0, y1, x0, x1 in tile_grid(meta["shape"], meta["tile"]):
+        (length,) = _FRAME.unpack(_read_exact(reader, _FRAME.size))
+        data = _read_exact(reader, length)
+        image[y0:y1, x0:x1] = _tile_array(data, decompress, (y1 - y0, x1 - x0, c), dtype)
+
+    return image
+
+
+class _RangeReader:
+    # Sequential reads over a TiledImage, enough for blob.read_header
+    def __init__(self, tiled):
+        self._tiled = tiled
+        self._pos = 0
+
+    def read(self, size):
+        data = self._tiled._read(self._pos, size)
+        self._pos += len(data)
+        return bytes(data)
+
+
+class TiledImage:
+    """
+    Random access to a tiled payload held in a buffer (bytes, mmap, a STORED zip entry).
+    Only the header, the index and the tiles actually asked for are decrypted.
+    """
+
+    def __init__(self, ciphertext, key: bytes):
+        import numpy as np
+
+        self._view = memoryview(ciphertext).cast("B")
+        self._key = key
+        if not rsa.is_ctr(self._view):
+            raise ValueError("❌ Not a tiled payload (tiled images are always AES-CTR).")
+
+        self.meta = blob.read_header(_RangeReader(self))
+        if self.meta["kind"] != "tiles":
+            raise ValueError(f"❌ Not a tiled payload (kind '{self.meta['kind']}').")
+
+        self.shape = tuple(self.meta["shape"])
+        self.tile_size = tuple(self.meta["tile"])
+        self.dtype = np.dtype(self.meta.get("dtype", "uint8"))
+        self._decompress = _decompressor(self.meta)
+
+        plain_len = len(self._view) - rsa.BLOCK_SIZE
+        (index_offset,) = _FOOTER.unpack(self._read(plain_len - _FOOTER.size, _FOOTER.size))
+        self._index = list(_ENTRY.iter_unpack(self._read(index_offset, plain_len - _FOOTER.size - index_offset)))
+
+        self._cols = -(-self.shape[1] // self.tile_size[1])
+        rows = -(-self.shape[0] // self.tile_size[0])
+        if len(self._index) != rows * self._cols:
+            raise ValueError(f"❌ Tile index holds {len(self._index)} tiles, expected {rows * self._cols}")
+
+    def _read(self, offset, length):
+        return rsa.ctr_decrypt_range(self._view, self._key, offset, length)
+
+    def tile(self, row: int, col: int):
+        """Pixels of one tile as an ``(th, tw, c)`` array (edge tiles are smaller)."""
+        h, w, c = self.shape
+        th, tw = self.tile_size
+
+        offset, length = self._index[row * self._cols + col]
+        shape = (min(th, h - row * th), min(tw, w - col * tw), c)
+        return _tile_array(self._read(offset, length), self._decompress, shape, self.dtype)
+
+    def region(self, x: int, y: int, w: int, h: int):
+        """Pixels of the rectangle at ``(x, y)`` sized ``w`` x ``h``, decrypting only the tiles it overlaps."""
+        import numpy as np
+
+        height, width, c = self.shape
+        th, tw = self.tile_size
+
+        if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > width or y + h > height:
+            raise ValueError(f"❌ Region {(x, y, w, h)} is outside the {width}x{height} image")
+
+        out = np.empty((h, w, c), dtype=self.dtype)
+        for row in range(y // th, (y + h - 1) // th + 1):
+            for col in range(x // tw, (x + w - 1) // tw + 1):
+                tile = self.tile(row, col)
+                top, left = row * th, col * tw
+
+                y0, y1 = max(y, top), min(y + h, top + tile.shape[0])
+                x0, x1 = max(x, left), min(x + w, left + tile.shape[1])
+                out[y0 - y : y1 - y, x0 - x : x1 - x] = tile[y0 - top : y1 - top, x0 - left : x1 - left]
+
+        return out
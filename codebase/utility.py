@@ -1,21 +1,21 @@
 import json
 from datetime import datetime
 from pathlib import Path
-import pyzipper
 import os
-import qrcode
-from PIL import Image
-from pyzbar.pyzbar import decode
 import sys
 import random
 from base64 import b64encode, b64decode
 import ast  # To safely convert string representation of bytes back to bytes
 import hashlib
 import base64
+import io
 import re
+import struct
+from contextlib import contextmanager
 
 from codebase import constants as const
 from codebase import rsa
+from codebase import dictionary
 
 # Base directory to root of project
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -35,11 +35,9 @@ aes_key_path = output_path / "bin" / f"{const.timestamp_literal}.txt"
 # ─── RSA Key Save/Load ───────────────────────────────────────────────────────────
 
 # === Rich Console Setup ===
+# pyzipper, qrcode, PIL and pyzbar are imported where used: most runs only need a few of them
 from rich.console import Console
 from rich.highlighter import NullHighlighter
-from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.align import Align
 
 console = Console(
     file=sys.stdout,
@@ -53,10 +51,9 @@ console = Console(
 def log(msg):
     console.print(msg)
 
-import sys
-from rich.prompt import Prompt
-
 def prompt_model_choice():
+    from rich.prompt import Prompt
+
     # Header
     log("[magenta]🛡️   Choose your action:[/magenta]\n")
 
@@ -118,26 +115,42 @@ def rich_divider(char="-", label=None, head_tail=["", ""]):
     log(line)
 
 
-def save_keys(d, n):
+def save_keys(d, n, p=None, q=None):
     timestamp = datetime.now().isoformat()
 
     master = generate_master_code()
     const.master_code = master
     passphrase = fetch_passphrase(master)
 
-    A, B = derive_secret_components(passphrase)
-
-    d_dirty = d * A + B
-    n_dirty = n * B + A
-
-    data = {
-        "timestamp": timestamp,
-        "x": str(d_dirty),     # instead of "d"
-        "y": str(n_dirty),     # instead of "n"
-        "nonce": "ZT49x67!kL", # dummy noise
-        "id": "pkgv4.2",
-        "sig": hex((d_dirty ^ n_dirty) & 0xFFFFFFFF)
-    }
+    if p is None or q is None:
+        A, B = derive_secret_components(passphrase)
+        d_dirty = d * A + B
+        n_dirty = n * B + A
+
+        data = {
+            "timestamp": timestamp,
+            "x": str(d_dirty),     # instead of "d"
+            "y": str(n_dirty),     # instead of "n"
+            "nonce": "ZT49x67!kL", # dummy noise
+            "id": "pkgv4.2",
+            "sig": hex((d_dirty ^ n_dirty) & 0xFFFFFFFF)
+        }
+    else:
+        # CRT form: d and n are rebuilt from these on load. Hex keeps all five inside one QR.
+        # Each field gets its own pad: one shared map would let the fields be solved for each other
+        key = rsa.crt_private_key(d, p, q)
+        values = dict(zip(CRT_FIELDS, (key.p, key.q, key.dP, key.dQ, key.qInv)))
+        sizes = {field: (value.bit_length() + 7) // 8 for field, value in values.items()}
+        masks = derive_field_masks(passphrase, sizes)
+        dirty = {field: format(value ^ masks[field], f"0{2 * sizes[field]}x") for field, value in values.items()}
+
+        data = {
+            "timestamp": timestamp,
+            **dirty,               # x, y, z, w, v instead of p, q, dP, dQ, qInv
+            "nonce": "ZT49x67!kL", # dummy noise
+            "id": "pkgv5.1",
+            "sig": hex((int(dirty["x"], 16) ^ int(dirty["y"], 16)) & 0xFFFFFFFF)
+        }
 
     json_str = json.dumps(data)
     reversed_json = json_str[::-1]
@@ -166,20 +179,25 @@ def load_keys(filepath=send_qr_output_path):
     json_str = reversed_json[::-1]
     data = json.loads(json_str)
 
-    # Step 4: Extract obfuscated key values
-    d_dirty = int(data["x"])
-    n_dirty = int(data["y"])
-
-    # Step 5: Derive A & B from master code
+    # Step 4: Derive the secret components from the master code
     passphrase = fetch_passphrase(const.master_code)
-    A, B = derive_secret_components(passphrase)
 
-    # Step 6: Reconstruct original d and n
-    d = (d_dirty - B) // A
-    n = (n_dirty - A) // B
+    # Step 5: Reconstruct the private key from the obfuscated values
+    if data.get("id") == "pkgv5.1":
+        sizes = {field: len(data[field]) // 2 for field in CRT_FIELDS}
+        masks = derive_field_masks(passphrase, sizes)
+        key = rsa.private_key_from_crt(*[int(data[field], 16) ^ masks[field] for field in CRT_FIELDS])
+    else:
+        A, B = derive_secret_components(passphrase)
+        d_dirty = int(data["x"])
+        n_dirty = int(data["y"])
+
+        d = (d_dirty - B) // A
+        n = (n_dirty - A) // B
+        key = rsa.PrivateKey(d, n)
 
     log(f"\n🔑 <-- Keys loaded from [blue]{filepath}[/blue]\n")
-    return d, n
+    return key
 
 
 def load_rsa_keys(filepath=send_qr_output_path):
@@ -194,6 +212,8 @@ def load_rsa_keys(filepath=send_qr_output_path):
 
 
 def save_as_zip(input_dir, output_zip):
+    import pyzipper
+
     input_dir = Path(input_dir).resolve()
     output_zip = Path(output_zip).resolve()
 
@@ -209,6 +229,8 @@ def save_as_zip(input_dir, output_zip):
     log(f"\n📦 --> Zip created at: [blue]{output_zip}[/blue]\n")
 
 def extract_zip(input_zip, output_dir):
+    import pyzipper
+
     input_zip = Path(input_zip).resolve()
     output_dir = Path(output_dir).resolve()
 
@@ -224,24 +246,240 @@ def extract_zip(input_zip, output_dir):
         print(f"❌ Error: {e}")
 
 
-def save_encrypt_aes(e,n):
+_open_archives = {}
+
+
+def open_zip(zip_path, mode="r"):
+    """Open ``zip_path`` as a STORED archive. Read handles are cached once per process."""
+    import pyzipper
+
+    zip_path = Path(zip_path).resolve()
+
+    if mode != "r":
+        return pyzipper.AESZipFile(zip_path, mode, compression=pyzipper.ZIP_STORED)
+
+    # Keyed by pid: a forked worker must not share the parent's file offset
+    key = (os.getpid(), zip_path)
+    if key not in _open_archives:
+        _open_archives[key] = pyzipper.AESZipFile(zip_path, "r")
+    return _open_archives[key]
+
+
+def close_zips():
+    for archive in _open_archives.values():
+        archive.close()
+    _open_archives.clear()
+
+
+def open_zip_entry(archive, arcname, mode="r"):
+    """Stream an archive entry without extracting it; ``mode`` is ``"r"`` or ``"w"``."""
+    if mode == "w":
+        return archive.open(str(arcname), "w", force_zip64=True)
+    return archive.open(str(arcname), "r")
+
+
+def zip_entry_span(archive, arcname, raw):
+    """
+    ``(offset, size)`` of a STORED, unencrypted entry's bytes within ``raw`` (the whole zip
+    file, e.g. mapped), or ``None`` when the entry has to be read through ``zipfile``.
+    """
+    import pyzipper
+
+    info = archive.getinfo(str(arcname))
+
+    if info.compress_type != pyzipper.ZIP_STORED or info.flag_bits & 0x1:
+        return None
+
+    return entry_data_offset(raw, info.header_offset, arcname), info.compress_size
+
+
+def entry_data_offset(raw, header_offset, arcname=""):
+    """Where an entry's bytes start in ``raw``, given the offset of its local header."""
+    # Local file header: 30 fixed bytes, then the file name and extra field
+    local_header = bytes(raw[header_offset : header_offset + 30])
+    if local_header[:4] != b"PK\x03\x04":
+        raise ValueError(f"❌ Bad local header for zip entry '{arcname}'")
+
+    name_len, extra_len = struct.unpack("<HH", local_header[26:30])
+    return header_offset + 30 + name_len + extra_len
+
+
+def located_entry(raw, header_offset, length, arcname=""):
+    """Bytes of a STORED entry whose local header offset and length are already known (no central directory lookup)."""
+    start = entry_data_offset(raw, header_offset, arcname)
+    return memoryview(raw)[start : start + length]
+
+
+def read_located_entry(fp, header_offset, length, arcname=""):
+    """Like ``located_entry``, reading from an open file instead of a mapped one."""
+    fp.seek(header_offset)
+    start = entry_data_offset(fp.read(30), 0, arcname)
+    fp.seek(header_offset + start)
+    return fp.read(length)
+
+
+def write_zip_entry(archive, arcname, blob):
+    with open_zip_entry(archive, arcname, "w") as f:
+        f.write(blob)
+
+
+class Spool:
+    """
+    Write-only sink for ciphertext another process will store: kept in memory up to
+    ``const.spool_threshold`` bytes, moved to a temp file past that. ``result()`` is the
+    bytes, or the temp file's path (for ``write_zip_spooled``).
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._file = None
+        self.path = None
+        self.size = 0
+
+    def write(self, data):
+        if self._file is None and self.size + len(data) > const.spool_threshold:
+            import tempfile
+
+            fd, self.path = tempfile.mkstemp(suffix=".spool", dir=const.spool_dir)
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+
+        (self._buffer if self._file is None else self._file).write(data)
+        self.size += len(data)
+        return len(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            self._file.close()
+            if exc_type is not None:
+                os.unlink(self.path)
+
+    def result(self):
+        return self._buffer.getvalue() if self._file is None else self.path
+
+
+def write_zip_spooled(archive, arcname, spooled):
+    """Store what a ``Spool`` handed back as entry ``arcname``, copying temp files chunk by chunk."""
+    if isinstance(spooled, bytes):
+        write_zip_entry(archive, arcname, spooled)
+        return
+
+    try:
+        with open(spooled, "rb") as src, open_zip_entry(archive, arcname, "w") as dest:
+            while chunk := src.read(const.AES_chunk_size):
+                dest.write(chunk)
+    finally:
+        os.unlink(spooled)
+
+
+def _local_entry(raw, offset):
+    """``(name, flags, method, dos time, dos date, crc, length, end)`` of the local header at ``offset``, or ``None``."""
+    header = raw[offset : offset + 30]
+    if len(header) < 30 or header[:4] != b"PK\x03\x04":
+        return None
+
+    _, _, flags, method, dos_time, dos_date, crc, length, _, name_len, extra_len = struct.unpack("<4sHHHHHIIIHH", header)
+    name = raw[offset + 30 : offset + 30 + name_len].decode("utf-8" if flags & 0x800 else "cp437")
+    extra = raw[offset + 30 + name_len : offset + 30 + name_len + extra_len]
+
+    if length == 0xFFFFFFFF:
+        # Zip64: the real sizes live in the extra field (uncompressed first)
+        pos = 0
+        while pos + 4 <= len(extra):
+            field_id, size = struct.unpack("<HH", extra[pos : pos + 4])
+            if field_id == 0x0001:
+                length = struct.unpack("<Q", extra[pos + 12 : pos + 20])[0]
+                break
+            pos += 4 + size
+
+    end = offset + 30 + name_len + extra_len + length
+    return name, flags, method, dos_time, dos_date, crc, length, end
+
+
+def reopen_zip(zip_path, keep):
+    """
+    Reopen, for appending, an archive whose writer died before finishing it. ``keep`` maps
+    entry names to the ``(header offset, crc, length)`` they were written with: those still
+    found intact are carried over, the rest of the file after the last of them (a torn
+    entry, an old central directory) is cut off. Returns ``(archive, names kept)``.
+    """
+    import mmap
+    import pyzipper
+
+    zip_path = Path(zip_path).resolve()
+    kept, end = [], 0
+
+    with open(zip_path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        for name, (offset, crc, length) in sorted(keep.items(), key=lambda item: item[1][0]):
+            entry = _local_entry(raw, offset)
+            if entry is None or entry[0] != name or entry[5:7] != (crc, length) or entry[7] > size:
+                continue
+
+            _, flags, method, dos_time, dos_date, _, _, entry_end = entry
+            date_time = ((dos_date >> 9) + 1980, (dos_date >> 5) & 0xF, dos_date & 0x1F, dos_time >> 11, (dos_time >> 5) & 0x3F, (dos_time & 0x1F) * 2)
+            zinfo = pyzipper.ZipInfo(name, date_time)
+            zinfo.header_offset, zinfo.CRC, zinfo.compress_size, zinfo.file_size = offset, crc, length, length
+            zinfo.flag_bits, zinfo.compress_type = flags, method
+            kept.append(zinfo)
+            end = max(end, entry_end)
+
+        if size:
+            raw.close()
+        f.truncate(end)
+
+    # Without an end record the archive is appended to; the entries found are listed again
+    archive = open_zip(zip_path, "a")
+    for zinfo in kept:
+        archive.filelist.append(zinfo)
+        archive.NameToInfo[zinfo.filename] = zinfo
+    return archive, {zinfo.filename for zinfo in kept}
+
+
+def save_encrypt_aes(e,n, archive=None):
     rich_divider()
-    encrypted_AES = rsa.rsa_encrypt(b64encode(const.AES_key).decode("utf-8"),e,n)
+    encrypted_AES = wrap_aes_key(const.AES_key, e, n)
+
+    if archive is not None:
+        write_zip_entry(archive, f"{const.timestamp_literal}.txt", encrypted_AES.encode("utf-8"))
+        return
+
     file_path = zip_src_dir / f"{const.timestamp_literal}.txt"
 
     with open(file_path, "w", encoding="utf-8") as f:
-        f.write(str(encrypted_AES))
+        f.write(encrypted_AES)
 
 
-def load_aes_key(keys, filepath=aes_key_path):
-    d, n = keys
+def load_aes_key(keys, filepath=aes_key_path, archive=None):
     # Read the encrypted AES key string and convert back to bytes
-    with open(filepath, "r", encoding="utf-8") as f:
-        encrypted_str = f.read()
-        encrypted_bytes = ast.literal_eval(encrypted_str)  # Safer than eval()
+    if archive is not None:
+        with open_zip_entry(archive, f"{const.timestamp_literal}.txt") as f:
+            encrypted_str = f.read().decode("utf-8")
+    else:
+        with open(filepath, "r", encoding="utf-8") as f:
+            encrypted_str = f.read()
+    return unwrap_aes_key(encrypted_str, keys)
+
+
+def wrap_aes_key(AES_key, e, n) -> str:
+    """``AES_key`` wrapped under the RSA public key ``(e, n)``, as ``save_encrypt_aes`` writes it."""
+    return str(rsa.rsa_encrypt(b64encode(AES_key).decode("utf-8"), e, n))
+
+
+def unwrap_aes_key(encrypted_str, keys):
+    """AES key from the RSA-wrapped string ``save_encrypt_aes`` writes."""
+    # Accepts a PrivateKey (CRT when available) or a plain [d, n] pair
+    key = keys if isinstance(keys, rsa.PrivateKey) else rsa.PrivateKey(*keys)
+    encrypted_bytes = ast.literal_eval(encrypted_str)  # Safer than eval()
 
     # Decrypt using RSA
-    decrypted_b64_str = rsa.rsa_decrypt(encrypted_bytes, d, n)
+    decrypted_b64_str = rsa.rsa_decrypt_key(encrypted_bytes, key)
 
     # Base64-decode to get original AES key
     AES_key = b64decode(decrypted_b64_str)
@@ -252,6 +490,8 @@ def load_aes_key(keys, filepath=aes_key_path):
 
 
 def json_to_qr(json_path, qr_output_path):
+    import qrcode
+
     with open(json_path, "r") as f:
         data = json.load(f)
 
@@ -271,6 +511,9 @@ def json_to_qr(json_path, qr_output_path):
 
 
 def qr_to_json(qr_image_path, output_json_path=None):
+    from PIL import Image
+    from pyzbar.pyzbar import decode
+
     img = Image.open(qr_image_path)
     decoded_objs = decode(img)
 
@@ -290,12 +533,105 @@ def clean_up(directories: list[str | Path]):
         if not dir_path.exists() or not dir_path.is_dir():
             continue  # Skip non-existent or non-directories
 
-        for item in dir_path.iterdir():
-            if item.is_file():
+        # Bottom-up, so nested folders (kept from nested inputs) are emptied and removed too
+        for root, dirs, files in os.walk(dir_path, topdown=False):
+            for name in files:
                 try:
-                    item.unlink()
+                    (Path(root) / name).unlink()
                 except Exception as e:
-                    print(f"⚠️  Could not delete {item.name} from {dir_path}: {e}")
+                    print(f"⚠️  Could not delete {name} from {root}: {e}")
+            for name in dirs:
+                try:
+                    (Path(root) / name).rmdir()
+                except OSError:
+                    pass
+
+
+# ─── Atomic Writes ────────────────────────────────────────────────────────────
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Temporary name to write ``path`` under (same folder and suffix, so encoders still pick the
+    format); renamed to ``path`` only when the block completes, removed if it fails.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.stem}.partial{path.suffix}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def atomic_write(path):
+    """Binary file opened under a temporary name and renamed to ``path`` once closed (see ``atomic_path``)."""
+    with atomic_path(path) as tmp_path, open(tmp_path, "wb") as f:
+        yield f
+
+
+def remove_partials(root):
+    """Delete what ``atomic_path`` left behind in ``root`` when a run was killed mid-write."""
+    for path in Path(root).rglob(".*.partial*"):
+        path.unlink(missing_ok=True)
+
+
+# ─── Input Discovery ──────────────────────────────────────────────────────────
+
+
+def iter_images(root, extensions=None):
+    """
+    Lazily walk ``root`` (nested folders included) with ``os.scandir`` and yield
+    ``(path, relative_path)`` for every image file as soon as it is found.
+    Nothing is listed up front, so the first image is ready immediately even
+    in folders holding millions of files.
+    """
+    extensions = extensions or const.image_extensions
+    root = Path(root)
+    pending = [root]
+
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                        yield entry.path, Path(entry.path).relative_to(root).as_posix()
+        except OSError as e:
+            print(f"⚠️  Could not scan {current}: {e}")
+
+
+def bin_name_for(relative_path):
+    # Keep the full name (extension included), so 'a.b.png' and 'a.png' never collide
+    return f"{relative_path}.bin"
+
+
+def image_name_for(bin_name, taken=None, suffix=".png"):
+    """
+    Output name for an archive entry: '.bin' dropped, saved with ``suffix``
+    (``None`` keeps the original name; passthrough entries always get it back on save).
+    Names that would step outside the output folder are rejected.
+    """
+    relative = Path(bin_name[: -len(".bin")] if bin_name.endswith(".bin") else bin_name)
+
+    if relative.is_absolute() or ".." in relative.parts:
+        raise ValueError(f"❌ Unsafe entry name in archive: '{bin_name}'")
+
+    if suffix is None:
+        return relative
+
+    name = relative.with_suffix(suffix)
+    # 'x.jpg' and 'x.png' side by side: keep the second one apart as 'x.jpg.png'
+    if taken is not None:
+        if name in taken:
+            name = relative.with_name(relative.name + suffix)
+        taken.add(name)
+    return name
 
 
 def derive_secret_components(passphrase: str, salt: bytes = b"MyFixedSalt", iterations: int = 100_000) -> tuple[int, int]:
@@ -308,11 +644,19 @@ def derive_secret_components(passphrase: str, salt: bytes = b"MyFixedSalt", iter
     
     return A, B
 
-def fetch_passphrase(master_code: str) -> str:
-    # Load the dictionary
-    with open(dict_path, "r", encoding="utf-8") as f:
-        lookup = json.load(f)
+# QR fields holding p, q, dP, dQ and qInv
+CRT_FIELDS = ("x", "y", "z", "w", "v")
+
 
+def derive_field_masks(passphrase: str, sizes: dict, salt: bytes = b"MyFixedSalt", iterations: int = 100_000) -> dict:
+    """One independent pad per key field, ``sizes[field]`` bytes long: SHAKE-256 of a PBKDF2 seed and the field name."""
+    seed = hashlib.pbkdf2_hmac("sha256", passphrase.encode(), salt + b"/fields", iterations=iterations, dklen=32)
+    return {
+        field: int.from_bytes(hashlib.shake_256(seed + field.encode()).digest(size), byteorder="big")
+        for field, size in sizes.items()
+    }
+
+def fetch_passphrase(master_code: str) -> str:
     # Clean and split master code into chunks
     chunks = master_code.replace("-", "")
     if len(chunks) != 12 or not chunks.isdigit():
@@ -320,9 +664,9 @@ def fetch_passphrase(master_code: str) -> str:
 
     parts = [chunks[i:i+4] for i in range(0, 12, 4)]
 
-    # Map each 4-digit number to its value in the dictionary
+    # Map each 4-digit number to its value in the (memory-mapped) dictionary index
     try:
-        words = [lookup[part] for part in parts]
+        words = [dictionary.lookup(part) for part in parts]
     except KeyError as e:
         raise ValueError(f"❌ Code chunk '{e.args[0]}' not found in dictionary")
 
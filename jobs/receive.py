@@ -1,8 +1,12 @@
-from codebase import img_processing
+from codebase import batch
+from codebase import pipeline
+from codebase import metrics
+from codebase import archive_index
+from codebase import key_session
+from codebase import checkpoint
 from codebase import utility as util
 from codebase import constants as const
 
-import os
 import time
 import argparse
 from pathlib import Path
@@ -15,40 +19,217 @@ dest_dir = BASE_DIR / "output/receive/"
 zip_src_path = BASE_DIR / "output/send/archive.zip"
 zip_dest_dir = BASE_DIR / "output/bin"
 
-util.clean_up(const.clean_up_receive)
 
-util.rich_divider()
-util.log(f"\n[yellow]🚀  Initiating  Decryption[/yellow]\n")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Decrypt the received archive back into images.")
+    parser.add_argument("--workers", type=int, default=const.workers, help="Worker processes used for decryption")
+    parser.add_argument("--staged", action="store_true", help="Extract the archive to 'output/bin' first, then decrypt")
+    parser.add_argument("--pipeline", action="store_true", help="Overlap read, decrypt and image save on threads instead of a process pool")
+    parser.add_argument("--format", choices=const.output_formats, default=const.output_format, help="Output files: png, bmp, tiff (uncompressed), npy (raw arrays) or original (each image's own format)")
+    parser.add_argument("--png-level", type=int, choices=range(10), default=const.png_compress_level, metavar="0-9", help="PNG compression level (0 is fastest)")
+    parser.add_argument("--encoders", type=int, default=const.encode_threads, help="Threads saving images in --pipeline mode")
+    parser.add_argument("--frame", type=int, metavar="N", help="Multi-frame images: save only frame N (from 0) instead of rebuilding the sequence")
+    parser.add_argument("--list", action="store_true", help="List the archive's images (from its encrypted index) instead of decrypting them")
+    parser.add_argument("--select", nargs="+", metavar="NAME", help="Decrypt only these images: names or glob patterns like 'scans/*.png' ('*' stays inside a folder, '**' spans folders)")
+    parser.add_argument("--archives", nargs="+", type=Path, default=[zip_src_path], metavar="ZIP", help="Archives to decrypt in one go; those of one key session ask for the master code once")
+    parser.add_argument("--qr", type=Path, default=util.send_qr_output_path, help="QR code holding the (session) keys")
+    parser.add_argument("--resume", action="store_true", help="Make the Receive resumable, or continue one that was interrupted: images already saved are kept, the rest are decrypted")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.staged and (args.list or args.select):
+        parser.error("--list / --select read single entries straight from the archive; drop --staged")
+    return args
+
+
+def decrypt_all(jobs, args, journal, zip_path=None):
+    metrics.reporter.start("receive")
+    if journal is not None:
+        jobs = journal.pending(jobs)
+    try:
+        if args.pipeline:
+            pipeline.decrypt_all(jobs, zip_path=zip_path, journal=journal)
+        else:
+            batch.decrypt_all(jobs, workers=args.workers, zip_path=zip_path, journal=journal)
+    finally:
+        metrics.reporter.finish()
+
+
+def decryption_jobs(bin_names, staged=False, out_dir=dest_dir):
+    """``(source, img_path)`` per encrypted entry, keeping the sender's folder layout."""
+    taken = set()
+    suffix = const.output_formats[const.output_format]
+    for bin_name in bin_names:
+        img_path = out_dir / util.image_name_for(bin_name, taken, suffix)
+        img_path.parent.mkdir(parents=True, exist_ok=True)
+        yield (str(src_dir / bin_name) if staged else bin_name), str(img_path)
+
+
+def selected_jobs(records, out_dir=dest_dir):
+    """Like ``decryption_jobs``, for index records: each source carries its entry's location in the zip."""
+    records = list(records)
+    names = (record["entry"] for record in records)
+    for record, (_, img_path) in zip(records, decryption_jobs(names, out_dir=out_dir)):
+        yield (record["entry"], record["offset"], record["length"]), img_path
+
+
+def output_dirs(archives):
+    """``(zip_path, out_dir)``: one archive goes to 'output/receive', several to a folder each."""
+    if len(archives) == 1:
+        yield archives[0], dest_dir
+        return
+
+    taken = set()
+    for zip_path in archives:
+        name = Path(zip_path).stem
+        while name in taken:
+            name += "_"
+        taken.add(name)
+        yield zip_path, dest_dir / name
+
+
+def archive_signature(zip_path):
+    try:
+        stat = Path(zip_path).stat()
+    except OSError:
+        return [str(zip_path), None, None]
+    return [str(Path(zip_path).resolve()), stat.st_size, stat.st_mtime_ns]
+
+
+def open_journal(args):
+    """The interrupted Receive's journal (when it received the same archives the same way), else a new one."""
+    header = {
+        "job": "receive",
+        "archives": [archive_signature(path) for path in args.archives],
+        "format": args.format,
+        "frame": args.frame,
+        "select": args.select,
+    }
+    expected = {name: value for name, value in header.items() if name != "job"}
+
+    journal = checkpoint.ReceiveJournal.load(**expected)
+    if journal is not None:
+        journal.validate()
+        util.remove_partials(dest_dir)
+        util.log(f"\n♻️  Resumed: [bold cyan]{len(journal.records)}[/bold cyan] images already decrypted")
+        return journal.start()
+    util.log("\n[yellow]⚠️  No interrupted Receive to resume: starting a new, resumable one[/yellow]")
+
+    checkpoint.forget(checkpoint.receive_journal_path)
+    return checkpoint.ReceiveJournal(header=header).start()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    const.output_format = args.format
+    const.png_compress_level = args.png_level
+    const.encode_threads = args.encoders
+    const.frame_index = args.frame
+    metrics.configure(args)
+
+    util.clean_up(const.clean_up_receive)
+
+    util.rich_divider()
+    util.log(f"\n[yellow]🚀  Initiating  Decryption[/yellow]\n")
+
+    # Unlocked private keys stay in memory for the whole run: one master code per key session
+    keyring = key_session.Keyring()
+    # Journaled only with --resume: that's what a later --resume continues from
+    journal = open_journal(args) if args.resume and not args.list else None
+    if not args.resume:
+        checkpoint.forget(checkpoint.receive_journal_path)
 
-const.master_code = util.read_master_code()
+    for zip_path, out_dir in output_dirs(args.archives):
+        if len(args.archives) > 1:
+            util.rich_divider()
+            util.log(f"\n📦 <-- Archive: [blue]{zip_path}[/blue]")
+
+        try:
+            keys = keyring.unlock(archive_index.archive_key_id(zip_path), args.qr)
+        except (OSError, ValueError) as err:
+            print(f"\n{err}\n")
+            continue
 
-util.rich_divider()
-util.extract_zip(zip_src_path, zip_dest_dir)
+        receive_archive(args, zip_path, out_dir, keys, journal)
 
-d, n = util.load_keys()
+    if journal is not None:
+        journal.remove()
 
-const.AES_key = util.load_aes_key([d,n])
 
-util.rich_divider()
-print("\n⌛  Started Decryption ...\n")
+def receive_archive(args, zip_path, out_dir, keys, journal):
+    if args.list or args.select:
+        return receive_selected(args, zip_path, out_dir, keys, journal)
 
+    if args.staged:
+        util.rich_divider()
+        util.extract_zip(zip_path, zip_dest_dir)
+        const.AES_key = util.load_aes_key(keys)
+    else:
+        # Entries are decrypted straight out of the archive, nothing is extracted to disk
+        archive = util.open_zip(zip_path)
+        const.AES_key = util.load_aes_key(keys, archive=archive)
 
-dec_start_time = time.time()
+    util.rich_divider()
+    print("\n⌛  Started Decryption ...\n")
 
-for filename in os.listdir(src_dir):
 
-    if filename == f"{const.timestamp_literal}.txt":
-        continue
+    dec_start_time = time.time()
 
-    file_list = filename.split(".")
-    bin_path = os.path.join(src_dir, filename)
-    img_path = os.path.join(dest_dir, file_list[0] + ".png")
-    img_processing.bin_to_img(bin_path, img_path)
+    if args.staged:
+        bin_names = (relative_path for _, relative_path in util.iter_images(src_dir, extensions={".bin"}))
+    else:
+        bin_names = (name for name in archive.namelist() if name.endswith(".bin"))
 
-dec_end_time = time.time()
-tot_dec_time = dec_end_time - dec_start_time
+    jobs = decryption_jobs(bin_names, args.staged, out_dir)
 
-util.clean_up(const.clean_up_post)
+    if args.staged:
+        decrypt_all(jobs, args, journal)
+    else:
+        decrypt_all(jobs, args, journal, zip_path=zip_path)
+        util.close_zips()
 
-util.rich_divider()
-util.log(f"✅🔓  Decrypted in [bold cyan]{util.format_time(tot_dec_time)}   ⏱[bold cyan]")
+    dec_end_time = time.time()
+    tot_dec_time = dec_end_time - dec_start_time
+
+    util.clean_up(const.clean_up_post)
+
+    util.rich_divider()
+    util.log(f"✅🔓  Decrypted in [bold cyan]{util.format_time(tot_dec_time)}   ⏱[bold cyan]")
+
+
+def receive_selected(args, zip_path, out_dir, keys, journal):
+    """``--list`` / ``--select``: work from the archive index, reading only the entries asked for."""
+    dec_start_time = time.time()
+
+    try:
+        index = archive_index.IndexedArchive(zip_path, keys)
+    except ValueError as err:
+        print(f"\n{err}\n")
+        return
+
+    const.AES_key = index.aes_key
+    records = index.select(args.select) if args.select else index
+
+    if args.list:
+        util.rich_divider()
+        archive_index.print_listing(records)
+        return
+
+    records = list(records)
+    util.rich_divider()
+    print(f"\n⌛  Started Decryption of {len(records)} selected images ...\n")
+
+    decrypt_all(selected_jobs(records, out_dir), args, journal, zip_path=zip_path)
+
+    dec_end_time = time.time()
+    tot_dec_time = dec_end_time - dec_start_time
+
+    util.clean_up(const.clean_up_post)
+
+    util.rich_divider()
+    util.log(f"✅🔓  Decrypted in [bold cyan]{util.format_time(tot_dec_time)}   ⏱[bold cyan]")
+
+
+# Guarded so worker processes started with 'spawn' don't re-run the job
+if __name__ == "__main__":
+    main()
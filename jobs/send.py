@@ -1,12 +1,20 @@
-import os
+import itertools
 import time
 from pathlib import Path
 import argparse
 
-from codebase import img_processing
+from codebase import batch
+from codebase import pipeline
 from codebase import utility as util
 from codebase import constants as const
 from codebase import rsa
+from codebase import blob
+from codebase import primes
+from codebase import incremental
+from codebase import metrics
+from codebase import archive_index
+from codebase import key_session
+from codebase import checkpoint
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -17,44 +25,236 @@ zip_src_dir = BASE_DIR / "output/bin"
 zip_dest_path = BASE_DIR / "output/send/archive.zip"
 
 
-img_path_list = os.listdir(img_src_dir)
+def codec_arg(spec):
+    try:
+        blob.get_codec(spec)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+    return spec
 
-if img_path_list == [] :
-    print("\n❌ No Images for input\n\n✅ Please add Images to '/data' and re-run\n")
-    exit()
 
-util.clean_up(const.clean_up_send)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Encrypt every image in '/data' into an archive.")
+    parser.add_argument("--workers", type=int, default=const.workers, help="Worker processes used for encryption")
+    parser.add_argument("--staged", action="store_true", help="Write .bin files to 'output/bin' first, then zip them")
+    parser.add_argument("--pipeline", action="store_true", help="Overlap read/decode, encrypt and write on threads instead of a process pool")
+    parser.add_argument("--codec", type=codec_arg, default=const.payload_codec, help="Compress pixels before encryption: none, zlib[:level], lzma[:preset], lz4, zstd")
+    parser.add_argument("--cipher", choices=["cbc", "ctr"], default=const.AES_mode, help="AES mode: cbc, or ctr to split each image over several threads")
+    parser.add_argument("--tile", type=int, default=const.tile_size, help="Encrypt images as independent square tiles of this size, for region-by-region decryption (0: off)")
+    parser.add_argument("--incremental", action="store_true", help="Only encrypt new / changed images; unchanged ones reuse their ciphertext from the last incremental archive")
+    parser.add_argument("--passthrough", action="store_true", help="Encrypt the original files as-is instead of decoded pixels; receive restores them byte for byte")
+    parser.add_argument("--first-frame", action="store_true", help="Encrypt only the first frame of animated GIF / PNG / WebP and multi-page TIFF inputs")
+    parser.add_argument("--session", action="store_true", help="Reuse one RSA key, QR and master code across Sends (started on first use); each archive still gets its own AES key")
+    parser.add_argument("--new-session", action="store_true", help="With --session: start a new key session instead of continuing the running one")
+    parser.add_argument("--resume", action="store_true", help="Make the Send resumable, or continue one that was interrupted: images it already finished are kept, the rest are encrypted (asks for its master code)")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.resume and args.incremental:
+        parser.error("--resume can't be combined with --incremental (re-run the incremental Send instead)")
+    return args
 
-util.rich_divider()
-util.log(f"\n[green]🚀  Initiating Encryption[/green]\n")
 
-AES_key, [e, d, n] = rsa.generate_keys(bits=2048)
+def encrypt_all(jobs, args, index, journal, archive=None):
+    metrics.reporter.start("send")
+    if journal is not None:
+        journal.start()
+    try:
+        if args.pipeline:
+            pipeline.encrypt_all(jobs, archive=archive, index=index, journal=journal)
+        else:
+            batch.encrypt_all(jobs, workers=args.workers, archive=archive, index=index, journal=journal)
+    finally:
+        if journal is not None:
+            journal.close()
+        metrics.reporter.finish()
 
-util.save_keys(d, n)
 
-util.rich_divider()
-print("\n⌛  Started Encryption ...\n")
+def open_bin(bin_name):
+    bin_path = bin_dest_dir / bin_name
+    bin_path.parent.mkdir(parents=True, exist_ok=True)
+    return open(bin_path, "wb")
 
-enc_start_time = time.time()
 
-for filename in img_path_list:
-    file_list = filename.split(".")
-    img_path = os.path.join(img_src_dir, filename)
-    bin_path = os.path.join(bin_dest_dir, file_list[0] + ".bin")
-    img_processing.img_to_bin(img_path, bin_path)
+def encryption_jobs(images, staged=False):
+    """``(img_path, destination)`` per discovered image: an archive entry name, or a .bin path when staged."""
+    for img_path, relative_path in images:
+        bin_name = util.bin_name_for(relative_path)
 
-util.save_encrypt_aes(e,n)
+        if not staged:
+            yield img_path, bin_name
+            continue
 
-util.save_as_zip(zip_src_dir, zip_dest_path)
+        bin_path = bin_dest_dir / bin_name
+        bin_path.parent.mkdir(parents=True, exist_ok=True)
+        yield img_path, str(bin_path)
 
-enc_end_time = time.time()
-tot_enc_time = enc_end_time - enc_start_time
 
-util.rich_divider()
-util.log(f"✅🔒 Encrypted in [bold cyan]{util.format_time(tot_enc_time)}   ⏱[bold cyan]")
-util.rich_divider()
-util.log(f"\n[yellow]🛡️  Master code [/yellow] : [bold bright_cyan]{const.master_code}[/ bold bright_cyan]\n")
-util.log("[bright_green]Note : This code is to be shared, copy/save this.[bright_green]")
+def main(argv=None):
+    args = parse_args(argv)
+    const.payload_codec = args.codec
+    const.passthrough = args.passthrough
+    const.AES_mode = args.cipher
+    const.tile_size = args.tile
+    const.multi_frame = not args.first_frame
+    metrics.configure(args)
 
-util.clean_up(const.clean_up_post)
+    # Images are discovered lazily and streamed into the encryption loop as they're found
+    images = util.iter_images(img_src_dir)
+    first_image = next(images, None)
 
+    if first_image is None :
+        print("\n❌ No Images for input\n\n✅ Please add Images to '/data' and re-run\n")
+        return
+
+    if args.incremental:
+        manifest = incremental.Manifest.load()
+        # Before the clean-up: the last archive and its QR still have the blobs to reuse and their key
+        manifest.adopt_previous_archive(zip_dest_path)
+        manifest.unlock(util.send_qr_output_path)
+    else:
+        incremental.forget()
+
+    journal = None
+    if args.resume:
+        journal = checkpoint.SendJournal.load(staged=args.staged, settings=incremental.settings_fingerprint())
+        if journal is None:
+            util.log("\n[yellow]⚠️  No interrupted Send to resume: starting a new, resumable one[/yellow]")
+        else:
+            journal.validate(img_src_dir, bin_dest_dir if args.staged else None)
+    else:
+        checkpoint.forget(checkpoint.send_journal_path)
+
+    resumed = journal is not None
+    # A resumed Send keeps what it already wrote to 'output/bin' / 'output/send'
+    util.clean_up(const.clean_up_resume if resumed else const.clean_up_send)
+
+    util.rich_divider()
+    util.log(f"\n[green]🚀  Initiating Encryption[/green]\n")
+
+    session = key_session.SendSession.load() if args.session and not args.new_session else None
+
+    if resumed:
+        # Same RSA key, QR and master code as the interrupted run: its master code unwraps the
+        # AES key the images already done are under
+        e, n = journal.public_key
+        keys = key_session.Keyring().unlock(key_session.fingerprint(n), util.send_qr_output_path)
+        AES_key = const.AES_key = journal.aes_key(keys)
+        if session is not None and session.key_id != key_session.fingerprint(n):
+            session = None
+        new_keys = False
+    else:
+        new_keys = session is None
+
+        if new_keys:
+            AES_key, [e, d, n] = rsa.generate_keys(bits=2048)
+        else:
+            # Same RSA key, QR and master code as the session's first archive: only the AES key is new
+            AES_key = rsa.generate_aes_key()
+            e, n = session.e, session.n
+
+        if args.incremental and manifest.aes_key:
+            # Reused blobs are under the previous AES key; the RSA key only re-wraps it
+            AES_key = const.AES_key = manifest.aes_key
+
+        if args.resume:
+            journal = checkpoint.SendJournal(header={
+                "job": "send",
+                "staged": args.staged,
+                "settings": incremental.settings_fingerprint(),
+                "aes_key": util.wrap_aes_key(AES_key, e, n),
+                "e": e,
+                "n": n,
+            })
+
+        if new_keys:
+            util.save_keys(d, n, const.RSA_p, const.RSA_q)
+            if args.session:
+                session = key_session.SendSession.start(e, n, util.send_qr_output_path)
+        else:
+            session.restore_qr(util.send_qr_output_path)
+            util.log(f"\n🔑 Key session [bold cyan]{session.key_id}[/bold cyan] : keys, QR and master code reused\n")
+
+    util.rich_divider()
+    print("\n⌛  Started Encryption ...\n")
+
+    enc_start_time = time.time()
+
+    images = itertools.chain([first_image], images)
+
+    reused, records = [], {}
+    if args.incremental:
+        images = manifest.split(images, reused, records)
+
+    # Encrypted listing of the archive, so Receive can pick single images out of it
+    index = archive_index.ArchiveIndex(root=bin_dest_dir if args.staged else None)
+    dest_for = (lambda entry: bin_dest_dir / entry) if args.staged else str
+
+    if resumed:
+        util.log(f"♻️  Resumed: [bold cyan]{len(journal.records)}[/bold cyan] images already encrypted\n")
+        images = journal.pending(images, index, dest_for)
+    jobs = encryption_jobs(images, args.staged)
+
+    if args.staged:
+        if journal is not None:
+            journal.bin_dir = bin_dest_dir
+        encrypt_all(jobs, args, index, journal)
+
+        incremental.copy_entries(reused, open_bin)
+        index.reuse(incremental.previous_archive_path, AES_key, reused)
+
+        util.save_encrypt_aes(e,n)
+
+        util.save_as_zip(zip_src_dir, zip_dest_path)
+        with util.open_zip(zip_dest_path, "a") as archive:
+            index.write(archive, AES_key, key_session.fingerprint(n))
+    else:
+        # Encrypted blobs go straight into the archive, never touching 'output/bin'
+        archive = journal.reopen_archive(zip_dest_path) if resumed else util.open_zip(zip_dest_path, "w")
+        if journal is not None:
+            journal.archive = archive
+        with archive:
+            encrypt_all(jobs, args, index, journal, archive=archive)
+
+            incremental.copy_entries(reused, lambda name: util.open_zip_entry(archive, name, "w"))
+            index.reuse(incremental.previous_archive_path, AES_key, reused)
+
+            util.save_encrypt_aes(e,n, archive=archive)
+            index.write(archive, AES_key, key_session.fingerprint(n))
+
+        util.log(f"\n📦 --> Zip created at: [blue]{zip_dest_path}[/blue]\n")
+
+    if journal is not None:
+        journal.remove()
+
+    if args.incremental:
+        incremental.save(key_session.fingerprint(n), records, zip_dest_path)
+        util.log(f"♻️  Reused [bold cyan]{len(reused)}[/bold cyan] unchanged images, encrypted [bold cyan]{len(records) - len(reused)}[/bold cyan]\n")
+
+    enc_end_time = time.time()
+    tot_enc_time = enc_end_time - enc_start_time
+
+    util.rich_divider()
+    util.log(f"✅🔒 Encrypted in [bold cyan]{util.format_time(tot_enc_time)}   ⏱[bold cyan]")
+    util.rich_divider()
+    if session is not None:
+        session.archives += 1
+        session.save()
+        util.log(f"\n[yellow]🔑  Key session[/yellow] : [bold bright_cyan]{session.key_id}[/bold bright_cyan]  ---  archive #{session.archives}")
+
+    if new_keys:
+        util.log(f"\n[yellow]🛡️  Master code [/yellow] : [bold bright_cyan]{const.master_code}[/ bold bright_cyan]\n")
+        util.log("[bright_green]Note : This code is to be shared, copy/save this.[bright_green]")
+    elif resumed:
+        util.log("\n[bright_green]Same QR and master code as the interrupted Send.[bright_green]\n")
+    else:
+        util.log("\n[bright_green]Same QR and master code as the first archive of this session.[bright_green]\n")
+
+    util.clean_up(const.clean_up_post)
+
+    # Encryption is done: an on-disk prime pool is restocked by a detached process, not waited on
+    primes.default_pool().restock()
+
+
+# Guarded so worker processes started with 'spawn' don't re-run the job
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Watch mode: a long-running Send that encrypts images as they land in '/data'.
+
+Imports, the key session and the worker pool are set up once, so each new image costs
+its own encryption and nothing else. New and changed files are noticed through inotify
+(the optional ``watchdog`` package) or by polling the folder, and only read once they
+are complete: closed after writing (inotify), or with size and mtime unchanged for
+``--settle`` seconds. Images go straight into the current archive in 'output/send/watch/',
+kept under a partial name until it is rotated (by size or age): then its AES key is
+wrapped, its index written and it is renamed to ``<start time>.zip``. Every archive is
+under the session's RSA key, so one QR and master code open all of them
+(``python -m jobs.receive --archives output/send/watch/*.zip``).
+
+Ctrl-C / SIGTERM finish the current archive before stopping.
+"""
+import json
+import os
+import signal
+import threading
+import time
+import argparse
+from pathlib import Path
+
+from codebase import batch
+from codebase import utility as util
+from codebase import constants as const
+from codebase import rsa
+from codebase import primes
+from codebase import metrics
+from codebase import archive_index
+from codebase import key_session
+from jobs import send
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+img_src_dir = send.img_src_dir
+watch_dir = BASE_DIR / const.watch_dir
+state_path = BASE_DIR / const.watch_state_path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Keep encrypting images as they arrive in '/data', into rotating archives.")
+    parser.add_argument("--workers", type=int, default=const.workers, help="Worker processes kept warm for encryption")
+    parser.add_argument("--codec", type=send.codec_arg, default=const.payload_codec, help="Compress pixels before encryption: none, zlib[:level], lzma[:preset], lz4, zstd")
+    parser.add_argument("--cipher", choices=["cbc", "ctr"], default=const.AES_mode, help="AES mode: cbc, or ctr to split each image over several threads")
+    parser.add_argument("--tile", type=int, default=const.tile_size, help="Encrypt images as independent square tiles of this size (0: off)")
+    parser.add_argument("--passthrough", action="store_true", help="Encrypt the original files as-is instead of decoded pixels")
+    parser.add_argument("--first-frame", action="store_true", help="Encrypt only the first frame of multi-frame inputs")
+    parser.add_argument("--new-session", action="store_true", help="Start a new key session instead of continuing the running one")
+    parser.add_argument("--interval", type=float, default=const.watch_interval, help="Seconds between looks at the input folder")
+    parser.add_argument("--settle", type=float, default=const.watch_settle, help="Seconds a file must stay unchanged before it is encrypted")
+    parser.add_argument("--rotate-mb", type=float, default=const.watch_rotate_mb, help="Finish the archive once it holds this many MB")
+    parser.add_argument("--rotate-minutes", type=float, default=const.watch_rotate_minutes, help="Finish the archive this long after its first image")
+    parser.add_argument("--poll", action="store_true", help="Poll the folder even when inotify (watchdog) is available")
+    metrics.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+# ─── Watching ─────────────────────────────────────────────────
+class PollingWatcher:
+    """Every look lists the whole folder; the settler sorts out what is new."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def changed(self):
+        return util.iter_images(self.root), set()
+
+    def stop(self):
+        pass
+
+
+class InotifyWatcher:
+    """Paths created / modified / moved in since the last look, from watchdog's observer thread."""
+
+    def __init__(self, root):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._paths, self._closed = set(), set()
+        self._first = True
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                path = getattr(event, "dest_path", None) or event.src_path
+                with watcher._lock:
+                    watcher._paths.add(path)
+                    if event.event_type in ("closed", "moved"):
+                        watcher._closed.add(path)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(self.root), recursive=True)
+        self._observer.start()
+
+    def changed(self):
+        """``(candidates, paths known to be complete)``; the first look also lists what was already there."""
+        with self._lock:
+            paths, closed = self._paths, self._closed
+            self._paths, self._closed = set(), set()
+
+        candidates = [
+            (path, Path(path).relative_to(self.root).as_posix())
+            for path in paths
+            if os.path.splitext(path)[1].lower() in const.image_extensions
+        ]
+        if self._first:
+            self._first = False
+            candidates = list(util.iter_images(self.root)) + candidates
+        return candidates, closed
+
+    def stop(self):
+        self._observer.stop()
+        self._observer.join()
+
+
+def make_watcher(root, poll=False):
+    if not poll:
+        try:
+            return InotifyWatcher(root)
+        except ImportError:
+            util.log("[yellow]⚠️  inotify needs the optional 'watchdog' package (pip install watchdog): polling instead[/yellow]")
+    return PollingWatcher(root)
+
+
+class Settler:
+    """
+    Debounces partial writes: a file is handed out once it was closed after writing, or once its
+    size and mtime have held still for ``settle`` seconds; and only if it wasn't handed out as it is.
+    """
+
+    def __init__(self, settle, sent=None):
+        self.settle = settle
+        self._handed = dict(sent or {})   # relative path -> [size, mtime_ns] already taken care of
+        self._pending = {}                # relative path -> (path, signature, since)
+
+    def ready(self, candidates, closed=()):
+        now = time.monotonic()
+        for path, relative_path in candidates:
+            if relative_path not in self._pending:
+                self._pending[relative_path] = (path, None, now)
+
+        ready = []
+        for relative_path, (path, previous, since) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Gone (or renamed) before it settled
+                del self._pending[relative_path]
+                continue
+
+            signature = [stat.st_size, stat.st_mtime_ns]
+            if self._handed.get(relative_path) == signature:
+                del self._pending[relative_path]
+            elif stat.st_size and (path in closed or (signature == previous and now - since >= self.settle)):
+                ready.append((path, relative_path, signature))
+                self._handed[relative_path] = signature
+                del self._pending[relative_path]
+            elif signature != previous:
+                self._pending[relative_path] = (path, signature, now)
+        return ready
+
+
+# ─── Archives ─────────────────────────────────────────────────
+def load_state(path=state_path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(sent, path=state_path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(sent, f)
+    os.replace(tmp_path, path)
+
+
+class RotatingArchive:
+    """
+    The archive images are being added to. Each one gets a fresh AES key and stays under a
+    partial name until ``rotate`` finishes it; what a crash leaves behind is dropped and
+    its images are encrypted again on the next start (they are only marked as sent once
+    their archive is finished).
+    """
+
+    def __init__(self, session, sent, rotate_bytes, rotate_seconds, pool=None, workers=1):
+        self.session = session
+        self.sent = sent
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.pool = pool
+        self.workers = workers
+        self.archive = None
+
+    def _open(self):
+        watch_dir.mkdir(parents=True, exist_ok=True)
+        self.name = time.strftime("%Y-%m-%d_%H-%M-%S")
+        while (watch_dir / f"{self.name}.zip").exists():
+            self.name += "_"
+        self.path = watch_dir / f".{self.name}.partial.zip"
+
+        self.aes_key = rsa.generate_aes_key()
+        self.archive = util.open_zip(self.path, "w")
+        self.index = archive_index.ArchiveIndex()
+        self.images = {}
+        self.opened = time.monotonic()
+
+    def add(self, ready):
+        """Encrypt ``(path, relative_path, signature)`` images into the archive."""
+        if self.archive is not None and any(relative_path in self.images for _, relative_path, _ in ready):
+            # A changed image can't get a second entry of the same name: it starts the next archive
+            self.rotate()
+        if self.archive is None:
+            self._open()
+
+        const.AES_key = self.aes_key
+        signatures = {util.bin_name_for(relative_path): (relative_path, signature) for _, relative_path, signature in ready}
+        jobs = [(path, util.bin_name_for(relative_path)) for path, relative_path, _ in ready]
+        batch.encrypt_all(jobs, workers=self.workers, archive=self.archive, index=self.index, pool=self.pool)
+
+        for entry in self.index.records.keys() & signatures.keys():
+            relative_path, signature = signatures[entry]
+            self.images[relative_path] = signature
+
+    def due(self) -> bool:
+        if self.archive is None or not self.images:
+            return False
+        return self.archive.fp.tell() >= self.rotate_bytes or time.monotonic() - self.opened >= self.rotate_seconds
+
+    def rotate(self):
+        """Finish the current archive: wrap its AES key, write its index, give it its real name."""
+        if self.archive is None:
+            return
+
+        archive, self.archive = self.archive, None
+        with archive:
+            if self.images:
+                const.AES_key = self.aes_key
+                util.save_encrypt_aes(self.session.e, self.session.n, archive=archive)
+                self.index.write(archive, self.aes_key, self.session.key_id)
+
+        if not self.images:
+            self.path.unlink(missing_ok=True)
+            return
+
+        final_path = watch_dir / f"{self.name}.zip"
+        os.replace(self.path, final_path)
+        self.sent.update(self.images)
+        save_state(self.sent)
+        self.session.archives += 1
+        self.session.save()
+
+        util.rich_divider()
+        util.log(f"\n📦 --> Archive #{self.session.archives} with [bold cyan]{len(self.images)}[/bold cyan] images: [blue]{final_path}[/blue]\n")
+
+
+# ─── Daemon ───────────────────────────────────────────────────
+def open_session(new_session=False):
+    """The running key session, or a new one (RSA key, QR and master code generated here)."""
+    session = None if new_session else key_session.SendSession.load()
+    if session is not None:
+        session.restore_qr(util.send_qr_output_path)
+        util.log(f"\n🔑 Key session [bold cyan]{session.key_id}[/bold cyan] : keys, QR and master code reused\n")
+        return session
+
+    util.clean_up(["keys"])
+    _, [e, d, n] = rsa.generate_keys(bits=2048)
+    util.save_keys(d, n, const.RSA_p, const.RSA_q)
+    session = key_session.SendSession.start(e, n, util.send_qr_output_path)
+
+    util.rich_divider()
+    util.log(f"\n[yellow]🔑  Key session[/yellow] : [bold bright_cyan]{session.key_id}[/bold bright_cyan]")
+    util.log(f"\n[yellow]🛡️  Master code [/yellow] : [bold bright_cyan]{const.master_code}[/ bold bright_cyan]\n")
+    util.log("[bright_green]Note : This code is to be shared, copy/save this. It opens every archive of this session.[bright_green]")
+    return session
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    const.payload_codec = args.codec
+    const.passthrough = args.passthrough
+    const.AES_mode = args.cipher
+    const.tile_size = args.tile
+    const.multi_frame = not args.first_frame
+    metrics.configure(args)
+
+    util.rich_divider()
+    util.log(f"\n[green]🚀  Initiating Watch mode[/green]\n")
+
+    session = open_session(args.new_session)
+
+    # Archives a previous run didn't finish: their images were never marked as sent
+    util.remove_partials(watch_dir)
+    sent = load_state()
+
+    pool = batch.WorkerPool(args.workers) if args.workers > 1 else None
+    archive = RotatingArchive(session, sent, args.rotate_mb * 1024 * 1024, args.rotate_minutes * 60, pool, args.workers)
+    settler = Settler(args.settle, sent)
+    watcher = make_watcher(img_src_dir, args.poll)
+
+    stop = threading.Event()
+    previous_handlers = {sig: signal.signal(sig, lambda *_: stop.set()) for sig in (signal.SIGINT, signal.SIGTERM)}
+
+    util.rich_divider()
+    print(f"\n👀  Watching {img_src_dir} ... (Ctrl-C to finish the current archive and stop)\n")
+
+    metrics.reporter.start("send")
+    try:
+        while not stop.is_set():
+            ready = settler.ready(*watcher.changed())
+            if ready:
+                archive.add(ready)
+            if archive.due():
+                archive.rotate()
+            stop.wait(args.interval)
+    finally:
+        watcher.stop()
+        archive.rotate()
+        if pool is not None:
+            pool.close()
+        metrics.reporter.finish()
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+
+    util.rich_divider()
+    util.log(f"✅🔒 Watch stopped after [bold cyan]{session.archives}[/bold cyan] archives in this session")
+
+    # Encryption is done: an on-disk prime pool is restocked by a detached process, not waited on
+    primes.default_pool().restock()
+
+
+# Guarded so worker processes started with 'spawn' don't re-run the job
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,28 @@
 from codebase import utility as util
 from codebase import constants as const
 
-import subprocess
+import sys
 
-util.log("\n[bold cyan]🔧  Setup Initiated[bold cyan]\n")
+from jobs import send, receive
 
-choice = util.prompt_model_choice()
-job_type = const.job_names[choice-1]
 
-if choice == 1 :
-    # run send.py
-    subprocess.run(['python', '-m', 'jobs.send'])
-    util.rich_divider()
-else :
-    # run receive.py
-    subprocess.run(['python', '-m', 'jobs.receive'])
-    util.rich_divider()
-    
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
 
+    util.log("\n[bold cyan]🔧  Setup Initiated[bold cyan]\n")
+
+    choice = util.prompt_model_choice()
+    job_type = const.job_names[choice-1]
+
+    # Jobs run in this interpreter: no second start-up, no second round of imports
+    if choice == 1 :
+        send.main(argv)
+        util.rich_divider()
+    else :
+        receive.main(argv)
+        util.rich_divider()
+
+
+# Guarded so worker processes started with 'spawn' don't re-run the menu
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Run from anywhere: the tests import 'codebase' / 'jobs' like the entry points do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from codebase import utility as util
+from codebase import constants as const
+
+
+@pytest.fixture(autouse=True)
+def _close_archives():
+    # Read handles are cached per process (util.open_zip)
+    yield
+    util.close_zips()
+
+
+@pytest.fixture
+def aes_key():
+    return bytes(range(32))
+
+
+@pytest.fixture
+def session_key(aes_key, monkeypatch):
+    """The AES key as the jobs see it (``const.AES_key``), restored afterwards."""
+    monkeypatch.setattr(const, "AES_key", aes_key)
+    return aes_key
+
+
+@pytest.fixture
+def rng():
+    import numpy as np
+
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def qr_store(monkeypatch):
+    """
+    Keys-QR round trip without zbar: what ``json_to_qr`` would encode is kept here and handed
+    back by ``qr_to_json``, so key tests run where the zbar shared library isn't installed.
+    """
+    store = {}
+
+    def json_to_qr(json_path, qr_output_path):
+        with open(json_path, "r") as f:
+            store[str(qr_output_path)] = json.load(f)
+
+    def qr_to_json(qr_image_path, output_json_path=None):
+        return store[str(qr_image_path)]
+
+    monkeypatch.setattr(util, "json_to_qr", json_to_qr)
+    monkeypatch.setattr(util, "qr_to_json", qr_to_json)
+    return store
+
+
+@pytest.fixture
+def key_files(tmp_path, monkeypatch, qr_store):
+    """Key JSON and QR written under ``tmp_path`` instead of the repo's 'keys' / 'output' folders."""
+    monkeypatch.setattr(util, "json_path", tmp_path / "pub_private.json")
+    monkeypatch.setattr(util, "send_qr_output_path", tmp_path / "qr_code.png")
+    monkeypatch.setattr(const, "master_code", "")
+    return tmp_path
+
+
+def random_image(rng, mode, size=(23, 17)):
+    """A noise image in PIL ``mode`` (``size`` is ``(w, h)``)."""
+    import numpy as np
+    from PIL import Image
+
+    w, h = size
+    if mode in ("I;16", "I;16B"):
+        return Image.frombytes(mode, size, rng.integers(0, 65535, (h, w), dtype=np.uint16).tobytes())
+    if mode == "I":
+        return Image.fromarray(rng.integers(-(2**20), 2**20, (h, w), dtype=np.int32))
+    if mode == "F":
+        return Image.fromarray(rng.random((h, w), dtype=np.float32))
+    if mode == "P":
+        return Image.fromarray(rng.integers(0, 255, (h, w, 3), dtype=np.uint8)).convert("P")
+    return Image.fromarray(rng.integers(0, 255, (h, w, 4), dtype=np.uint8)).convert(mode)
+
+
+def write_images(root, rng, names, size=(24, 18)):
+    """Noise RGB PNGs under ``root`` (names may hold folders); returns ``{name: pixels}``."""
+    import numpy as np
+
+    written = {}
+    for name in names:
+        path = Path(root) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        img = random_image(rng, "RGB", size)
+        img.save(path)
+        written[name] = np.asarray(img)
+    return written
+
+
+def same_pixels(a, b) -> bool:
+    return a.mode == b.mode and a.size == b.size and a.tobytes() == b.tobytes()
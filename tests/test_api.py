@@ -0,0 +1,107 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import api
+from codebase import rsa
+from codebase import constants as const
+
+from conftest import random_image, same_pixels
+
+MODES = ["1", "L", "LA", "P", "RGB", "RGBA", "CMYK", "I;16", "I;16B", "I", "F"]
+
+
+@pytest.fixture(params=["cbc", "ctr"])
+def aes_mode(request):
+    return request.param
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_pil_round_trip_keeps_mode(aes_key, aes_mode, rng, mode):
+    img = random_image(rng, mode)
+
+    out = api.decrypt_image(api.encrypt(img, aes_key, mode=aes_mode), aes_key)
+
+    assert same_pixels(out, img)
+    if mode == "P":
+        assert out.getpalette() == img.getpalette()
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zlib:1", "lzma", "lzma:0", "lz4", "zstd"])
+def test_codec_round_trip(aes_key, aes_mode, rng, codec):
+    if codec.startswith("lz4"):
+        pytest.importorskip("lz4")
+    if codec.startswith("zstd"):
+        pytest.importorskip("zstandard")
+    img = random_image(rng, "RGBA", (64, 48))
+
+    out = api.decrypt_image(api.encrypt(img, aes_key, codec=codec, mode=aes_mode), aes_key)
+
+    assert same_pixels(out, img)
+
+
+@pytest.mark.parametrize("shape", [(9, 13), (9, 13, 1), (9, 13, 3), (9, 13, 4)])
+def test_array_round_trip(aes_key, rng, shape):
+    array = rng.integers(0, 255, shape, dtype=np.uint8)
+
+    out = api.decrypt(api.encrypt(array, aes_key), aes_key)
+
+    assert out.shape == (9, 13, shape[2] if len(shape) == 3 else 1)
+    assert np.array_equal(out.reshape(shape), array)
+
+
+def test_encoded_bytes_and_streams(aes_key, rng):
+    img = random_image(rng, "RGB")
+    png = io.BytesIO()
+    img.save(png, "PNG")
+
+    sink = io.BytesIO()
+    api.encrypt_to(png.getvalue(), sink, aes_key)
+    sink.seek(0)
+
+    assert np.array_equal(api.decrypt_from(sink, aes_key), np.asarray(img))
+
+
+def test_many(aes_key, rng):
+    images = [random_image(rng, "L"), random_image(rng, "RGB", (5, 3))]
+
+    out = list(api.decrypt_many(api.encrypt_many(images, aes_key), aes_key))
+
+    assert [o.shape for o in out] == [(17, 23, 1), (3, 5, 3)]
+    assert np.array_equal(out[1], np.asarray(images[1]))
+
+
+def test_wrong_key_is_rejected(aes_key, aes_mode, rng):
+    blob = api.encrypt(random_image(rng, "RGB"), aes_key, mode=aes_mode)
+
+    with pytest.raises(ValueError):
+        api.decrypt(blob, bytes(32))
+
+
+def test_key_sizes():
+    assert len(api.ImageKey.generate(24).secret) == 24
+    with pytest.raises(ValueError):
+        api.ImageKey(b"short")
+
+
+@pytest.mark.parametrize("mode", ["cbc", "ctr"])
+def test_cli_settings_do_not_change_the_output(aes_key, rng, monkeypatch, mode):
+    # Same IV / nonce every time, so equal arguments must give equal bytes
+    import Crypto.Random
+
+    monkeypatch.setattr(Crypto.Random, "get_random_bytes", lambda size: bytes(size))
+    img = random_image(rng, "RGBA", (64, 48))
+    before = api.encrypt(img, aes_key, mode=mode)
+
+    monkeypatch.setattr(const, "AES_key", bytes(16))
+    monkeypatch.setattr(const, "AES_mode", "cbc" if mode == "ctr" else "ctr")
+    monkeypatch.setattr(const, "payload_codec", "zlib")
+    monkeypatch.setattr(const, "tile_size", 8)
+    monkeypatch.setattr(const, "AES_chunk_size", 64)
+    monkeypatch.setattr(const, "AES_segment_size", 32)
+    monkeypatch.setattr(const, "AES_threads", 3)
+
+    assert api.encrypt(img, aes_key, mode=mode) == before
+    assert rsa.is_ctr(before) == (mode == "ctr")
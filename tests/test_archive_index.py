@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import archive_index
+from codebase import batch
+from codebase import img_processing
+from codebase import pipeline
+from codebase import rsa
+from codebase import utility as util
+from codebase import constants as const
+from jobs import receive
+
+from conftest import write_images
+
+NAMES = ["a.png", "b.png", "ab.png", "sub/a.png", "sub/c.png", "sub/deeper/a.png", "zz/a.png"]
+
+
+@pytest.fixture(scope="module")
+def rsa_key():
+    _, [e, d, n] = rsa.generate_keys(bits=1024)
+    return e, d, n
+
+
+@pytest.fixture
+def archive(session_key, rsa_key, rng, tmp_path):
+    """``(zip_path, images)``: an indexed archive of ``NAMES``, sent under ``rsa_key``."""
+    e, _, n = rsa_key
+    images = write_images(tmp_path / "data", rng, NAMES)
+    zip_path = tmp_path / "archive.zip"
+    index = archive_index.ArchiveIndex()
+
+    jobs = [(path, util.bin_name_for(rel)) for path, rel in util.iter_images(tmp_path / "data")]
+    with util.open_zip(zip_path, "w") as zf:
+        batch.encrypt_all(jobs, workers=1, archive=zf, index=index)
+        util.save_encrypt_aes(e, n, archive=zf)
+        index.write(zf, session_key, "f00d")
+    return zip_path, images
+
+
+def _names(records):
+    return [record["name"] for record in records]
+
+
+def test_listing(archive, rsa_key):
+    zip_path, _ = archive
+    _, d, n = rsa_key
+
+    indexed = archive_index.IndexedArchive(zip_path, keys=[d, n])
+
+    assert len(indexed) == len(NAMES)
+    assert _names(indexed) == sorted(NAMES)
+    assert all(record["kind"] == "pixels" and record["shape"] == [18, 24, 3] for record in indexed)
+    assert archive_index.archive_key_id(zip_path) == "f00d"
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("a.png", ["a.png"]),
+    ("*.png", ["a.png", "ab.png", "b.png"]),
+    ("?.png", ["a.png", "b.png"]),
+    ("[ab]b.png", ["ab.png"]),
+    ("sub/*.png", ["sub/a.png", "sub/c.png"]),
+    ("sub/**/a.png", ["sub/a.png", "sub/deeper/a.png"]),
+    ("**/a.png", ["a.png", "sub/a.png", "sub/deeper/a.png", "zz/a.png"]),
+    ("*/a.png", ["sub/a.png", "zz/a.png"]),
+    ("sub", []),
+    ("nothing*", []),
+])
+def test_find(archive, session_key, pattern, expected):
+    indexed = archive_index.IndexedArchive(archive[0], aes_key=session_key)
+
+    assert _names(indexed.find(pattern)) == expected
+
+
+def test_select_reports_misses_and_dedupes(archive, session_key, capsys):
+    indexed = archive_index.IndexedArchive(archive[0], aes_key=session_key)
+
+    selected = indexed.select(["a.png", "?.png", "missing.png"])
+
+    assert sorted(_names(selected)) == ["a.png", "b.png"]
+    assert "missing.png" in capsys.readouterr().out
+
+
+def test_located_entries_decrypt(archive, session_key, tmp_path):
+    zip_path, images = archive
+    indexed = archive_index.IndexedArchive(zip_path, aes_key=session_key)
+
+    for record in indexed.find("sub/**/a.png"):
+        dest = tmp_path / "out" / record["name"]
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        located = (str(zip_path), record["entry"], record["offset"], record["length"])
+        img_processing.decrypt_zip_entry(located, str(dest))
+
+        assert np.array_equal(np.asarray(Image.open(dest)), images[record["name"]])
+
+
+@pytest.mark.parametrize("engine", ["batch", "pipeline"])
+def test_selected_passthrough_files(session_key, rsa_key, rng, tmp_path, monkeypatch, engine):
+    # --passthrough Send, then --select (with --pipeline or not) on the Receive side
+    monkeypatch.setattr(const, "passthrough", True)
+    e, _, n = rsa_key
+    write_images(tmp_path / "data", rng, NAMES)
+    zip_path = tmp_path / "archive.zip"
+    index = archive_index.ArchiveIndex()
+    jobs = [(path, util.bin_name_for(rel)) for path, rel in util.iter_images(tmp_path / "data")]
+    with util.open_zip(zip_path, "w") as zf:
+        batch.encrypt_all(jobs, workers=1, archive=zf, index=index)
+        util.save_encrypt_aes(e, n, archive=zf)
+        index.write(zf, session_key, "f00d")
+
+    records = archive_index.IndexedArchive(zip_path, aes_key=session_key).find("sub/**/*.png")
+    jobs = list(receive.selected_jobs(records, out_dir=tmp_path / "out"))
+    if engine == "pipeline":
+        pipeline.decrypt_all(jobs, zip_path=str(zip_path))
+    else:
+        batch.decrypt_all(jobs, workers=1, zip_path=str(zip_path))
+
+    restored = sorted(path.relative_to(tmp_path / "out").as_posix() for path in (tmp_path / "out").rglob("*.*"))
+    assert restored == ["sub/a.png", "sub/c.png", "sub/deeper/a.png"]
+    assert all((tmp_path / "out" / name).read_bytes() == (tmp_path / "data" / name).read_bytes() for name in restored)
+
+
+def test_archive_without_index(session_key, tmp_path):
+    zip_path = tmp_path / "plain.zip"
+    with util.open_zip(zip_path, "w") as zf:
+        util.write_zip_entry(zf, "x.png.bin", b"0" * 32)
+
+    with pytest.raises(ValueError):
+        archive_index.IndexedArchive(zip_path, aes_key=session_key)
+    assert archive_index.archive_key_id(zip_path) is None
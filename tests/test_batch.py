@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import batch
+from codebase import utility as util
+from codebase import constants as const
+
+from conftest import write_images
+
+NAMES = ["a.png", "b.png", "sub/c.png", "sub/deeper/d.png", "e.png"]
+
+
+@pytest.fixture
+def images(tmp_path, rng):
+    return write_images(tmp_path / "data", rng, NAMES)
+
+
+def _jobs(root, dest_for):
+    return [(path, dest_for(util.bin_name_for(rel))) for path, rel in util.iter_images(root)]
+
+
+def test_broken_image_does_not_stop_the_batch(session_key, images, tmp_path, capsys):
+    (tmp_path / "data" / "broken.png").write_bytes(b"not a png")
+    zip_path = tmp_path / "archive.zip"
+
+    with util.open_zip(zip_path, "w") as archive:
+        batch.encrypt_all(_jobs(tmp_path / "data", str), workers=2, archive=archive)
+
+    assert len(util.open_zip(zip_path).namelist()) == len(NAMES)
+    assert "broken.png" in capsys.readouterr().out
+
+
+def test_warm_pool_runs_batches_under_different_keys(images, tmp_path, monkeypatch):
+    pool = batch.WorkerPool(workers=2)
+    try:
+        for i, key in enumerate([bytes(32), bytes(range(32))]):
+            monkeypatch.setattr(const, "AES_key", key)
+            zip_path = tmp_path / f"archive{i}.zip"
+            with util.open_zip(zip_path, "w") as archive:
+                batch.encrypt_all(_jobs(tmp_path / "data", str), archive=archive, pool=pool)
+
+            out_dir = tmp_path / f"out{i}"
+            out_dir.mkdir()
+            batch.decrypt_all([("a.png.bin", str(out_dir / "a.png"))], workers=1, zip_path=str(zip_path))
+            assert np.array_equal(np.asarray(Image.open(out_dir / "a.png")), images["a.png"])
+    finally:
+        pool.close()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from benchmarks import keygen
+from benchmarks import pipeline
+from codebase import primes
+from codebase import constants as const
+
+
+@pytest.fixture(autouse=True)
+def keep_globals(monkeypatch):
+    # The benchmarks install their own prime pool and session key
+    monkeypatch.setattr(primes, "_default_pool", primes._default_pool)
+    for name in ("AES_key", "RSA_p", "RSA_q"):
+        monkeypatch.setattr(const, name, getattr(const, name))
+
+
+def _result(median):
+    return {"median_s": median, "min_s": median, "runs": 1}
+
+
+def test_report_covers_every_stage(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+
+    pipeline.main(["--sizes", "32", "--modes", "RGB", "L", "--count", "1", "--runs", "1", "--bits", "512", "--out", str(out)])
+
+    report = json.loads(out.read_text())
+    assert report["meta"]["args"]["bits"] == 512
+    assert {"keygen_512", "field_masks", "aes_key_unwrap_crt"} <= set(report["results"]["keys"])
+    assert set(report["results"]) == {"keys", "RGB_32", "L_32"}
+    assert set(report["results"]["RGB_32"]) == {
+        "decode", "aes_encrypt", "aes_decrypt", "encrypt_image", "decrypt_image",
+        "write_bin", "save_as_zip", "extract_zip", "png_save",
+    }
+    assert report["results"]["RGB_32"]["aes_encrypt"]["bytes"] == 32 * 32 * 3
+    assert "Results written to" in capsys.readouterr().out
+
+
+def test_slower_stages_are_regressions(capsys):
+    current = {"results": {"RGB_32": {"decode": _result(1.2), "png_save": _result(1.1)}, "keys": {"new_stage": _result(5.0)}}}
+    baseline = {"results": {"RGB_32": {"decode": _result(1.0), "png_save": _result(1.0)}}}
+
+    assert pipeline.compare(current, baseline, 0.15) == [("RGB_32", "decode")]
+    assert pipeline.compare(current, baseline, 0.25) == []
+    assert "new_stage" not in capsys.readouterr().out
+
+
+def test_baseline_check_fails_the_run(tmp_path, capsys):
+    argv = ["--sizes", "16", "--modes", "L", "--count", "1", "--runs", "1", "--bits", "512", "--out", str(tmp_path / "now.json")]
+    pipeline.main(argv)
+    report = json.loads((tmp_path / "now.json").read_text())
+    for stages in report["results"].values():
+        for result in stages.values():
+            result["median_s"] = 1e-9
+    (tmp_path / "fast.json").write_text(json.dumps(report))
+
+    with pytest.raises(SystemExit) as exit_info:
+        pipeline.main(argv + ["--baseline", str(tmp_path / "fast.json")])
+
+    assert exit_info.value.code == 1
+    assert "slower than the baseline" in capsys.readouterr().out
+
+
+def test_keygen_strategies(capsys):
+    keygen.main(["--bits", "256", "--runs", "1", "--workers", "1"])
+
+    out = capsys.readouterr().out
+    assert "sieve+MR (serial)" in out and "warm prime pool" in out
@@ -0,0 +1,79 @@
+import io
+import struct
+
+import pytest
+
+from codebase import blob
+
+
+def _payload(size=300_000):
+    # Compressible, but not a single repeated byte
+    return bytes(i * 7 % 251 for i in range(size))
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zlib:9", "lzma:1", "lz4", "zstd:1"])
+def test_compressed_body_round_trip(codec):
+    if codec.startswith("lz4"):
+        pytest.importorskip("lz4")
+    if codec.startswith("zstd"):
+        pytest.importorskip("zstandard")
+    data = _payload()
+
+    sink = io.BytesIO()
+    writer = blob.CompressWriter(sink, codec, chunk_size=64 * 1024)
+    for i in range(0, len(data), 10_000):
+        writer.write(data[i : i + 10_000])
+    writer.close()
+
+    assert len(sink.getvalue()) < len(data)
+    reader = blob.body_reader(io.BytesIO(sink.getvalue()), {"codec": codec})
+    assert reader.read() == data
+
+
+def test_none_codec_is_the_stream_itself():
+    sink = io.BytesIO()
+    assert blob.body_writer(sink, "none") is sink
+    assert blob.body_reader(sink, {"codec": "none"}) is sink
+
+
+def test_parse_codec():
+    assert blob.parse_codec("ZLIB:9") == ("zlib", 9)
+    assert blob.parse_codec(None) == ("none", None)
+    with pytest.raises(ValueError):
+        blob.parse_codec("brotli")
+
+
+def test_v2_header_round_trip():
+    meta = {"kind": "pixels", "shape": [3, 4, 1], "dtype": "uint8", "codec": "zlib:6", "mode": "L"}
+    sink = io.BytesIO()
+    blob.write_header(sink, meta)
+    sink.write(b"body")
+    sink.seek(0)
+
+    assert blob.is_v2(sink.getvalue())
+    assert blob.read_header(sink) == {**meta, "version": 2}
+    assert sink.read() == b"body"
+
+
+def test_legacy_header_is_still_read():
+    stream = io.BytesIO(struct.pack(">III", 5, 6, 3) + bytes(90))
+
+    meta = blob.read_header(stream)
+
+    assert meta["version"] == 1 and meta["shape"] == [5, 6, 3]
+
+
+def test_truncated_header():
+    with pytest.raises(ValueError):
+        blob.read_header(io.BytesIO(blob.MAGIC))
+
+
+def test_truncated_compressed_body():
+    sink = io.BytesIO()
+    writer = blob.CompressWriter(sink, "zlib", chunk_size=1024)
+    writer.write(_payload(5000))
+    writer.close()
+
+    reader = blob.body_reader(io.BytesIO(sink.getvalue()[:-4]), {"codec": "zlib"})
+    with pytest.raises(ValueError):
+        reader.read()
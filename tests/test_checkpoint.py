@@ -0,0 +1,165 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import batch
+from codebase import checkpoint
+from codebase import rsa
+from codebase import utility as util
+
+from conftest import write_images
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return tmp_path / "cache" / "journal.jsonl"
+
+
+def test_journal_round_trip(journal_path):
+    journal = checkpoint.Journal(journal_path, {"job": "send", "staged": False}).start()
+    journal.add("a.png", size=1)
+    journal.add("b.png", size=2)
+    journal.close()
+
+    loaded = checkpoint.Journal.load(journal_path, job="send", staged=False)
+
+    assert loaded.header == {"job": "send", "staged": False}
+    assert loaded.records == {"a.png": {"key": "a.png", "size": 1}, "b.png": {"key": "b.png", "size": 2}}
+
+
+def test_torn_last_line_is_dropped(journal_path):
+    journal = checkpoint.Journal(journal_path, {"job": "send"}).start()
+    journal.add("a.png", size=1)
+    journal.close()
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"key": "b.pn')
+
+    loaded = checkpoint.Journal.load(journal_path, job="send")
+
+    assert list(loaded.records) == ["a.png"]
+    loaded.start().close()
+    assert journal_path.read_text(encoding="utf-8").count("\n") == 2
+
+
+def test_other_settings_or_no_journal_start_over(journal_path):
+    checkpoint.Journal(journal_path, {"job": "send", "settings": {"AES_mode": "cbc"}}).start().close()
+
+    assert checkpoint.Journal.load(journal_path, job="send", settings={"AES_mode": "ctr"}) is None
+    assert checkpoint.Journal.load(journal_path.with_name("missing.jsonl"), job="send") is None
+
+    checkpoint.forget(journal_path)
+    assert not journal_path.exists()
+
+
+def test_send_journal_keeps_the_aes_key_wrapped(journal_path, aes_key):
+    _, [e, d, n] = rsa.generate_keys(bits=1024)
+    header = {"job": "send", "aes_key": util.wrap_aes_key(aes_key, e, n), "e": e, "n": n}
+    checkpoint.SendJournal(journal_path, header).start().close()
+
+    assert aes_key.hex() not in journal_path.read_text(encoding="utf-8")
+    loaded = checkpoint.SendJournal.load(journal_path)
+    assert loaded.public_key == (e, n)
+    assert loaded.aes_key([d, n]) == aes_key
+
+
+# ─── Send ─────────────────────────────────────────────────────
+def _jobs(root):
+    return [(path, util.bin_name_for(rel)) for path, rel in sorted(util.iter_images(root))]
+
+
+def test_interrupted_archive_is_resumed(session_key, rng, tmp_path, journal_path):
+    images = write_images(tmp_path / "data", rng, ["a.png", "b.png", "sub/c.png", "sub/d.png"])
+    jobs = _jobs(tmp_path / "data")
+    zip_path = tmp_path / "archive.zip"
+
+    # First run: two images in, then the process dies (no central directory gets written)
+    journal = checkpoint.SendJournal(journal_path, {"job": "send"}).start()
+    archive = util.open_zip(zip_path, "w")
+    journal.archive = archive
+    batch.encrypt_all(jobs[:2], workers=1, archive=archive, journal=journal)
+    shutil.copyfile(zip_path, tmp_path / "crashed.zip")
+    archive.close()
+    journal.close()
+    os.replace(tmp_path / "crashed.zip", zip_path)
+
+    # Resume: one source changed since, so it is redone with the rest
+    images.update(write_images(tmp_path / "data", rng, ["b.png"]))
+    journal = checkpoint.SendJournal.load(journal_path)
+    journal.validate(tmp_path / "data")
+    assert list(journal.records) == ["a.png"]
+
+    archive = journal.reopen_archive(zip_path)
+    journal.archive = archive
+    index = {}
+    with archive:
+        pending = list(journal.pending(util.iter_images(tmp_path / "data"), _Index(index), str))
+        jobs = [(path, util.bin_name_for(rel)) for path, rel in pending]
+        batch.encrypt_all(jobs, workers=1, archive=archive, journal=journal.start())
+    journal.remove()
+
+    assert sorted(rel for _, rel in pending) == ["b.png", "sub/c.png", "sub/d.png"]
+    assert list(index) == ["a.png.bin"]
+    assert not journal_path.exists()
+
+    zf = util.open_zip(zip_path)
+    assert zf.testzip() is None
+    assert sorted(zf.namelist()) == sorted(util.bin_name_for(name) for name in images)
+    for name, pixels in images.items():
+        dest = tmp_path / "out" / name
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        batch.img_processing.decrypt_zip_entry((str(zip_path), util.bin_name_for(name)), str(dest))
+        assert np.array_equal(np.asarray(Image.open(dest)), pixels)
+
+
+class _Index:
+    # What SendJournal.pending needs of an ArchiveIndex
+    def __init__(self, records):
+        self.records = records
+
+    def add(self, dest, info):
+        self.records[dest] = info
+
+
+def test_staged_bins_are_checked(session_key, rng, tmp_path, journal_path):
+    write_images(tmp_path / "data", rng, ["a.png", "b.png", "c.png"])
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+
+    journal = checkpoint.SendJournal(journal_path, {"job": "send", "staged": True}).start()
+    journal.bin_dir = bin_dir
+    jobs = [(path, str(bin_dir / dest)) for path, dest in _jobs(tmp_path / "data")]
+    batch.encrypt_all(jobs, workers=1, journal=journal)
+    journal.close()
+
+    # One .bin cut short, one never journaled
+    with open(bin_dir / "b.png.bin", "r+b") as f:
+        f.truncate(10)
+    (bin_dir / "stray.png.bin").write_bytes(b"x")
+
+    journal = checkpoint.SendJournal.load(journal_path, staged=True)
+    journal.validate(tmp_path / "data", bin_dir)
+
+    assert sorted(journal.records) == ["a.png", "c.png"]
+    assert sorted(path.name for path in bin_dir.iterdir()) == ["a.png.bin", "c.png.bin"]
+
+
+# ─── Receive ──────────────────────────────────────────────────
+def test_receive_journal(tmp_path, journal_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a.png").write_bytes(b"png")
+
+    journal = checkpoint.ReceiveJournal(journal_path, {"job": "receive", "archives": ["x"]}).start()
+    journal.done(out / "a.png", out / "a.png")
+    journal.done(out / "b.png", out / "b.png")   # reported done, but gone since
+    journal.close()
+
+    loaded = checkpoint.ReceiveJournal.load(journal_path, archives=["x"])
+    loaded.validate()
+    jobs = [("a.png.bin", out / "a.png"), ("b.png.bin", out / "b.png"), ("c.png.bin", out / "c.png")]
+
+    assert [source for source, _ in loaded.pending(jobs)] == ["b.png.bin", "c.png.bin"]
+    assert checkpoint.ReceiveJournal.load(journal_path, archives=["y"]) is None
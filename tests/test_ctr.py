@@ -0,0 +1,73 @@
+import io
+
+import Crypto.Random
+import pytest
+from Crypto.Cipher import AES
+
+from codebase import rsa
+from codebase import constants as const
+
+
+@pytest.fixture
+def fixed_nonce(monkeypatch):
+    monkeypatch.setattr(Crypto.Random, "get_random_bytes", lambda size: bytes(size))
+
+
+def _encrypt(plain, key, pieces=1):
+    buffer = io.BytesIO()
+    with rsa.AESCTRWriter(buffer, key) as writer:
+        step = max(1, -(-len(plain) // pieces))
+        for start in range(0, len(plain), step):
+            writer.write(plain[start : start + step])
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("threads, segment", [(1, 1 << 20), (4, 1024), (3, 4096), (8, 16)])
+def test_ciphertext_does_not_depend_on_the_threads(aes_key, rng, monkeypatch, fixed_nonce, threads, segment):
+    # Segments are cut on block boundaries, so threaded output is plain single-stream CTR
+    monkeypatch.setattr(const, "AES_threads", threads)
+    monkeypatch.setattr(const, "AES_segment_size", segment)
+    monkeypatch.setattr(rsa, "_ctr_pool", None)
+    plain = rng.bytes(50_000 + 7)
+
+    ciphertext = _encrypt(plain, aes_key, pieces=5)
+
+    nonce = bytes(rsa.BLOCK_SIZE - len(rsa.CTR_MAGIC))
+    expected = AES.new(aes_key, AES.MODE_CTR, nonce=nonce, initial_value=0).encrypt(plain)
+    assert ciphertext == rsa.CTR_MAGIC + nonce + expected
+
+
+@pytest.mark.parametrize("size", [0, 1, 16, 4097, 100_003])
+def test_reader_round_trip(aes_key, rng, monkeypatch, size):
+    monkeypatch.setattr(const, "AES_chunk_size", 4096)
+    monkeypatch.setattr(const, "AES_segment_size", 1024)
+    plain = rng.bytes(size)
+    ciphertext = _encrypt(plain, aes_key, pieces=3)
+
+    assert rsa.is_ctr(ciphertext)
+    assert len(ciphertext) == rsa.BLOCK_SIZE + size
+    with rsa.decrypt_stream(io.BytesIO(ciphertext), aes_key) as reader:
+        assert isinstance(reader, rsa.AESCTRReader)
+        assert reader.read() == plain
+
+
+def test_ranges_decrypt_on_their_own(aes_key, rng):
+    plain = rng.bytes(10_000)
+    ciphertext = _encrypt(plain, aes_key)
+
+    for offset, length in [(0, 10), (5, 100), (16, 16), (4095, 2), (9_990, 10), (10_000, 0)]:
+        assert bytes(rsa.ctr_decrypt_range(ciphertext, aes_key, offset, length)) == plain[offset : offset + length]
+    with pytest.raises(ValueError):
+        rsa.ctr_decrypt_range(ciphertext, aes_key, 9_995, 10)
+
+
+def test_modes_are_told_apart(aes_key, rng):
+    plain = rng.bytes(300)
+    cbc = io.BytesIO()
+    with rsa.encrypt_stream(cbc, aes_key, "cbc") as writer:
+        writer.write(plain)
+
+    assert not rsa.is_ctr(cbc.getvalue())
+    assert rsa.is_ctr(_encrypt(plain, aes_key))
+    with rsa.decrypt_stream(io.BytesIO(cbc.getvalue()), aes_key) as reader:
+        assert reader.read() == plain
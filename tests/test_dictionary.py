@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from codebase import dictionary
+from codebase import utility as util
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    """Forget the index mapped so far, so ``lookup`` maps ``dictionary.index_path`` again."""
+    monkeypatch.setattr(dictionary, "_index", None)
+
+
+def test_shipped_index_matches_the_json():
+    with open(dictionary.json_path, "r", encoding="utf-8") as f:
+        words = json.load(f)
+
+    assert all(dictionary.lookup(code) == word for code, word in words.items())
+
+
+def test_index_is_built_when_missing(tmp_path, monkeypatch, fresh_index):
+    src = tmp_path / "map.json"
+    src.write_text(json.dumps({"1000": "alpha", "1001": "be", "1002": "gamma"}))
+    build_index = dictionary.build_index
+    monkeypatch.setattr(dictionary, "index_path", tmp_path / "map.bin")
+    monkeypatch.setattr(dictionary, "build_index", lambda: build_index(src, tmp_path / "map.bin"))
+
+    assert [dictionary.lookup(code) for code in ("1000", "1001", "1002")] == ["alpha", "be", "gamma"]
+    assert (tmp_path / "map.bin").stat().st_size == dictionary._HEADER.size + 3 * len("alpha")
+    with pytest.raises(KeyError):
+        dictionary.lookup("1003")
+    with pytest.raises(KeyError):
+        dictionary.lookup("0999")
+
+
+def test_gaps_in_the_codes_are_rejected(tmp_path):
+    src = tmp_path / "map.json"
+    src.write_text(json.dumps({"1000": "alpha", "1002": "gamma"}))
+
+    with pytest.raises(ValueError):
+        dictionary.build_index(src, tmp_path / "map.bin")
+
+
+def test_corrupt_index_is_rejected(tmp_path, monkeypatch, fresh_index):
+    (tmp_path / "map.bin").write_bytes(b"MAPIDX1\0" + b"\0\x05\0\x09" + b"short")
+    monkeypatch.setattr(dictionary, "index_path", tmp_path / "map.bin")
+
+    with pytest.raises(ValueError):
+        dictionary.lookup("1000")
+
+
+def test_master_code_to_passphrase():
+    assert util.fetch_passphrase("1000-1001-1002") == "".join(dictionary.lookup(code) for code in ("1000", "1001", "1002"))
+    with pytest.raises(ValueError):
+        util.fetch_passphrase("1000-1001")
@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from codebase import utility as util
+from codebase import constants as const
+from jobs import receive
+
+
+def _touch(root, names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+
+
+def test_nested_trees_are_walked(tmp_path):
+    _touch(tmp_path, ["a.png", "B.JPG", "notes.txt", "sub/c.tif", "sub/deeper/d.png", "sub/deeper/e.gif", "x.png.bak"])
+
+    found = sorted(util.iter_images(tmp_path))
+
+    assert [relative for _, relative in found] == ["B.JPG", "a.png", "sub/c.tif", "sub/deeper/d.png", "sub/deeper/e.gif"]
+    assert all(Path(path) == tmp_path / relative for path, relative in found)
+
+
+def test_images_come_as_they_are_found(tmp_path):
+    _touch(tmp_path, [f"{i}.png" for i in range(5)])
+
+    images = util.iter_images(tmp_path)
+
+    assert iter(images) is images
+    assert next(images)[1].endswith(".png")
+    assert len(list(images)) == 4
+    assert list(util.iter_images(tmp_path / "missing")) == []
+
+
+def test_extensions_and_symlinked_folders(tmp_path):
+    _touch(tmp_path / "data", ["a.png", "b.npy"])
+    _touch(tmp_path / "elsewhere", ["c.png"])
+    os.symlink(tmp_path / "elsewhere", tmp_path / "data" / "link")
+
+    assert sorted(relative for _, relative in util.iter_images(tmp_path / "data")) == ["a.png", "b.npy"]
+    assert [relative for _, relative in util.iter_images(tmp_path / "data", {".npy"})] == ["b.npy"]
+    assert ".npy" in const.image_extensions
+
+
+def test_entry_names_keep_the_full_name():
+    assert util.bin_name_for("sub/a.b.png") == "sub/a.b.png.bin"
+    assert util.bin_name_for("a.png") != util.bin_name_for("a.b.png")
+
+
+def test_output_names():
+    taken = set()
+
+    assert util.image_name_for("sub/x.jpg.bin", taken) == Path("sub/x.png")
+    assert util.image_name_for("sub/x.png.bin", taken) == Path("sub/x.png.png")
+    assert util.image_name_for("sub/x.jpg.bin", suffix=None) == Path("sub/x.jpg")
+    assert util.image_name_for("y.tif.bin", suffix=".bmp") == Path("y.bmp")
+
+
+@pytest.mark.parametrize("name", ["../evil.png.bin", "sub/../../evil.png.bin", "/etc/evil.png.bin"])
+def test_names_outside_the_output_folder_are_rejected(name):
+    with pytest.raises(ValueError):
+        util.image_name_for(name)
+
+
+def test_receive_rebuilds_the_folder_layout(tmp_path):
+    jobs = list(receive.decryption_jobs(["a.png.bin", "sub/deeper/b.jpg.bin", "sub/deeper/b.png.bin"], out_dir=tmp_path))
+
+    assert [Path(img_path).relative_to(tmp_path).as_posix() for _, img_path in jobs] == [
+        "a.png", "sub/deeper/b.png", "sub/deeper/b.png.png",
+    ]
+    assert (tmp_path / "sub" / "deeper").is_dir()
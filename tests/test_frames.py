@@ -0,0 +1,113 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+
+from codebase import api
+from codebase import img_processing
+from codebase import constants as const
+
+
+@pytest.fixture
+def gif_bytes(rng):
+    frames = [Image.fromarray(rng.integers(0, 255, (20, 30, 3), dtype=np.uint8)).convert("P") for _ in range(3)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, "GIF", save_all=True, append_images=frames[1:], duration=[50, 60, 70], loop=0)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def tiff_pages(rng):
+    # Pages of a document keep their own size and mode
+    return [
+        Image.fromarray(rng.integers(0, 255, (20, 30, 3), dtype=np.uint8)),
+        Image.fromarray(rng.integers(0, 255, (10, 12), dtype=np.uint8)),
+        Image.frombytes("I;16", (8, 6), rng.integers(0, 65535, (6, 8), dtype=np.uint16).tobytes()),
+    ]
+
+
+def _tiff_bytes(pages):
+    buffer = io.BytesIO()
+    pages[0].save(buffer, "TIFF", save_all=True, append_images=pages[1:])
+    return buffer.getvalue()
+
+
+def _rgba_frames(data):
+    return [frame.convert("RGBA").tobytes() for frame in ImageSequence.Iterator(Image.open(io.BytesIO(data)))]
+
+
+def test_animation_frames(aes_key, gif_bytes):
+    blob = api.encrypt(gif_bytes, aes_key, frames=True)
+    sequence = api.open_frames(blob, aes_key)
+
+    assert len(sequence) == 3
+    assert [meta["duration"] for meta, _ in sequence] == [50, 60, 70]
+    assert [api.decrypt_frame(blob, aes_key, i).tobytes() for i in range(3)] == _rgba_frames(gif_bytes)
+
+
+def test_pages_keep_their_mode(aes_key, tiff_pages):
+    blob = api.encrypt(_tiff_bytes(tiff_pages), aes_key, frames=True)
+
+    for i, page in enumerate(tiff_pages):
+        out = api.decrypt_frame(blob, aes_key, i)
+        assert (out.mode, out.size, out.tobytes()) == (page.mode, page.size, page.tobytes())
+
+
+def test_frames_blob_is_not_one_image(aes_key, gif_bytes):
+    with pytest.raises(ValueError):
+        api.decrypt_image(api.encrypt(gif_bytes, aes_key, frames=True), aes_key)
+
+
+def test_first_frame_only(aes_key, gif_bytes):
+    out = api.decrypt(api.encrypt(gif_bytes, aes_key), aes_key)
+
+    assert out.shape == (20, 30, 1)
+
+
+# ─── Send / Receive of files ──────────────────────────────────
+def _send_receive(src, tmp_path, out_name):
+    img_processing.encrypt_image(str(src), str(tmp_path / "x.bin"))
+    return img_processing.decrypt_image(str(tmp_path / "x.bin"), str(tmp_path / out_name))[1]
+
+
+def test_animation_file_round_trip(session_key, gif_bytes, tmp_path):
+    src = tmp_path / "anim.gif"
+    src.write_bytes(gif_bytes)
+
+    written = _send_receive(src, tmp_path, "out.gif")
+
+    with open(written, "rb") as f:
+        assert _rgba_frames(f.read()) == _rgba_frames(gif_bytes)
+
+
+def test_pages_file_round_trip(session_key, tiff_pages, tmp_path):
+    src = tmp_path / "scan.tif"
+    src.write_bytes(_tiff_bytes(tiff_pages))
+
+    written = _send_receive(src, tmp_path, "out.png")
+
+    assert written.endswith(".tif")
+    with Image.open(written) as out:
+        assert [(page.mode, page.tobytes()) for page in ImageSequence.Iterator(out)] == [(p.mode, p.tobytes()) for p in tiff_pages]
+
+
+def test_single_frame_on_receive(session_key, tiff_pages, tmp_path, monkeypatch):
+    src = tmp_path / "scan.tif"
+    src.write_bytes(_tiff_bytes(tiff_pages))
+    monkeypatch.setattr(const, "frame_index", 1)
+
+    written = _send_receive(src, tmp_path, "out.png")
+
+    with Image.open(written) as out:
+        assert out.tobytes() == tiff_pages[1].tobytes()
+
+
+def test_npy_output_per_frame(session_key, gif_bytes, tmp_path):
+    src = tmp_path / "anim.gif"
+    src.write_bytes(gif_bytes)
+
+    _send_receive(src, tmp_path, "out.npy")
+
+    saved = sorted(tmp_path.glob("out_*.npy"))
+    assert [np.load(path).tobytes() for path in saved] == _rgba_frames(gif_bytes)
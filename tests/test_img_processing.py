@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import img_processing
+from codebase import rsa
+from codebase import constants as const
+
+from conftest import random_image, same_pixels
+
+
+def _send_receive(src, tmp_path, out_name="out.png"):
+    bin_path = tmp_path / "x.bin"
+    img_processing.encrypt_image(str(src), str(bin_path))
+    return img_processing.decrypt_image(str(bin_path), str(tmp_path / out_name))[1]
+
+
+@pytest.mark.parametrize("aes_mode", ["cbc", "ctr"])
+@pytest.mark.parametrize("codec", ["none", "zlib"])
+def test_streams_in_small_chunks(session_key, rng, tmp_path, monkeypatch, aes_mode, codec):
+    # Chunks and CTR segments much smaller than the image: many stream / thread hand-offs
+    monkeypatch.setattr(const, "AES_mode", aes_mode)
+    monkeypatch.setattr(const, "payload_codec", codec)
+    monkeypatch.setattr(const, "AES_chunk_size", 4096)
+    monkeypatch.setattr(const, "AES_segment_size", 1024)
+    img = random_image(rng, "RGB", (150, 101))
+    img.save(tmp_path / "in.png")
+
+    written = _send_receive(tmp_path / "in.png", tmp_path)
+
+    with Image.open(written) as out:
+        assert same_pixels(out, img)
+    assert rsa.is_ctr((tmp_path / "x.bin").read_bytes()) == (aes_mode == "ctr")
+
+
+@pytest.mark.parametrize("shape", [(31, 17), (31, 17, 3)])
+def test_npy_input(session_key, rng, tmp_path, shape):
+    array = rng.integers(0, 255, shape, dtype=np.uint8)
+    np.save(tmp_path / "in.npy", array)
+
+    written = _send_receive(tmp_path / "in.npy", tmp_path, "out.npy")
+
+    assert np.array_equal(np.load(written).reshape(shape), array)
+
+
+def test_legacy_payload_still_decrypts(session_key, rng, tmp_path):
+    # Version 1: '>III' header and raw RGB, as the first releases wrote it
+    array = rng.integers(0, 255, (7, 9, 3), dtype=np.uint8)
+    plain = np.array([7, 9, 3], dtype=">u4").tobytes() + array.tobytes()
+    (tmp_path / "x.bin").write_bytes(rsa.aes_encrypt(plain, session_key))
+
+    written = img_processing.decrypt_image(str(tmp_path / "x.bin"), str(tmp_path / "out.png"))[1]
+
+    with Image.open(written) as out:
+        assert np.array_equal(np.asarray(out), array)
@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+
+from codebase import incremental
+from codebase import key_session
+from codebase import rsa
+from codebase import utility as util
+from codebase import constants as const
+
+from conftest import write_images
+
+NAMES = ["a.png", "b.png", "c.png", "sub/d.png"]
+
+
+@pytest.fixture
+def previous_archive(tmp_path, monkeypatch):
+    path = tmp_path / "cache" / "previous.zip"
+    monkeypatch.setattr(incremental, "previous_archive_path", path)
+    return path
+
+
+def _split(manifest, root):
+    reused, records = [], {}
+    changed = [rel for _, rel in manifest.split(sorted(util.iter_images(root)), reused, records)]
+    return changed, reused, records
+
+
+def test_split_reuses_unchanged_images(rng, tmp_path):
+    write_images(tmp_path / "data", rng, NAMES)
+    _, _, records = _split(incremental.Manifest(), tmp_path / "data")
+
+    manifest = incremental.Manifest("f00d", incremental.settings_fingerprint(), records)
+    manifest.previous_names = {record["entry"] for rel, record in records.items() if rel != "sub/d.png"}
+    stat = os.stat(tmp_path / "data" / "a.png")
+    os.utime(tmp_path / "data" / "a.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))   # touched only
+    write_images(tmp_path / "data", rng, ["b.png"], size=(30, 20))                        # rewritten
+
+    changed, reused, new_records = _split(manifest, tmp_path / "data")
+
+    # sub/d.png is unchanged, but the previous archive doesn't hold it
+    assert changed == ["b.png", "sub/d.png"]
+    assert sorted(reused) == ["a.png.bin", "c.png.bin"]
+    assert new_records["a.png"]["mtime_ns"] == stat.st_mtime_ns + 10**9
+    assert new_records["a.png"]["hash"] == records["a.png"]["hash"]
+    assert new_records["b.png"]["hash"] != records["b.png"]["hash"]
+
+
+def test_save_keeps_only_written_entries_and_no_key(rng, tmp_path, previous_archive):
+    write_images(tmp_path / "data", rng, NAMES)
+    _, _, records = _split(incremental.Manifest(), tmp_path / "data")
+    archive_path = tmp_path / "archive.zip"
+    with util.open_zip(archive_path, "w") as zf:
+        for name in ["a.png.bin", "b.png.bin"]:
+            util.write_zip_entry(zf, name, b"0" * 32)
+    previous_archive.parent.mkdir()
+    previous_archive.write_bytes(b"old")
+    path = tmp_path / "cache" / "manifest.json"
+
+    incremental.save("f00d", records, archive_path, path=path)
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["key_id"] == "f00d" and "aes_key" not in data
+    assert sorted(data["entries"]) == ["a.png", "b.png"]
+    assert not previous_archive.exists()
+
+    loaded = incremental.Manifest.load(path)
+    assert (loaded.key_id, loaded.entries) == ("f00d", data["entries"])
+
+
+def test_manifests_that_no_longer_apply_are_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "manifest.json"
+    entries = {"a.png": {"entry": "a.png.bin", "size": 1, "mtime_ns": 1, "hash": "00"}}
+
+    path.write_text(json.dumps({"key_id": "f00d", "settings": incremental.settings_fingerprint(), "entries": entries}))
+    monkeypatch.setattr(const, "AES_mode", "ctr" if const.AES_mode != "ctr" else "cbc")
+    assert incremental.Manifest.load(path).entries == {}
+    monkeypatch.undo()
+
+    # From before key sessions: the AES key in plain hex, no key fingerprint
+    path.write_text(json.dumps({"aes_key": "00" * 32, "settings": incremental.settings_fingerprint(), "entries": entries}))
+    assert incremental.Manifest.load(path).entries == {}
+    assert incremental.Manifest.load(tmp_path / "missing.json").entries == {}
+
+
+# ─── Unlocking the last archive ───────────────────────────────
+@pytest.fixture
+def sent_archive(session_key, key_files, previous_archive, tmp_path):
+    """A last archive sent under a fresh key pair: its manifest, the master code of its QR and its AES key."""
+    AES_key, [e, d, n] = rsa.generate_keys(bits=1024)
+    util.save_keys(d, n, const.RSA_p, const.RSA_q)
+    master_code = const.master_code
+
+    archive_path = tmp_path / "archive.zip"
+    with util.open_zip(archive_path, "w") as zf:
+        util.write_zip_entry(zf, "a.png.bin", b"0" * 32)
+        util.save_encrypt_aes(e, n, archive=zf)
+    manifest = incremental.Manifest(key_session.fingerprint(n), incremental.settings_fingerprint(),
+                                    {"a.png": {"entry": "a.png.bin", "size": 1, "mtime_ns": 1, "hash": "00"}})
+    manifest.adopt_previous_archive(archive_path)
+    return manifest, master_code, AES_key
+
+
+def test_unlock_with_the_master_code(sent_archive, monkeypatch):
+    manifest, master_code, AES_key = sent_archive
+    monkeypatch.setattr(util, "read_master_code", lambda: master_code)
+
+    manifest.unlock(util.send_qr_output_path)
+
+    assert manifest.previous_names == {"a.png.bin", f"{const.timestamp_literal}.txt"}
+    assert manifest.aes_key == AES_key
+
+
+def test_unlock_failure_reuses_nothing(sent_archive, monkeypatch):
+    manifest, _, _ = sent_archive
+    monkeypatch.setattr(util, "read_master_code", lambda: "0000-0000-0000")
+
+    manifest.unlock(util.send_qr_output_path)
+
+    assert manifest.previous_names == set()
+    assert manifest.aes_key is None
@@ -0,0 +1,97 @@
+import pytest
+
+from codebase import key_session
+from codebase import rsa
+from codebase import utility as util
+from codebase import constants as const
+
+
+@pytest.fixture(scope="module")
+def rsa_keys():
+    """``(e, d, n, p, q)`` from one 1024-bit keygen, shared by the module."""
+    _, [e, d, n] = rsa.generate_keys(bits=1024)
+    return e, d, n, const.RSA_p, const.RSA_q
+
+
+@pytest.fixture
+def session_files(tmp_path, monkeypatch):
+    """The session JSON path; it and the cached QR live under ``tmp_path`` instead of 'cache/'."""
+    monkeypatch.setattr(key_session, "session_qr_path", tmp_path / "cache" / "session_qr.png")
+    (tmp_path / "qr_code.png").write_bytes(b"qr image")
+    return tmp_path / "cache" / "session.json"
+
+
+def test_fingerprint():
+    assert key_session.fingerprint(2**1023 + 1) == key_session.fingerprint(2**1023 + 1)
+    assert key_session.fingerprint(2**1023 + 1) != key_session.fingerprint(2**1023 + 3)
+    assert len(key_session.fingerprint(2**1023 + 1)) == 16
+
+
+def test_session_survives_a_restart(session_files, tmp_path):
+    started = key_session.SendSession.start(3, 2**1023 + 1, tmp_path / "qr_code.png", session_files)
+    started.archives += 2
+    started.save(session_files)
+
+    loaded = key_session.SendSession.load(session_files)
+
+    assert (loaded.e, loaded.n, loaded.key_id, loaded.archives) == (3, 2**1023 + 1, started.key_id, 2)
+    assert loaded.created == started.created
+    assert key_session.session_qr_path.read_bytes() == b"qr image"
+
+
+def test_no_session_without_its_qr(session_files, tmp_path):
+    assert key_session.SendSession.load(session_files) is None
+
+    key_session.SendSession.start(3, 2**1023 + 1, tmp_path / "qr_code.png", session_files)
+    key_session.session_qr_path.unlink()
+    assert key_session.SendSession.load(session_files) is None
+
+    session_files.write_text("{not json")
+    key_session.session_qr_path.write_bytes(b"qr image")
+    assert key_session.SendSession.load(session_files) is None
+
+
+def test_end_forgets_the_session(session_files, tmp_path):
+    key_session.SendSession.start(3, 2**1023 + 1, tmp_path / "qr_code.png", session_files)
+
+    key_session.end(session_files)
+    key_session.end(session_files)
+
+    assert not session_files.exists() and not key_session.session_qr_path.exists()
+    assert key_session.SendSession.load(session_files) is None
+
+
+def test_qr_goes_back_next_to_each_archive(session_files, tmp_path):
+    session = key_session.SendSession.start(3, 2**1023 + 1, tmp_path / "qr_code.png", session_files)
+
+    session.restore_qr(tmp_path / "output" / "send" / "qr_code.png")
+
+    assert (tmp_path / "output" / "send" / "qr_code.png").read_bytes() == b"qr image"
+
+
+def test_keyring_asks_once_per_key(rsa_keys, key_files, monkeypatch):
+    _, d, n, p, q = rsa_keys
+    util.save_keys(d, n, p, q)
+    code = const.master_code
+    asked = []
+    monkeypatch.setattr(util, "read_master_code", lambda: asked.append(1) or code)
+
+    keyring = key_session.Keyring()
+    key_id = key_session.fingerprint(n)
+    assert keyring.unlock(key_id, util.send_qr_output_path).n == n
+    assert keyring.unlock(key_id, util.send_qr_output_path).n == n
+    assert (len(asked), len(keyring)) == (1, 1)
+
+    # Archives from before key sessions carry no fingerprint: those always ask
+    assert keyring.unlock(None, util.send_qr_output_path).n == n
+    assert len(asked) == 2
+
+
+def test_keyring_rejects_the_wrong_qr(rsa_keys, key_files, monkeypatch):
+    _, d, n, p, q = rsa_keys
+    util.save_keys(d, n, p, q)
+    code = const.master_code
+    monkeypatch.setattr(util, "read_master_code", lambda: code)
+
+    with pytest.raises(ValueError, match="key session"):
+        key_session.Keyring().unlock("0" * 16, util.send_qr_output_path)
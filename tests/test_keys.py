@@ -0,0 +1,88 @@
+import base64
+import json
+import math
+
+import pytest
+
+from codebase import rsa
+from codebase import utility as util
+from codebase import constants as const
+
+
+@pytest.fixture(scope="module")
+def rsa_keys():
+    """``(AES_key, e, d, n, p, q)`` from one 1024-bit keygen, shared by the module."""
+    AES_key, [e, d, n] = rsa.generate_keys(bits=1024)
+    return AES_key, e, d, n, const.RSA_p, const.RSA_q
+
+
+def _qr_fields(qr_store):
+    # What a photo of the QR gives away: the obfuscated key fields
+    (encoded,) = qr_store.values()
+    return json.loads(base64.b64decode(encoded).decode()[::-1])
+
+
+def test_crt_keys_round_trip(rsa_keys, key_files, qr_store):
+    AES_key, e, d, n, p, q = rsa_keys
+
+    util.save_keys(d, n, p, q)
+    key = util.load_keys(util.send_qr_output_path)
+
+    assert _qr_fields(qr_store)["id"] == "pkgv5.1"
+    # d comes back reduced mod lcm(p - 1, q - 1): the CRT fields are what must match
+    assert key[1:] == rsa.crt_private_key(d, p, q)[1:]
+    assert util.unwrap_aes_key(util.wrap_aes_key(AES_key, e, n), key) == AES_key
+
+
+def test_legacy_keys_round_trip(rsa_keys, key_files, qr_store):
+    AES_key, e, d, n, _, _ = rsa_keys
+
+    util.save_keys(d, n)
+    key = util.load_keys(util.send_qr_output_path)
+
+    assert _qr_fields(qr_store)["id"] == "pkgv4.2"
+    assert (key.d, key.n) == (d, n)
+    assert util.unwrap_aes_key(util.wrap_aes_key(AES_key, e, n), [d, n]) == AES_key
+
+
+@pytest.mark.parametrize("crt", [True, False])
+def test_wrong_master_code_does_not_unlock(rsa_keys, key_files, monkeypatch, crt):
+    _, _, d, n, p, q = rsa_keys
+    util.save_keys(d, n, *((p, q) if crt else ()))
+
+    code = const.master_code.replace("-", "")
+    monkeypatch.setattr(const, "master_code", code[:-1] + str((int(code[-1]) + 1) % 10))
+    try:
+        key = util.load_keys(util.send_qr_output_path)
+    except ValueError:
+        return  # CRT fields that don't fit together, or a code outside the dictionary
+    assert key.n != n
+
+
+def test_crt_fields_do_not_give_away_the_key(rsa_keys, key_files, qr_store):
+    """With one shared ``value * A + B`` map, ``gcd`` of the field differences was ``A`` and unmasked them all."""
+    _, _, d, n, p, q = rsa_keys
+    util.save_keys(d, n, p, q)
+    fields = [int(value, 16) for field, value in _qr_fields(qr_store).items() if field in util.CRT_FIELDS]
+
+    common = 0
+    for value in fields[1:]:
+        common = math.gcd(common, value - fields[0])
+    assert common.bit_length() < 64
+
+    # Nor is any field a factor of n as it stands
+    assert all(math.gcd(value, n) == 1 for value in fields)
+
+
+def test_field_masks_are_independent():
+    masks = util.derive_field_masks(util.fetch_passphrase("1234-5678-9012"), {field: 64 for field in util.CRT_FIELDS})
+
+    assert len(set(masks.values())) == len(util.CRT_FIELDS)
+    assert all(mask.bit_length() > 400 for mask in masks.values())
+
+
+def test_crt_decrypt_matches_plain(rsa_keys):
+    AES_key, e, d, n, p, q = rsa_keys
+    wrapped = rsa.rsa_encrypt(base64.b64encode(AES_key).decode(), e, n)
+
+    assert rsa.rsa_decrypt_key(wrapped, rsa.crt_private_key(d, p, q)) == rsa.rsa_decrypt(wrapped, d, n)
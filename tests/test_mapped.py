@@ -0,0 +1,61 @@
+import io
+import mmap
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import img_processing
+from codebase import rsa
+
+
+def _encrypt(plain, key, mode):
+    buffer = io.BytesIO()
+    with rsa.encrypt_stream(buffer, key, mode) as writer:
+        writer.write(plain)
+    return buffer.getvalue()
+
+
+def _stream_decrypt(ciphertext, key):
+    with rsa.decrypt_stream(io.BytesIO(ciphertext), key) as reader:
+        return reader.read()
+
+
+@pytest.mark.parametrize("mode", ["cbc", "ctr"])
+@pytest.mark.parametrize("size", [12 + 64, 12 + 1000, 12 + 4096 * 3 + 5])
+def test_mapped_decrypt_equals_stream_decrypt(aes_key, rng, mode, size):
+    plain = rng.bytes(size)
+    ciphertext = _encrypt(plain, aes_key, mode)
+
+    header, body = rsa.aes_decrypt_mapped(ciphertext, aes_key, 12)
+
+    assert header + body.tobytes() == plain == _stream_decrypt(ciphertext, aes_key)
+    assert body.dtype == np.uint8
+
+
+def test_small_cbc_blob_is_left_to_the_stream(aes_key):
+    assert rsa.aes_decrypt_mapped(_encrypt(b"x" * 20, aes_key, "cbc"), aes_key, 12) is None
+
+
+def test_bad_padding_is_rejected(aes_key, rng):
+    ciphertext = bytearray(_encrypt(rng.bytes(500), aes_key, "cbc"))
+    ciphertext[-1] ^= 0xFF
+
+    with pytest.raises(ValueError):
+        rsa.aes_decrypt_mapped(bytes(ciphertext), aes_key, 12)
+
+
+@pytest.mark.parametrize("mode", ["cbc", "ctr"])
+def test_bin_file_decrypts_from_the_mapping(session_key, rng, tmp_path, mode):
+    pixels = rng.integers(0, 255, (40, 30, 3), dtype=np.uint8)
+    with open(tmp_path / "a.png.bin", "wb") as f:
+        img_processing.write_encrypted_array(pixels, f, mode=mode)
+
+    with open(tmp_path / "a.png.bin", "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        out = img_processing.decrypt_mapped_array(mapped, session_key)
+        assert np.array_equal(out, pixels)
+        # The array is a view over the decrypted buffer, reshaped, not a copy of it
+        assert out.base is not None and not out.flags.owndata
+
+    img_processing.decrypt_image(str(tmp_path / "a.png.bin"), str(tmp_path / "a.png"))
+    assert np.array_equal(np.asarray(Image.open(tmp_path / "a.png")), pixels)
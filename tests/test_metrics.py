@@ -0,0 +1,151 @@
+import argparse
+import json
+import threading
+
+import pytest
+from rich.text import Text
+
+from codebase import metrics
+from codebase import utility as util
+from codebase import constants as const
+
+
+def _sample(total, nbytes, **stages):
+    sample = metrics.Sample()
+    sample.total, sample.bytes, sample.stages = total, nbytes, stages
+    return sample
+
+
+def _run(sinks, job="send"):
+    reporter = metrics.Reporter()
+    reporter.sinks = sinks
+    reporter.start(job)
+    reporter.record("a.png", _sample(0.5, 1000, load=0.1, encrypt=0.3))
+    reporter.record("sub/b.png", _sample(0.25, 500, load=0.05, encrypt=0.15))
+    reporter.failed("c.png")
+    return reporter.finish()
+
+
+def test_timers_report_into_the_current_sample():
+    with metrics.timer("load"):
+        metrics.add_bytes(10)  # nothing is collecting: no-op
+
+    with metrics.collecting() as sample:
+        with metrics.timer("load"):
+            pass
+        with metrics.timer("load"):
+            metrics.add_bytes(100)
+        with metrics.collecting() as inner:
+            metrics.add_bytes(1)
+        metrics.add_bytes(20)
+
+    assert set(sample.stages) == {"load"} and sample.stages["load"] >= 0
+    assert (sample.bytes, inner.bytes) == (120, 1)
+    assert sample.total >= sample.stages["load"]
+
+
+def test_threads_collect_separately():
+    samples = {}
+
+    def work(name, count):
+        with metrics.collecting() as sample:
+            metrics.add_bytes(count)
+        samples[name] = sample
+
+    threads = [threading.Thread(target=work, args=(str(i), i)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {name: sample.bytes for name, sample in samples.items()} == {"0": 0, "1": 1, "2": 2, "3": 3}
+
+
+def test_summary_adds_up_the_samples():
+    summary = _run([])
+
+    assert (summary["job"], summary["images"], summary["errors"], summary["bytes"]) == ("send", 2, 1, 1500)
+    assert summary["stages"] == pytest.approx({"load": 0.15, "encrypt": 0.45})
+    assert summary["images_per_s"] == pytest.approx(2 / summary["wall_s"])
+
+
+def test_json_lines(tmp_path):
+    sink = metrics.JSONLinesSink(tmp_path / "run" / "metrics.jsonl")
+
+    _run([sink], "send")
+    _run([sink], "receive")
+
+    lines = [json.loads(line) for line in (tmp_path / "run" / "metrics.jsonl").read_text().splitlines()]
+    assert len(lines) == 8
+    assert lines[0] == {"job": "send", "path": "a.png", "total_s": 0.5, "bytes": 1000, "stages": {"load": 0.1, "encrypt": 0.3}}
+    assert lines[2] == {"job": "send", "path": "c.png", "error": True}
+    assert lines[3]["summary"]["images"] == 2
+    # The second job of the run appends
+    assert lines[4]["job"] == "receive" and lines[7]["summary"]["job"] == "receive"
+
+
+def test_prometheus_textfile(tmp_path):
+    path = tmp_path / "node" / "run.prom"
+
+    summary = _run([metrics.PrometheusSink(path)])
+
+    lines = path.read_text().splitlines()
+    prefix = const.metrics_prefix
+    assert f"# TYPE {prefix}_images_total counter" in lines
+    assert f'{prefix}_images_total{{job="send"}} 2' in lines
+    assert f'{prefix}_errors_total{{job="send"}} 1' in lines
+    assert f'{prefix}_bytes_total{{job="send"}} 1500' in lines
+    assert f'{prefix}_wall_seconds{{job="send"}} {summary["wall_s"]}' in lines
+    assert f'{prefix}_stage_seconds_total{{job="send",stage="encrypt"}} {summary["stages"]["encrypt"]}' in lines
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_summary_table():
+    with util.console.capture() as captured:
+        _run([metrics.SummarySink()])
+
+    out = Text.from_ansi(captured.get()).plain
+    assert "Send stages" in out and "encrypt" in out
+    assert "2 images (1 failed)" in out
+
+
+def test_sinks_from_the_command_line(tmp_path):
+    parser = argparse.ArgumentParser()
+    metrics.add_arguments(parser)
+    args = parser.parse_args(["--metrics", str(tmp_path / "a.jsonl"), "--metrics", str(tmp_path / "a.prom"), "--summary"])
+
+    assert [type(sink) for sink in args.metrics] == [metrics.JSONLinesSink, metrics.PrometheusSink]
+    assert isinstance(metrics.sink_for("x.NDJSON"), metrics.JSONLinesSink)
+    with pytest.raises(ValueError):
+        metrics.sink_for("x.csv")
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--metrics", "x.csv"])
+
+
+def test_configure(monkeypatch):
+    monkeypatch.setattr(metrics, "reporter", metrics.Reporter())
+    monkeypatch.setattr(const, "progress", False)
+    sink = metrics.sink_for("x.prom")
+
+    metrics.configure(argparse.Namespace(progress=True, metrics=[sink], summary=True))
+
+    assert const.progress and metrics.reporter.progress
+    assert metrics.reporter.sinks[0] is sink and isinstance(metrics.reporter.sinks[1], metrics.SummarySink)
+
+
+def test_progress_bar_is_throttled(monkeypatch):
+    monkeypatch.setattr(const, "progress_interval", 3600)
+    reporter = metrics.Reporter()
+    reporter.progress = True
+    with util.console.capture():
+        reporter.start("receive")
+        draws = []
+        update = reporter._bar._progress.update
+        monkeypatch.setattr(reporter._bar._progress, "update", lambda *a, **kw: draws.append(kw["completed"]) or update(*a, **kw))
+
+        for i in range(500):
+            reporter.record(f"{i}.png", _sample(0.01, 10))
+        reporter.finish()
+
+    # The first image draws, the rest wait out the interval, and finishing draws the final count
+    assert draws == [1, 500]
@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import img_processing
+
+from conftest import random_image, same_pixels
+
+
+def _send_receive(src, tmp_path, out_name="out.png"):
+    bin_path = tmp_path / "x.bin"
+    img_processing.encrypt_image(str(src), str(bin_path))
+    return img_processing.decrypt_image(str(bin_path), str(tmp_path / out_name))[1]
+
+
+@pytest.mark.parametrize("mode", ["1", "L", "LA", "P", "RGBA", "I;16"])
+def test_png_modes_survive(session_key, rng, tmp_path, mode):
+    img = random_image(rng, mode)
+    img.save(tmp_path / "in.png")
+
+    written = _send_receive(tmp_path / "in.png", tmp_path)
+
+    with Image.open(written) as out:
+        assert same_pixels(out, img)
+
+
+@pytest.mark.parametrize("mode", ["I", "F", "CMYK"])
+def test_modes_png_cant_hold_come_back_as_tiff(session_key, rng, tmp_path, mode):
+    img = random_image(rng, mode)
+    img.save(tmp_path / "in.tif")
+
+    written = _send_receive(tmp_path / "in.tif", tmp_path)
+
+    assert written.endswith(".tif")
+    with Image.open(written) as out:
+        assert out.mode == mode and same_pixels(out, img)
+
+
+def test_palette_transparency(session_key, rng, tmp_path):
+    img = random_image(rng, "P")
+    img.info["transparency"] = 3
+    img.save(tmp_path / "in.png", transparency=3)
+
+    with Image.open(_send_receive(tmp_path / "in.png", tmp_path)) as out:
+        assert out.info.get("transparency") == 3
+
+
+def test_native_modes_store_fewer_bytes(session_key, rng, tmp_path):
+    # One byte per pixel for grayscale, not three
+    random_image(rng, "L", (100, 100)).save(tmp_path / "in.png")
+
+    img_processing.encrypt_image(str(tmp_path / "in.png"), str(tmp_path / "x.bin"))
+
+    assert (tmp_path / "x.bin").stat().st_size < 100 * 100 * 2
+
+
+@pytest.mark.parametrize("mode, stored, channels", [("1", "L", 1), ("P", "P", 1), ("LA", "LA", 2), ("I;16", "I;16", 1), ("YCbCr", "RGB", 3), ("PA", "RGBA", 4)])
+def test_layout_keeps_the_native_mode(rng, mode, stored, channels):
+    img = random_image(rng, "RGB").convert(mode)
+
+    layout, meta = img_processing._native_layout(img)
+
+    assert layout.mode == stored
+    assert meta["mode"] == (mode if mode in img_processing._NATIVE_MODES else stored)
+    assert img_processing._NATIVE_MODES[meta["mode"]][1] == channels
+    assert ("palette" in meta) == (mode == "P")
+
+
+def test_arrays_come_back_in_the_sent_mode(aes_key, rng):
+    img = random_image(rng, "I;16")
+    buffer = io.BytesIO()
+    img_processing.write_encrypted_pil(img, buffer, aes_key)
+
+    meta, pixels = img_processing.decrypt_payload(buffer.getvalue(), aes_key)
+
+    assert pixels.dtype == np.dtype("<u2") and pixels.shape == (17, 23, 1)
+    assert same_pixels(img_processing.array_to_pil(pixels, meta), img)
@@ -0,0 +1,78 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from codebase import api
+from codebase import blob
+from codebase import img_processing
+from codebase import rsa
+from codebase import constants as const
+
+from conftest import random_image
+
+
+@pytest.fixture(autouse=True)
+def passthrough(monkeypatch):
+    monkeypatch.setattr(const, "passthrough", True)
+
+
+def _send_receive(src, tmp_path, out_name):
+    bin_path = tmp_path / f"{src.name}.bin"
+    img_processing.encrypt_image(str(src), str(bin_path))
+    (tmp_path / "out").mkdir(exist_ok=True)
+    return img_processing.decrypt_image(str(bin_path), str(tmp_path / "out" / out_name))[1]
+
+
+@pytest.mark.parametrize("codec", ["none", "zlib"])
+def test_passthrough_restores_the_exact_file(session_key, rng, tmp_path, monkeypatch, codec):
+    monkeypatch.setattr(const, "payload_codec", codec)
+    random_image(rng, "RGB").save(tmp_path / "photo.jpg", quality=80, comment=b"kept")
+
+    written = _send_receive(tmp_path / "photo.jpg", tmp_path, "photo.png")
+
+    assert written.endswith("photo.jpg")
+    assert (tmp_path / "out" / "photo.jpg").read_bytes() == (tmp_path / "photo.jpg").read_bytes()
+
+
+def test_passthrough_of_any_file(session_key, tmp_path):
+    (tmp_path / "raw.cr2").write_bytes(bytes(range(256)) * 50)
+
+    written = _send_receive(tmp_path / "raw.cr2", tmp_path, "raw.png")
+
+    assert Path(written).name == "raw.cr2"
+    assert Path(written).read_bytes() == (tmp_path / "raw.cr2").read_bytes()
+
+
+def test_header_records_the_file(aes_key):
+    data = bytes(range(256)) * 3
+    buffer = io.BytesIO()
+
+    info = img_processing.write_encrypted_file(io.BytesIO(data), buffer, aes_key, "none", ".dng")
+
+    with rsa.decrypt_stream(io.BytesIO(buffer.getvalue()), aes_key) as reader:
+        meta = blob.read_header(reader)
+    assert info == {"kind": "file", "ext": ".dng", "size": len(data)}
+    assert (meta["kind"], meta["ext"], meta["size"]) == ("file", ".dng", len(data))
+    assert img_processing.decrypt_payload(buffer.getvalue(), aes_key) == (meta, data)
+
+
+@pytest.mark.parametrize("src_name, dest, ext, expected", [
+    ("sub/photo.jpg.bin", "out/sub/photo.png", ".jpg", "out/sub/photo.jpg"),
+    ("sub/photo.JPG.bin", "out/sub/photo.png", ".jpg", "out/sub/photo.JPG"),
+    ("photo.jpg", "out/photo.png", ".jpg", "out/photo.jpg"),
+    ("renamed.bin", "out/renamed.png", ".cr2", "out/renamed.cr2"),
+    (None, "out/a.png", ".tif", "out/a.tif"),
+])
+def test_restored_path(src_name, dest, ext, expected):
+    assert Path(img_processing.restored_path(src_name, dest, ext)) == Path(expected)
+
+
+def test_pixel_readers_refuse_passthrough_entries(aes_key):
+    buffer = io.BytesIO()
+    img_processing.write_encrypted_file(io.BytesIO(b"not pixels" * 10), buffer, aes_key, ext=".raw")
+
+    with pytest.raises(ValueError, match="passthrough"):
+        img_processing.decrypt_array(io.BytesIO(buffer.getvalue()), aes_key)
+    with pytest.raises(ValueError, match="passthrough"):
+        api.decrypt_image(buffer.getvalue(), aes_key)
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from codebase import pipeline
+from codebase import utility as util
+
+from conftest import write_images
+
+
+def _double(job, _):
+    return job * 2
+
+
+def _fail_on_three(job, value):
+    if job == 3:
+        raise ValueError("three")
+    return value + 1
+
+
+def test_stages_in_order():
+    out = list(pipeline.run_pipeline(range(20), [_double, _fail_on_three], depth=2))
+
+    assert [job for job, *_ in out] == list(range(20))
+    assert [value for job, value, err, _ in out if err is None] == [2 * i + 1 for i in range(20) if i != 3]
+    assert [str(err) for *_, err, _ in out if err is not None] == ["three"]
+
+
+def test_jobs_that_raise_end_the_pipeline():
+    def jobs():
+        yield 1
+        raise ValueError("bad entry")
+
+    out, raised = [], []
+
+    def run():
+        try:
+            out.extend(pipeline.run_pipeline(jobs(), [_double, (_double, 2)]))
+        except ValueError as exc:
+            raised.append(exc)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert [value for _, value, _, _ in out] == [2]
+    assert [str(exc) for exc in raised] == ["bad entry"]
+
+
+def test_threaded_stage_sees_every_job():
+    out = list(pipeline.run_pipeline(range(50), [(_double, 4)], depth=3))
+
+    assert sorted(value for _, value, _, _ in out) == [2 * i for i in range(50)]
+
+
+def test_queue_is_bounded_by_bytes():
+    queue = pipeline._BoundedQueue(10, 100)
+    queue.put(("job", b"x" * 80, None, None))
+
+    blocked = threading.Thread(target=queue.put, args=(("job", b"y" * 50, None, None),))
+    blocked.start()
+    time.sleep(0.1)
+    assert blocked.is_alive()
+
+    queue.get()
+    blocked.join(1)
+    assert not blocked.is_alive()
+
+
+def test_one_big_item_still_passes():
+    queue = pipeline._BoundedQueue(10, 100)
+    queue.put(("job", b"z" * 1000, None, None))
+
+    assert queue.get()[1] == b"z" * 1000
+
+
+def test_sizes_of_stage_values(rng):
+    img = Image.fromarray(rng.integers(0, 255, (10, 20, 3), dtype=np.uint8))
+
+    assert pipeline._size_of(img) == 600
+    assert pipeline._size_of(np.zeros((4, 4), dtype=np.uint16)) == 32
+    assert pipeline._size_of((("a", "b"), ({"kind": "pixels"}, b"1234"), None, None)) == 4
+
+
+def test_one_image_per_queue(session_key, rng, tmp_path):
+    # max_bytes 1: every queue holds one image at a time (other settings: see test_round_trip.py)
+    images = write_images(tmp_path / "data", rng, ["a.png", "sub/b.png", "c.png"])
+    zip_path, out_dir = tmp_path / "archive.zip", tmp_path / "out"
+    jobs = [(path, util.bin_name_for(rel)) for path, rel in util.iter_images(tmp_path / "data")]
+
+    with util.open_zip(zip_path, "w") as archive:
+        stages = [pipeline._load, pipeline._encrypt, pipeline._writer(archive)]
+        assert all(err is None for _, _, err, _ in pipeline.run_pipeline(jobs, stages, max_bytes=1))
+
+    receive_jobs = []
+    for name in images:
+        (out_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        receive_jobs.append((util.bin_name_for(name), str(out_dir / name)))
+    pipeline.decrypt_all(receive_jobs, zip_path=str(zip_path))
+
+    assert all(np.array_equal(np.asarray(Image.open(out_dir / name)), pixels) for name, pixels in images.items())
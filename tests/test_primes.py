@@ -0,0 +1,79 @@
+import subprocess
+import time
+
+import pytest
+
+from codebase import primes
+from codebase import constants as const
+
+
+@pytest.mark.parametrize("n, expected", [
+    (2, True), (97, True), (2**61 - 1, True), (2**127 - 1, True),
+    (1, False), (561, False), (2**61 - 1 + 2, False), ((2**31 - 1) * (2**61 - 1), False),
+])
+def test_is_probable_prime(n, expected):
+    assert primes.is_probable_prime(n) is expected
+
+
+def test_random_prime_has_exactly_the_bits_asked_for():
+    for bits in (64, 256):
+        p = primes.random_prime(bits)
+        assert p.bit_length() == bits and primes.is_probable_prime(p)
+        assert p % const.RSA_public_exponent != 1
+
+
+def test_parallel_primes_are_distinct():
+    found = primes.parallel_primes(64, 6, workers=2)
+
+    assert len(set(found)) == 6 and all(primes.is_probable_prime(p) for p in found)
+
+
+def test_pool_on_disk_never_hands_a_prime_out_twice(tmp_path):
+    path = tmp_path / "cache" / "primes.json"
+    primes.PrimePool(size=6, path=path).refill(64)
+
+    # Two processes' worth of pools sharing the file
+    first, second = primes.PrimePool(size=6, path=path), primes.PrimePool(size=6, path=path)
+    taken = first.take(64, 2) + second.take(64, 2) + first.take(64, 3)
+
+    assert len(set(taken)) == 7
+    assert primes.PrimePool(size=6, path=path).available(64) == 0
+    assert not path.with_suffix(".lock").exists()
+
+
+def test_restock_runs_detached(tmp_path, monkeypatch):
+    path = tmp_path / "primes.json"
+    pool = primes.PrimePool(size=4, path=path)
+    pool.take(64, 1)
+    launched = []
+    monkeypatch.setattr(primes.subprocess, "Popen", lambda args, **kwargs: launched.append((args, kwargs)))
+
+    pool.restock()
+    pool.restock()   # nothing taken since
+
+    ((args, kwargs),) = launched
+    monkeypatch.undo()
+    subprocess.run(args, cwd=kwargs["cwd"], check=True, timeout=60)
+    assert primes.PrimePool(size=4, path=path).available(64) == 4
+
+
+def test_in_memory_pool_refills_itself(monkeypatch):
+    monkeypatch.setattr(primes.subprocess, "Popen", lambda *args, **kwargs: pytest.fail("detached restock"))
+    pool = primes.PrimePool(size=4)
+    taken = pool.take(64, 3)   # empty pool: searched on the spot
+
+    deadline = time.monotonic() + 30
+    while pool.available(64) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert pool.available(64) == 4
+    assert not set(taken) & set(pool.take(64, 4))
+    pool.restock()
+
+
+def test_background_refill_can_be_turned_off():
+    pool = primes.PrimePool(size=4, background=False)
+    pool.take(64, 1)
+
+    time.sleep(0.1)
+    assert pool.available(64) == 0
@@ -0,0 +1,68 @@
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import img_processing
+from codebase import constants as const
+
+from conftest import random_image, same_pixels
+
+
+def _send_receive(src, tmp_path, out_name):
+    bin_path = tmp_path / f"{src.name}.bin"
+    img_processing.encrypt_image(str(src), str(bin_path))
+    return img_processing.decrypt_image(str(bin_path), str(tmp_path / "out" / out_name))[1]
+
+
+@pytest.fixture(autouse=True)
+def out_dir(tmp_path):
+    (tmp_path / "out").mkdir()
+
+
+@pytest.mark.parametrize("suffix", [".png", ".bmp", ".tif"])
+def test_lossless_formats(session_key, rng, tmp_path, suffix):
+    img = random_image(rng, "RGB")
+    img.save(tmp_path / "in.png")
+
+    written = _send_receive(tmp_path / "in.png", tmp_path, f"out{suffix}")
+
+    assert written.endswith(suffix)
+    with Image.open(written) as out:
+        assert same_pixels(out, img)
+
+
+def test_modes_a_format_cant_hold_go_to_tiff(session_key, rng, tmp_path):
+    img = random_image(rng, "RGBA")
+    img.save(tmp_path / "in.png")
+
+    written = _send_receive(tmp_path / "in.png", tmp_path, "out.bmp")
+
+    assert written.endswith(".tif")
+    with Image.open(written) as out:
+        assert same_pixels(out, img)
+
+
+def test_jpeg_is_not_re_encoded(session_key, rng, tmp_path):
+    # '--format original' on a JPEG: the decrypted pixels go to a lossless PNG next to the name
+    random_image(rng, "RGB").save(tmp_path / "photo.jpg", quality=80)
+    with Image.open(tmp_path / "photo.jpg") as sent:
+        sent_pixels = sent.tobytes()
+
+    written = _send_receive(tmp_path / "photo.jpg", tmp_path, "photo.jpg")
+
+    assert written.endswith("photo.jpg.png")
+    with Image.open(written) as out:
+        assert out.tobytes() == sent_pixels
+
+
+def test_png_compress_level(session_key, rng, tmp_path, monkeypatch):
+    array = np.tile(np.arange(200, dtype=np.uint8), (200, 1))
+    Image.fromarray(array).save(tmp_path / "in.png")
+
+    sizes = {}
+    for level in (0, 9):
+        monkeypatch.setattr(const, "png_compress_level", level)
+        sizes[level] = (tmp_path / _send_receive(tmp_path / "in.png", tmp_path, f"out{level}.png")).stat().st_size
+
+    assert sizes[9] < sizes[0]
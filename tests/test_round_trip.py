@@ -0,0 +1,90 @@
+"""
+Send → Receive for every engine, target and payload option: images written under 'data/',
+encrypted, decrypted into 'out/' and compared pixel for pixel. Behaviour unique to one
+feature is tested in that feature's own file.
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import batch
+from codebase import pipeline
+from codebase import utility as util
+from codebase import constants as const
+
+from conftest import write_images
+
+NAMES = ["a.png", "b.png", "sub/c.png", "sub/deeper/d.png", "e.png"]
+
+ENGINES = {
+    "batch-1": (lambda jobs, archive: batch.encrypt_all(jobs, workers=1, archive=archive),
+                lambda jobs, zip_path: batch.decrypt_all(jobs, workers=1, zip_path=zip_path)),
+    "batch-2": (lambda jobs, archive: batch.encrypt_all(jobs, workers=2, archive=archive),
+                lambda jobs, zip_path: batch.decrypt_all(jobs, workers=2, zip_path=zip_path)),
+    "pipeline": (lambda jobs, archive: pipeline.encrypt_all(jobs, archive=archive),
+                 lambda jobs, zip_path: pipeline.decrypt_all(jobs, zip_path=zip_path)),
+}
+
+OPTIONS = {
+    "defaults": {},
+    "zlib": {"payload_codec": "zlib"},
+    "ctr": {"AES_mode": "ctr"},
+    "tiles": {"tile_size": 16},
+    "passthrough": {"passthrough": True},
+    # Every pooled ciphertext is handed back through a temp file
+    "spooled": {"spool_threshold": 64},
+}
+
+
+def _send(engine, src_dir, bin_dir, zip_path):
+    encrypt_all, _ = ENGINES[engine]
+    names = []
+    jobs = []
+    for path, rel in util.iter_images(src_dir):
+        names.append(util.bin_name_for(rel))
+        if zip_path is None:
+            (bin_dir / names[-1]).parent.mkdir(parents=True, exist_ok=True)
+            jobs.append((path, str(bin_dir / names[-1])))
+        else:
+            jobs.append((path, names[-1]))
+
+    if zip_path is None:
+        encrypt_all(jobs, None)
+    else:
+        with util.open_zip(zip_path, "w") as archive:
+            encrypt_all(jobs, archive)
+    return names
+
+
+def _receive(engine, names, bin_dir, zip_path, out_dir):
+    _, decrypt_all = ENGINES[engine]
+    jobs = []
+    for name in names:
+        dest = out_dir / util.image_name_for(name)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        jobs.append((name if zip_path else str(bin_dir / name), str(dest)))
+    decrypt_all(jobs, None if zip_path is None else str(zip_path))
+
+
+@pytest.mark.parametrize("option", OPTIONS)
+@pytest.mark.parametrize("target", ["bins", "archive"])
+@pytest.mark.parametrize("engine", ENGINES)
+def test_round_trip(session_key, rng, tmp_path, monkeypatch, engine, target, option):
+    for name, value in OPTIONS[option].items():
+        monkeypatch.setattr(const, name, value)
+    monkeypatch.setattr(const, "spool_dir", str(tmp_path / "spool"))
+    (tmp_path / "spool").mkdir()
+    images = write_images(tmp_path / "data", rng, NAMES)
+    bin_dir, out_dir = tmp_path / "bin", tmp_path / "out"
+    zip_path = tmp_path / "archive.zip" if target == "archive" else None
+
+    names = _send(engine, tmp_path / "data", bin_dir, zip_path)
+    _receive(engine, names, bin_dir, zip_path, out_dir)
+
+    if zip_path is not None:
+        assert sorted(util.open_zip(zip_path).namelist()) == sorted(util.bin_name_for(name) for name in NAMES)
+    assert not list((tmp_path / "spool").iterdir())
+    for name, pixels in images.items():
+        assert np.array_equal(np.asarray(Image.open(out_dir / name)), pixels)
+        if option == "passthrough":
+            assert (out_dir / name).read_bytes() == (tmp_path / "data" / name).read_bytes()
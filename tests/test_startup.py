@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import main
+from codebase import utility as util
+from jobs import receive
+from jobs import send
+
+HEAVY = ["PIL", "numpy", "pyzipper", "Crypto", "qrcode", "pyzbar", "concurrent.futures.process"]
+
+
+def test_menu_and_jobs_import_no_heavy_dependencies():
+    # A fresh interpreter: this one already imported everything through the other tests
+    code = "import sys, main, jobs.watch; print(' '.join(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(main.__file__).parent,
+                         capture_output=True, text=True, check=True, timeout=60).stdout.split()
+
+    assert [name for name in HEAVY if name in out] == []
+
+
+@pytest.mark.parametrize("choice, job", [(1, send), (2, receive)])
+def test_jobs_run_in_this_process(monkeypatch, choice, job):
+    calls = []
+    monkeypatch.setattr(util, "prompt_model_choice", lambda: choice)
+    monkeypatch.setattr(send, "main", lambda argv: calls.append(("send", argv)))
+    monkeypatch.setattr(receive, "main", lambda argv: calls.append(("receive", argv)))
+
+    main.main(["--workers", "2"])
+
+    assert calls == [(job.__name__.split(".")[-1], ["--workers", "2"])]
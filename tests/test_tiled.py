@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from codebase import api
+
+from conftest import random_image, same_pixels
+
+
+@pytest.fixture
+def scene(rng):
+    # Edges that don't fall on tile boundaries
+    return rng.integers(0, 255, (70, 45, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("codec", ["none", "zlib"])
+def test_tiled_array_round_trip(aes_key, scene, codec):
+    slide = api.encrypt(scene, aes_key, codec=codec, tile=16)
+
+    assert np.array_equal(api.decrypt(slide, aes_key), scene)
+
+
+@pytest.mark.parametrize("box", [(0, 0, 45, 70), (3, 5, 10, 10), (15, 15, 2, 2), (30, 60, 15, 10), (44, 69, 1, 1)])
+def test_region_matches_slice(aes_key, scene, box):
+    x, y, w, h = box
+    slide = api.encrypt(scene, aes_key, tile=16)
+
+    assert np.array_equal(api.decrypt_region(slide, aes_key, x, y, w, h), scene[y : y + h, x : x + w])
+
+
+def test_region_outside_image(aes_key, scene):
+    slide = api.encrypt(scene, aes_key, tile=16)
+
+    with pytest.raises(ValueError):
+        api.decrypt_region(slide, aes_key, 40, 0, 10, 10)
+
+
+def test_tile_access(aes_key, scene):
+    tiled = api.open_tiled(api.encrypt(scene, aes_key, tile=16), aes_key)
+
+    assert tiled.shape == (70, 45, 3)
+    assert np.array_equal(tiled.tile(4, 2), scene[64:70, 32:45])
+
+
+@pytest.mark.parametrize("mode", ["L", "RGBA", "P", "I;16"])
+def test_tiled_pil_keeps_mode(aes_key, rng, mode):
+    img = random_image(rng, mode, (45, 70))
+
+    out = api.decrypt_image(api.encrypt(img, aes_key, tile=16), aes_key)
+
+    assert same_pixels(out, img)
+
+
+def test_memmapped_npy(aes_key, scene, tmp_path):
+    path = tmp_path / "scene.npy"
+    np.save(path, scene)
+
+    slide = api.encrypt(np.load(path, mmap_mode="r"), aes_key, tile=32)
+
+    assert np.array_equal(api.decrypt_region(slide, aes_key, 0, 32, 45, 38), scene[32:])
+
+
+def test_untiled_blob_is_rejected(aes_key, scene):
+    with pytest.raises(ValueError):
+        api.open_tiled(api.encrypt(scene, aes_key), aes_key)
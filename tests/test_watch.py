@@ -0,0 +1,152 @@
+import functools
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import archive_index
+from codebase import img_processing
+from codebase import key_session
+from codebase import rsa
+from codebase import utility as util
+from codebase import constants as const
+from jobs import watch
+
+from conftest import write_images
+
+
+def _candidates(root):
+    return sorted(util.iter_images(root))
+
+
+def _names(ready):
+    return [relative_path for _, relative_path, _ in ready]
+
+
+def test_settler_waits_for_files_to_hold_still(rng, tmp_path):
+    write_images(tmp_path, rng, ["a.png", "b.png"])
+    (tmp_path / "empty.png").write_bytes(b"")
+    settler = watch.Settler(settle=0)
+
+    assert settler.ready(_candidates(tmp_path)) == []   # first look: nothing to compare with yet
+
+    with open(tmp_path / "b.png", "ab") as f:           # still being written
+        f.write(b"more")
+    ready = settler.ready(_candidates(tmp_path))
+
+    assert _names(ready) == ["a.png"]
+    assert _names(settler.ready(_candidates(tmp_path))) == ["b.png"]
+    assert settler.ready(_candidates(tmp_path)) == []   # handed out as they are: not again
+
+
+def test_settler_closed_and_already_sent_files(rng, tmp_path):
+    write_images(tmp_path, rng, ["a.png", "b.png", "c.png"])
+    stat = os.stat(tmp_path / "c.png")
+    settler = watch.Settler(settle=3600, sent={"c.png": [stat.st_size, stat.st_mtime_ns]})
+
+    assert _names(settler.ready(_candidates(tmp_path), closed={str(tmp_path / "a.png")})) == ["a.png"]
+
+    # b.png holds still, but not for an hour yet; c.png was sent as it is
+    assert settler.ready(_candidates(tmp_path)) == []
+    write_images(tmp_path, rng, ["c.png"], size=(30, 20))
+    settler.ready(_candidates(tmp_path))
+    assert _names(settler.ready(_candidates(tmp_path), closed={str(tmp_path / "c.png")})) == ["c.png"]
+
+
+def test_state_round_trip(tmp_path):
+    path = tmp_path / "cache" / "state.json"
+
+    watch.save_state({"a.png": [1, 2]}, path=path)
+
+    assert watch.load_state(path) == {"a.png": [1, 2]}
+    assert watch.load_state(tmp_path / "missing.json") == {}
+
+
+# ─── Rotation ─────────────────────────────────────────────────
+@pytest.fixture(scope="module")
+def rsa_key():
+    _, [e, d, n] = rsa.generate_keys(bits=1024)
+    return e, d, n
+
+
+@pytest.fixture
+def rotating(session_key, rsa_key, tmp_path, monkeypatch):
+    """A ``RotatingArchive`` writing into ``tmp_path / 'watch'``, state and session files under ``tmp_path``."""
+    e, _, n = rsa_key
+    monkeypatch.setattr(watch, "watch_dir", tmp_path / "watch")
+    monkeypatch.setattr(watch, "save_state", functools.partial(watch.save_state, path=tmp_path / "state.json"))
+    session = key_session.SendSession(e, n)
+    session.save = functools.partial(session.save, tmp_path / "session.json")
+    return watch.RotatingArchive(session, {}, rotate_bytes=1 << 30, rotate_seconds=3600, workers=1)
+
+
+def _ready(root, names):
+    # What the Settler hands out: (path, relative_path, [size, mtime_ns])
+    ready = []
+    for name in names:
+        stat = os.stat(root / name)
+        ready.append((str(root / name), name, [stat.st_size, stat.st_mtime_ns]))
+    return ready
+
+
+def _decrypt_all(zip_path, keys, out_dir, monkeypatch):
+    indexed = archive_index.IndexedArchive(zip_path, keys=keys)
+    monkeypatch.setattr(const, "AES_key", util.load_aes_key(keys, archive=util.open_zip(zip_path)))
+    decrypted = {}
+    for record in indexed:
+        dest = out_dir / record["name"]
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        img_processing.decrypt_zip_entry((str(zip_path), record["entry"], record["offset"], record["length"]), str(dest))
+        decrypted[record["name"]] = np.asarray(Image.open(dest))
+    return decrypted
+
+
+def test_rotation(rotating, rsa_key, rng, tmp_path, monkeypatch):
+    _, d, n = rsa_key
+    images = write_images(tmp_path / "data", rng, ["a.png", "sub/b.png"])
+
+    rotating.add(_ready(tmp_path / "data", ["a.png"]))
+    rotating.add(_ready(tmp_path / "data", ["sub/b.png"]))
+    partial = rotating.path
+    assert partial.exists() and not rotating.due()
+
+    rotating.rotate_bytes = 1
+    assert rotating.due()
+    rotating.rotate()
+
+    (zip_path,) = (tmp_path / "watch").iterdir()
+    assert not partial.exists() and zip_path.name == f"{rotating.name}.zip"
+    assert sorted(rotating.sent) == ["a.png", "sub/b.png"]
+    assert watch.load_state(tmp_path / "state.json") == rotating.sent
+    assert rotating.session.archives == 1
+
+    decrypted = _decrypt_all(zip_path, [d, n], tmp_path / "out", monkeypatch)
+    assert all(np.array_equal(decrypted[name], pixels) for name, pixels in images.items())
+
+
+def test_changed_image_starts_the_next_archive(rotating, rsa_key, rng, tmp_path, monkeypatch):
+    _, d, n = rsa_key
+    write_images(tmp_path / "data", rng, ["a.png"])
+    rotating.add(_ready(tmp_path / "data", ["a.png"]))
+    first_key = rotating.aes_key
+
+    changed = write_images(tmp_path / "data", rng, ["a.png"], size=(30, 20))
+    rotating.add(_ready(tmp_path / "data", ["a.png"]))
+    rotating.rotate()
+
+    first, second = sorted((tmp_path / "watch").iterdir())
+    assert rotating.session.archives == 2 and rotating.aes_key != first_key
+    assert np.array_equal(_decrypt_all(second, [d, n], tmp_path / "out", monkeypatch)["a.png"], changed["a.png"])
+
+
+def test_empty_archive_is_dropped(rotating, tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "broken.png").write_bytes(b"not a png")
+
+    rotating.add(_ready(tmp_path / "data", ["broken.png"]))
+    assert not rotating.due()
+    rotating.rotate()
+
+    assert list((tmp_path / "watch").iterdir()) == []
+    assert rotating.sent == {} and rotating.session.archives == 0
@@ -0,0 +1,94 @@
+import mmap
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from codebase import img_processing
+from codebase import utility as util
+from codebase import constants as const
+
+from conftest import write_images
+
+
+def test_entries_stream_both_ways(rng, tmp_path):
+    zip_path = tmp_path / "archive.zip"
+    pieces = [rng.bytes(10_000) for _ in range(20)]
+
+    with util.open_zip(zip_path, "w") as zf, util.open_zip_entry(zf, "sub/a.png.bin", "w") as dest:
+        for piece in pieces:
+            dest.write(piece)
+
+    read = []
+    with util.open_zip_entry(util.open_zip(zip_path), "sub/a.png.bin") as src:
+        while chunk := src.read(4096):
+            read.append(chunk)
+
+    assert max(len(chunk) for chunk in read) == 4096
+    assert b"".join(read) == b"".join(pieces)
+
+
+def test_stored_entries_are_located_in_place(rng, tmp_path):
+    zip_path = tmp_path / "archive.zip"
+    data = {"a.png.bin": rng.bytes(1000), "sub/b.png.bin": rng.bytes(3000)}
+    with util.open_zip(zip_path, "w") as zf:
+        for name, blob in data.items():
+            util.write_zip_entry(zf, name, blob)
+
+    archive = util.open_zip(zip_path)
+    with open(zip_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+        for name, blob in data.items():
+            offset, size = util.zip_entry_span(archive, name, raw)
+            header_offset = archive.getinfo(name).header_offset
+
+            assert raw[offset : offset + size] == blob
+            assert bytes(util.located_entry(raw, header_offset, size, name)) == blob
+            assert util.read_located_entry(f, header_offset, size, name) == blob
+
+
+def test_spool_moves_to_disk_past_the_threshold(rng, tmp_path, monkeypatch):
+    monkeypatch.setattr(const, "spool_threshold", 100)
+    monkeypatch.setattr(const, "spool_dir", str(tmp_path))
+    small, big = rng.bytes(60), rng.bytes(250)
+
+    with util.Spool() as spool:
+        spool.write(small)
+    assert spool.result() == small
+
+    with util.Spool() as spool:
+        spool.write(big[:80])
+        spool.write(big[80:])
+    spooled = spool.result()
+    assert isinstance(spooled, str) and Path(spooled).read_bytes() == big
+
+    zip_path = tmp_path / "archive.zip"
+    with util.open_zip(zip_path, "w") as zf:
+        util.write_zip_spooled(zf, "small.bin", small)
+        util.write_zip_spooled(zf, "big.bin", spooled)
+
+    zf = util.open_zip(zip_path)
+    assert (zf.read("small.bin"), zf.read("big.bin")) == (small, big)
+    assert list(tmp_path.glob("*.spool")) == []
+
+
+@pytest.mark.parametrize("compression", ["stored", "deflated"])
+def test_images_go_straight_into_the_archive_and_back(session_key, rng, tmp_path, compression):
+    # Stored entries decrypt in place from the mapped zip; others stream through zipfile
+    import pyzipper
+
+    images = write_images(tmp_path / "data", rng, ["a.png", "sub/b.png"])
+    zip_path = tmp_path / "archive.zip"
+    method = pyzipper.ZIP_STORED if compression == "stored" else pyzipper.ZIP_DEFLATED
+
+    with pyzipper.AESZipFile(zip_path, "w", compression=method) as zf:
+        for name in images:
+            img_processing.encrypt_image_to_zip(zf, str(tmp_path / "data" / name), util.bin_name_for(name))
+
+    for name, pixels in images.items():
+        dest = tmp_path / "out" / name
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _, written = img_processing.decrypt_zip_entry((str(zip_path), util.bin_name_for(name)), str(dest))
+
+        assert written == str(dest)
+        assert np.array_equal(np.asarray(Image.open(dest)), pixels)